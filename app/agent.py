@@ -1,79 +1,426 @@
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage, SystemMessage
-from app.llm import load_llm
+from langchain_core.messages import HumanMessage, AIMessage, RemoveMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from app.components import components
+from app.concurrency import TOOL_MAX_CONCURRENCY, limit_tool_concurrency, tool_executor, tool_slot
 from app.tools.product import product_tool_list
 from app.tools.order import order_tool_list
-from app.tools.return_policy import return_policy_tool_list
+from app.tools.return_policy import POLICY_ANSWER_MODE
+from app.utils.order_service import order_by_id, orders_by_user, get_cancellable_orders
+from app.utils.product_service import price_of_product
+from app.utils.db import run_in_db_executor
+from app.utils.policy_facts import POLICY_FACTS_ENABLED, policy_facts
+from app.metrics import metrics_callback, PROMPT_TOKENS_EST
+from app.sessions import session_store, window_history
+import functools
 import json
+import logging
+import os
+import re
+import threading
 
-SYSTEM_PROMPT = (
-    "You are a helpful retail assistant for USER 2001. All queries are related to user ID 2001 unless explicitly stated otherwise.\n"
-    "\n"
-    "CONTEXT: You are assisting USER 2001 with their retail inquiries, orders, and general questions.\n"
-    "\n"
-    "Use tools exactly as follows:\n"
-    "- If the question is about returns, refunds, exchanges, deadlines, eligibility, or policy details, ALWAYS call ReturnPolicyTool first.\n"
-    "- If the user asks about product details, availability, or price, use ProductSearchTool.\n"
-    "- If the user asks about order status and provides an order ID, use OrderTrackingTool.\n"
-    "- If the user asks about order status without an order ID but mentions a product name, use OrderTrackingByProductTool.\n"
-    "- If the user asks about 'my orders', 'my recent orders', or similar personal queries, use MyOrdersTool.\n"
-    "- If the user asks about all recent orders in the system, use AllOrdersTool.\n"
-    "- If the user asks about orders by status (pending, shipped, delivered, cancelled), use OrdersByStatusTool.\n"
-    "- If the user asks about orders by a specific user ID, use OrdersByUserTool.\n"
-    "- If the user wants to cancel an order and provides an order ID, first use OrderCancellationCheckTool to check if cancellation is possible, then use OrderCancellationTool to cancel it.\n"
-    "- If the user asks which orders can be cancelled or wants to see cancellable orders, use CancellableOrdersTool (defaults to user 2001).\n"
-    "\n"
-    "TOOLS RETURN STRUCTURED DATA:\n"
-    "- Each tool returns a dictionary with a boolean key 'found' or 'success' or 'can_cancel'.\n"
-    "- If 'found' is True, additional keys like 'order_id', 'orders', 'product_name', 'user_id', or 'status' contain the relevant information.\n"
-    "- If 'found' is False, keys like 'error', 'order_id', 'product_name', or 'user_id' indicate what was searched for.\n"
-    "- For cancellation: 'can_cancel' indicates if cancellation is possible, 'success' indicates if cancellation was completed.\n"
-    "\n"
-    "INSTRUCTIONS FOR RESPONDING:\n"
-    "- When 'found' is True, extract and present the key information clearly:\n"
-    "  * For orders: mention order ID, product name, status, date, and return eligibility if available\n"
-    "  * For products: mention name, price, and category\n"
-    "  * For policies: provide the relevant policy information\n"
-    "  * For cancellations: explain the cancellation status and any restrictions\n"
-    "- If 'found' is False, inform the user politely that no matching results were found.\n"
-    "- For cancellation requests: Always check cancellation eligibility first, then proceed with cancellation if allowed.\n"
-    "- Always base your response on the tool output; do not guess or make up information.\n"
-    "- Respond in a conversational, helpful tone.\n"
-    "- When referring to orders, you can use 'your orders' since you're assisting user 2001.\n"
-    "- Assume queries about 'my orders', 'my cancellable orders', etc. refer to user 2001."
-)
+logger = logging.getLogger(__name__)
+
+# (tool group, line): lines tagged with a group only go into prompts that bind that group's tools;
+# SYSTEM_PROMPT is every line, build_system_prompt() the subset for a query (see ToolSelector)
+_PROMPT_LINES = [
+    (None, "You are a helpful retail assistant for USER 2001. All queries are related to user ID 2001 unless explicitly stated otherwise."),
+    (None, ""),
+    (None, "CONTEXT: You are assisting USER 2001 with their retail inquiries, orders, and general questions."),
+    (None, ""),
+    (None, "Use tools exactly as follows:"),
+    ("policy", "- If the question is about returns, refunds, exchanges, deadlines, eligibility, or policy details, ALWAYS call ReturnPolicyTool first."),
+    ("products", "- If the user asks about product details, availability, or price, use ProductSearchTool."),
+    ("orders", "- If the user asks about order status and provides an order ID, use OrderTrackingTool."),
+    ("orders", "- If the user asks about order status without an order ID but mentions a product name, use OrderTrackingByProductTool."),
+    ("orders", "- If the user asks about 'my orders', 'my recent orders', or similar personal queries, use MyOrdersTool."),
+    ("orders", "- If the user asks about all recent orders in the system, use AllOrdersTool."),
+    ("orders", "- If the user asks about orders by status (pending, shipped, delivered, cancelled), use OrdersByStatusTool."),
+    ("orders", "- If the user asks about orders by a specific user ID, use OrdersByUserTool."),
+    ("orders", "- If the user wants to cancel an order and provides an order ID, first use OrderCancellationCheckTool to check if cancellation is possible, then use OrderCancellationTool to cancel it."),
+    ("orders", "- If the user asks which orders can be cancelled or wants to see cancellable orders, use CancellableOrdersTool (defaults to user 2001)."),
+    (None, ""),
+    (None, "TOOLS RETURN STRUCTURED DATA:"),
+    (None, "- Each tool returns a dictionary with a boolean key 'found' or 'success' or 'can_cancel'."),
+    (None, "- If 'found' is True, additional keys like 'order_id', 'orders', 'product_name', 'user_id', or 'status' contain the relevant information."),
+    (None, "- If 'found' is False, keys like 'error', 'order_id', 'product_name', or 'user_id' indicate what was searched for."),
+    ("orders", "- For cancellation: 'can_cancel' indicates if cancellation is possible, 'success' indicates if cancellation was completed."),
+    (None, ""),
+    (None, "INSTRUCTIONS FOR RESPONDING:"),
+    (None, "- When 'found' is True, extract and present the key information clearly:"),
+    ("orders", "  * For orders: mention order ID, product name, status, date, and return eligibility if available"),
+    ("products", "  * For products: mention name, price, and category"),
+    ("policy", "  * For policies: provide the relevant policy information"
+     if POLICY_ANSWER_MODE != "retrieve" else
+     "  * For policies: answer only from the text of the returned chunks (best first), keep deadlines and "
+     "exceptions exactly as stated, and say you don't know if the chunks don't cover the question"),
+    ("orders", "  * For cancellations: explain the cancellation status and any restrictions"),
+    (None, "- If 'found' is False, inform the user politely that no matching results were found."),
+    ("orders", "- For cancellation requests: Always check cancellation eligibility first, then proceed with cancellation if allowed."),
+    (None, "- Always base your response on the tool output; do not guess or make up information."),
+    (None, "- Respond in a conversational, helpful tone."),
+    ("orders", "- When referring to orders, you can use 'your orders' since you're assisting user 2001."),
+    ("orders", "- Assume queries about 'my orders', 'my cancellable orders', etc. refer to user 2001."),
+]
+
+
+def build_system_prompt(groups=None) -> str:
+    """The system prompt for the given tool groups; None means every tool."""
+    return "\n".join(line for group, line in _PROMPT_LINES if group is None or groups is None or group in groups)
+
+
+SYSTEM_PROMPT = build_system_prompt()
+
+
+DEFAULT_USER_ID = "2001"
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") != "0"
+TOOL_SELECTION_ENABLED = os.getenv("TOOL_SELECTION_ENABLED", "1") != "0"
+
+
+class FastPathRouter:
+    """Answer high-confidence structured queries straight from the services, skipping the LLM.
+
+    Anything the patterns below are not sure about returns None and goes to the agent.
+    """
+
+    # Every routed query saves at least the tool-calling hop and the final-answer hop
+    LLM_CALLS_PER_QUERY = 2
+
+    _ORDER_ID = re.compile(r"\b(\d{5,})\b")
+    _STATUS_WORDS = re.compile(r"\b(where|status|track|tracking|arriv\w*|shipped|deliver\w*)\b")
+    # Actions and policy questions need the agent even when an order ID is present
+    _AGENT_WORDS = re.compile(r"\b(cancel\w*|return\w*|refund\w*|exchange\w*|replace\w*|policy|why)\b")
+    # Policy questions are tried against the facts table first (see app.utils.policy_facts),
+    # unless they are about the user's own orders, which only the agent can look up
+    _POLICY = re.compile(r"\b(return\w*|refund\w*)\b")
+    _PERSONAL = re.compile(r"\b(my|mine|our|i (have |had |just )?(ordered|bought|purchased|got|received))\b")
+    _CANCELLABLE = re.compile(
+        r"\b(cancell?able|(which|what) (of my )?orders? can (i|be) cancel(l?ed)?)\b"
+    )
+    _MY_ORDERS = re.compile(
+        r"^((please )?(show|list|get|view|see|display)( me)?|what are|can you show( me)?)?\s*"
+        r"(all )?my (recent |latest |past |previous )?orders?( please)?$"
+    )
+    _PRICE = re.compile(
+        r"^((what is|whats) )?(the )?price (of|for) (the |a |an )?(?P<name>.+)$"
+        r"|^how much (is|does|for) (the |a |an )?(?P<name2>.+?)( cost)?$"
+    )
+
+    def __init__(self, user_id: str = DEFAULT_USER_ID, enabled: bool = FAST_PATH_ENABLED):
+        self.user_id = user_id
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._total = 0
+        self._hits = {}
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        q = query.lower().replace("\u2019", "'").replace("what's", "whats")
+        q = re.sub(r"[?!.]+$", "", q.strip())
+        return re.sub(r"\s+", " ", q).strip()
+
+    def match(self, query: str):
+        """Return (intent, argument) for a high-confidence query, else None."""
+        q = self._normalize(query)
+        ids = self._ORDER_ID.findall(q)
+
+        if self._CANCELLABLE.search(q) and not ids:
+            return ("cancellable_orders", self.user_id)
+        if self._AGENT_WORDS.search(q):
+            if POLICY_FACTS_ENABLED and not ids and self._POLICY.search(q) and not self._PERSONAL.search(q):
+                return ("policy_fact", q)
+            return None
+        if len(ids) == 1 and self._STATUS_WORDS.search(q):
+            return ("order_status", ids[0])
+        if ids:
+            return None
+        if self._MY_ORDERS.match(q):
+            return ("my_orders", self.user_id)
+        m = self._PRICE.match(q)
+        if m:
+            name = (m.group("name") or m.group("name2") or "").strip()
+            if name and not re.search(r"\b(under|below|over|above|between|less|more)\b", name):
+                return ("product_price", name)
+        return None
+
+    # ---------- Templates ----------
+
+    @staticmethod
+    def _render_order_status(order_id: str):
+        order = order_by_id(order_id)
+        if not order.get("found"):
+            return f"I couldn't find an order with ID {order_id}."
+        lines = [f"Order {order_id} ({order['product_name']}) is currently {order['status']}."]
+        if order.get("date"):
+            lines.append(f"It was delivered on {order['date']}.")
+        if order.get("returnable"):
+            lines.append(
+                f"It is still eligible for return ({order['days_since_delivery']} of "
+                f"{order['return_window_days']} days used)."
+            )
+        elif order.get("days_since_delivery") is not None:
+            lines.append(f"The {order['return_window_days']}-day return window has passed.")
+        return " ".join(lines)
+
+    @staticmethod
+    def _render_my_orders(user_id: str):
+        result = orders_by_user(user_id)
+        if not result.get("found"):
+            return "You don't have any orders yet."
+        lines = ["Here are your recent orders:"]
+        lines += [
+            f"- Order {o['order_id']}: {o['product_name']} \u2013 {o['status']} (ordered {o['date']})"
+            for o in result["orders"]
+        ]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _render_cancellable_orders(user_id: str):
+        result = get_cancellable_orders(user_id, limit=20)
+        if not result.get("found"):
+            return "None of your orders can be cancelled right now. Only orders that are still processing can be cancelled."
+        lines = ["These orders are still processing and can be cancelled:"]
+        lines += [
+            f"- Order {o['order_id']}: {o['product_name']} (ordered {o['date']})"
+            for o in result["cancellable_orders"]
+        ]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _render_policy_fact(question: str):
+        fact = policy_facts.lookup(question)
+        return fact["answer"] if fact else None
+
+    @staticmethod
+    def _render_product_price(name: str):
+        rows = price_of_product(name)
+        if not rows:
+            # Could be a category or a misspelling; let the agent search properly
+            return None
+        if len(rows) == 1:
+            n, p = rows[0]
+            return f"{n} costs \u20b9{p}."
+        return "Here are the matching products:\n" + "\n".join(f"- {n} \u2013 \u20b9{p}" for n, p in rows)
+
+    def route(self, query: str):
+        """Return (intent, answer) when the query can be answered without the LLM, else None."""
+        if not self.enabled:
+            return None
+        answer = None
+        matched = self.match(query)
+        if matched:
+            intent, arg = matched
+            try:
+                answer = getattr(self, f"_render_{intent}")(arg)
+            except Exception:
+                logger.warning("Fast path %r failed, falling back to agent", intent, exc_info=True)
+                answer = None
+        with self._lock:
+            self._total += 1
+            if answer is not None:
+                self._hits[intent] = self._hits.get(intent, 0) + 1
+        return (intent, answer) if answer is not None else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._total
+            hits = dict(self._hits)
+        routed = sum(hits.values())
+        rate = lambda n: round(n / total, 4) if total else 0.0
+        return {
+            "total_queries": total,
+            "fast_path_hits": routed,
+            "llm_fallbacks": total - routed,
+            "hit_rate": rate(routed),
+            "llm_calls_saved": routed * self.LLM_CALLS_PER_QUERY,
+            "intents": {name: {"hits": n, "hit_rate": rate(n)} for name, n in sorted(hits.items())},
+        }
+
+
+fast_path_router = FastPathRouter()
+
+
+class ToolSelector:
+    """Pick the tool groups a query needs, so the agent binds fewer tool schemas and a shorter prompt.
+
+    Keyword rules per group; a query matching several groups gets all of them, and one
+    matching none (small talk, vague follow-ups) falls back to every tool.
+    """
+
+    GROUPS = {
+        "orders": [
+            "OrderTrackingTool", "OrderTrackingByProductTool", "AllOrdersTool", "OrdersByStatusTool",
+            "OrdersByUserTool", "OrderCancellationCheckTool", "OrderCancellationTool", "CancellableOrdersTool",
+            "MyOrdersTool",
+        ],
+        "products": ["ProductSearchTool", "ProductCategoryTool", "ProductPriceTool"],
+        "policy": ["ReturnPolicyTool"],
+    }
+    _PATTERNS = {
+        "orders": re.compile(
+            r"\b(orders?|ordered|track\w*|deliver\w*|ship\w*|cancel\w*|status|pending|processing|arriv\w*)\b"
+        ),
+        "products": re.compile(
+            r"\b(price\w*|cost\w*|how much|cheap\w*|expensive|under|below|above|between|budget|buy|products?|"
+            r"availab\w*|in stock|categor\w*|brands?|looking for|laptops?|phones?|shoes?|sneakers?|earbuds?|"
+            r"headphones?|watch\w*|accessor\w*|kettles?|fryers?)\b"
+        ),
+        "policy": re.compile(
+            r"\b(return\w*|refund\w*|exchang\w*|replac\w*|polic\w*|warrant\w*|eligib\w*|deadline)\b"
+        ),
+    }
+
+    def __init__(self, enabled: bool = TOOL_SELECTION_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._selections = {}
+        self._tokens = 0
+        self._tokens_all = 0
+
+    def select(self, query: str):
+        """Sorted tuple of tool groups for the query, or None for every tool."""
+        if not self.enabled:
+            return None
+        q = query.lower()
+        groups = tuple(sorted(g for g, pattern in self._PATTERNS.items() if pattern.search(q)))
+        if not groups or len(groups) == len(self.GROUPS):
+            return None
+        return groups
+
+    def record(self, groups, tokens: int, tokens_all: int):
+        """Count one agent run with its estimated fixed prompt size (system prompt + tool schemas)."""
+        key = "+".join(groups) if groups else "all"
+        PROMPT_TOKENS_EST.inc("selected", amount=tokens)
+        PROMPT_TOKENS_EST.inc("all_tools", amount=tokens_all)
+        with self._lock:
+            self._selections[key] = self._selections.get(key, 0) + 1
+            self._tokens += tokens
+            self._tokens_all += tokens_all
+
+    def stats(self) -> dict:
+        with self._lock:
+            runs = sum(self._selections.values())
+            selections = dict(sorted(self._selections.items()))
+            tokens, tokens_all = self._tokens, self._tokens_all
+        return {
+            "enabled": self.enabled,
+            "agent_runs": runs,
+            "selections": selections,
+            "avg_prompt_tokens_est": round(tokens / runs, 1) if runs else 0.0,
+            "avg_prompt_tokens_all_tools_est": round(tokens_all / runs, 1) if runs else 0.0,
+            "prompt_token_reduction": round(1 - tokens / tokens_all, 4) if tokens_all else 0.0,
+        }
+
+
+tool_selector = ToolSelector()
+
+
+def _concurrent_tool(tool):
+    """Copy of a tool for the async agent: each call takes one of the request's tool slots, and
+    tools without a coroutine run their blocking body on the tool executor.
+
+    The tool node already runs the calls of one step concurrently; this bounds them per request
+    and keeps them off the event loop's default executor.
+    """
+    inner = tool.coroutine or run_in_db_executor(tool.func, tool_executor)
+
+    @functools.wraps(inner)
+    async def coroutine(*args, **kwargs):
+        async with tool_slot():
+            return await inner(*args, **kwargs)
+
+    return tool.model_copy(update={"coroutine": coroutine})
 
 
 class GraphBuilder:
     def __init__(self) -> None:
-        self.llm = load_llm()
+        # Shared with ReturnPolicyTool instead of creating a second client
+        self.llm = components.get("llm")
         self.tools = [
-            *product_tool_list,
-            *order_tool_list,
-            *return_policy_tool_list,
+            _concurrent_tool(t)
+            for t in (*product_tool_list, *order_tool_list, *components.get("return_policy").return_policy_tool_list)
         ]
-        self.agent_node = create_react_agent(
-            model=self.llm,
-            tools=self.tools,
-            interrupt_after_tool=False,  # allow multi-step reasoning
-        )
+        # Tool groups -> (react agent bound to that subset, system prompt, estimated prompt tokens)
+        self._agents = {}
+        self._agents_lock = threading.Lock()
+        self.agent_node, _, self._full_tokens = self._agent_for(None)
         self.graph = None
+        # (checkpointer, graph compiled with it); holding the checkpointer keeps the match exact
+        self._session_graph = (None, None)
+
+    @staticmethod
+    def _estimate_tokens(prompt: str, tools) -> int:
+        # ~4 characters per token for English text and JSON schemas
+        schemas = sum(len(json.dumps(convert_to_openai_tool(t))) for t in tools)
+        return (len(prompt) + schemas) // 4
+
+    def _agent_for(self, groups):
+        """The react agent, prompt and token estimate for a tool subset, built once per subset."""
+        cached = self._agents.get(groups)
+        if cached is not None:
+            return cached
+        with self._agents_lock:
+            if groups not in self._agents:
+                names = None if groups is None else {n for g in groups for n in ToolSelector.GROUPS[g]}
+                tools = [t for t in self.tools if names is None or t.name in names]
+                prompt = build_system_prompt(groups)
+                agent = create_react_agent(
+                    model=self.llm,
+                    tools=tools,
+                    interrupt_after_tool=False,  # allow multi-step reasoning
+                    checkpointer=False,  # only the outer graph checkpoints sessions
+                )
+                self._agents[groups] = (agent, prompt, self._estimate_tokens(prompt, tools))
+            return self._agents[groups]
+
+    def _select(self, messages):
+        # Route on the latest user message; anything else gets every tool
+        query = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        groups = tool_selector.select(query if isinstance(query, str) else "")
+        agent, prompt, tokens = self._agent_for(groups)
+        tool_selector.record(groups, tokens, self._full_tokens)
+        # Session history is windowed first, so the prompt stays bounded however long the conversation
+        kept, dropped = window_history(messages)
+        return agent, [SystemMessage(content=prompt)] + kept, dropped
+
+    @staticmethod
+    def _update(result, input_messages, dropped):
+        # Only this turn's new messages go back into the state (not the system prompt or the
+        # history again); messages windowed out are removed from the checkpoint
+        new = result.get("messages", [])[len(input_messages):]
+        return {"messages": [RemoveMessage(id=m.id) for m in dropped] + new}
 
     def agent_fn(self, state: MessagesState):
-        messages = state.get("messages", [])
-        input_messages = [SystemMessage(content=SYSTEM_PROMPT)] + messages
-        result = self.agent_node.invoke({"messages": input_messages})
-        return {"messages": result.get("messages", [])}
+        agent, input_messages, dropped = self._select(state.get("messages", []))
+        result = agent.invoke({"messages": input_messages})
+        return self._update(result, input_messages, dropped)
 
-    def build(self):
+    async def aagent_fn(self, state: MessagesState):
+        agent, input_messages, dropped = self._select(state.get("messages", []))
+        result = await agent.ainvoke({"messages": input_messages})
+        return self._update(result, input_messages, dropped)
+
+    def _graph(self):
         g = StateGraph(MessagesState)
-        g.add_node("agent", self.agent_fn)
+        g.add_node("agent", RunnableLambda(self.agent_fn, afunc=self.aagent_fn))
         g.add_edge(START, "agent")
         g.add_edge("agent", END)
-        self.graph = g.compile()
+        return g
+
+    def build(self):
+        self.graph = self._graph().compile()
         return self.graph
 
+    def session_graph(self, checkpointer):
+        """The same graph compiled with a checkpointer, so runs with a thread_id keep their history."""
+        cached_checkpointer, graph = self._session_graph
+        if graph is None or cached_checkpointer is not checkpointer:
+            graph = self._graph().compile(checkpointer=checkpointer)
+            self._session_graph = (checkpointer, graph)
+        return graph
+
 
 def get_agent():
     builder = GraphBuilder()
@@ -111,57 +458,165 @@ def get_agent():
                     return True
         return False
 
+    def final_answer(result) -> str:
+        """Turn a finished graph run into the reply text."""
+        msgs = result.get("messages", [])
+        # In a session the state holds earlier turns too; only this turn's messages count
+        last_human = max((i for i, m in enumerate(msgs) if isinstance(m, HumanMessage)), default=0)
+        msgs = msgs[last_human:]
+        if not msgs:
+            return "No answer."
+
+        # Extract the final AI message first
+        last_assistant_msg = extract_final_ai_message(msgs)
+        
+        # Only check for "not found" if we don't have a proper AI response
+        if not last_assistant_msg or len(last_assistant_msg.strip()) < 10:
+            tool_outputs = []
+
+            for msg in msgs:
+                # ToolMessage parsing
+                name = getattr(msg, "name", None)
+                content = getattr(msg, "content", "")
+                if name:
+                    try:
+                        parsed = json.loads(content)
+                        tool_outputs.append(parsed)
+                    except Exception:
+                        tool_outputs.append({"found": False, "raw": content})
+
+                # AIMessage tool_calls (sometimes results are here)
+                tool_calls = getattr(msg, "tool_calls", [])
+                for call in tool_calls:
+                    tool_msg_content = call.get("result", "{}")
+                    try:
+                        parsed_call = json.loads(tool_msg_content)
+                        tool_outputs.append(parsed_call)
+                    except Exception:
+                        tool_outputs.append({"found": False, "raw": tool_msg_content})
+
+            # Check all tool outputs for any 'found: False' recursively
+            for tool_output in tool_outputs:
+                if check_not_found(tool_output):
+                    return "You didn't order this item, so I cannot provide its status."
+
+        # Return the AI assistant's response if we have one
+        if last_assistant_msg:
+            return last_assistant_msg
+
+        return "No answer."
+
+    # LLM and tool latencies are recorded by the metrics callback on every run
+    run_config = {"callbacks": [metrics_callback]}
+    # The sync tool node runs a step's tool calls on a thread pool of this size
+    sync_config = {**run_config, "max_concurrency": TOOL_MAX_CONCURRENCY}
+    # Fast-path lookups are service calls too
+    route = run_in_db_executor(fast_path_router.route)
+
+    def session_run(session_id):
+        """(graph, config, extra run kwargs) for a turn; stateless unless the session store is open."""
+        if not session_id or not session_store.is_open:
+            return graph, run_config, {}
+        config = {**run_config, **session_store.config(session_id)}
+        # One checkpoint write per turn, when the run finishes, instead of one per step
+        return builder.session_graph(session_store.saver), config, {"durability": "exit"}
+
+    async def record_fast_path(session_id, query: str, answer: str):
+        # Fast-path answers skip the graph, but follow-ups ("cancel it") still need them in the history
+        session_graph, config, _ = session_run(session_id)
+        if session_graph is not graph:
+            state = await session_graph.aget_state(config)
+            turn = [HumanMessage(content=query), AIMessage(content=answer)]
+            _, dropped = window_history(state.values.get("messages", []) + turn)
+            await session_graph.aupdate_state(
+                config, {"messages": [RemoveMessage(id=m.id) for m in dropped] + turn}, as_node="agent"
+            )
+            await session_store.touch(session_id)
+
     def run_agent(query: str) -> str:
         try:
-            result = graph.invoke({"messages": [HumanMessage(content=query)]})
-            print("Agent raw result:", result)  # Debugging
+            routed = fast_path_router.route(query)
+            if routed:
+                return routed[1]
 
-            msgs = result.get("messages", [])
-            if not msgs:
-                return "No answer."
+            result = graph.invoke({"messages": [HumanMessage(content=query)]}, config=sync_config)
+            logger.debug("Agent raw result: %s", result)
+            return final_answer(result)
 
-            # Extract the final AI message first
-            last_assistant_msg = extract_final_ai_message(msgs)
-            
-            # Only check for "not found" if we don't have a proper AI response
-            if not last_assistant_msg or len(last_assistant_msg.strip()) < 10:
-                tool_outputs = []
-
-                for msg in msgs:
-                    # ToolMessage parsing
-                    name = getattr(msg, "name", None)
-                    content = getattr(msg, "content", "")
-                    if name:
-                        try:
-                            parsed = json.loads(content)
-                            tool_outputs.append(parsed)
-                        except Exception:
-                            tool_outputs.append({"found": False, "raw": content})
-
-                    # AIMessage tool_calls (sometimes results are here)
-                    tool_calls = getattr(msg, "tool_calls", [])
-                    for call in tool_calls:
-                        tool_msg_content = call.get("result", "{}")
-                        try:
-                            parsed_call = json.loads(tool_msg_content)
-                            tool_outputs.append(parsed_call)
-                        except Exception:
-                            tool_outputs.append({"found": False, "raw": tool_msg_content})
-
-                # Check all tool outputs for any 'found: False' recursively
-                for tool_output in tool_outputs:
-                    if check_not_found(tool_output):
-                        return "You didn't order this item, so I cannot provide its status."
-
-            # Return the AI assistant's response if we have one
-            if last_assistant_msg:
-                return last_assistant_msg
+        except Exception as e:
+            import traceback
+            print("Agent crashed:\n", traceback.format_exc())
+            return f"Agent error: {e}"
 
-            return "No answer."
+    async def arun_agent(query: str, session_id: str = None) -> str:
+        """Async variant of run_agent; keeps the event loop free while the graph runs.
+
+        With a session_id the turn is added to that session's checkpointed history.
+        """
+        try:
+            routed = await route(query)
+            if routed:
+                await record_fast_path(session_id, query, routed[1])
+                return routed[1]
+
+            limit_tool_concurrency()
+
+            run_graph, config, kwargs = session_run(session_id)
+            result = await run_graph.ainvoke({"messages": [HumanMessage(content=query)]}, config=config, **kwargs)
+            if run_graph is not graph:
+                await session_store.touch(session_id)
+            logger.debug("Agent raw result: %s", result)
+            return final_answer(result)
 
         except Exception as e:
             import traceback
             print("Agent crashed:\n", traceback.format_exc())
             return f"Agent error: {e}"
 
+    async def astream_agent(query: str, session_id: str = None):
+        """Yield (event, data) pairs as the graph runs: 'token', 'tool_start', 'tool_end', then 'done'."""
+        try:
+            routed = await route(query)
+            if routed:
+                yield "token", {"text": routed[1]}
+                await record_fast_path(session_id, query, routed[1])
+                yield "done", {"response": routed[1]}
+                return
+
+            limit_tool_concurrency()
+            run_graph, config, kwargs = session_run(session_id)
+            active_tools = set()
+            final_state = None
+            async for event in run_graph.astream_events(
+                {"messages": [HumanMessage(content=query)]}, config=config, version="v2", **kwargs
+            ):
+                kind = event["event"]
+                if kind == "on_tool_start":
+                    active_tools.add(event["run_id"])
+                    yield "tool_start", {"tool": event["name"], "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    active_tools.discard(event["run_id"])
+                    yield "tool_end", {"tool": event["name"]}
+                elif kind == "on_chat_model_stream":
+                    # Skip LLM calls nested inside tools (e.g. ReturnPolicyTool's own answer)
+                    if active_tools.intersection(event.get("parent_ids", [])):
+                        continue
+                    text = getattr(event["data"].get("chunk"), "content", "")
+                    if isinstance(text, str) and text:
+                        yield "token", {"text": text}
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    final_state = event["data"].get("output")
+
+            if run_graph is not graph:
+                await session_store.touch(session_id)
+            logger.debug("Agent raw result: %s", final_state)
+            yield "done", {"response": final_answer(final_state or {})}
+
+        except Exception as e:
+            import traceback
+            print("Agent crashed:\n", traceback.format_exc())
+            yield "error", {"detail": f"Agent error: {e}"}
+
+    run_agent.arun = arun_agent
+    run_agent.astream = astream_agent
     return run_agent
@@ -1,52 +1,336 @@
+import asyncio
+import json
+import time
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import List, Optional
 from pydantic import BaseModel
-from app.agent import get_agent
+from app.agent import fast_path_router, tool_selector
+from app.components import components, WARMUP_MODE
+from app.concurrency import (
+    chat_admission,
+    tool_executor,
+    Overloaded,
+    BATCH_PARALLELISM,
+    BATCH_MAX_PARALLELISM,
+    BATCH_MAX_QUERIES,
+    BATCH_ADMISSION_RETRIES,
+)
+from app.logger import log_interaction, interaction_logger
+from app.metrics import registry, BATCH_MEMO_CALLS, CHAT_REQUESTS, CHAT_SECONDS, STREAM_TTFT_SECONDS
+from app.sessions import session_store
+from app.utils.batch_memo import BatchMemo, batch_scope
+from app.utils.policy_facts import policy_facts
+from app.utils.result_cache import result_cache
 
 # === Request schema ===
 class ChatRequest(BaseModel):
     query: str
+    # Turns sharing a session_id see the earlier turns (windowed); omit it for a one-off question
+    session_id: Optional[str] = None
 
 # === Response schema ===
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
 
-# === Create agent on startup ===
-# === Create agent on startup ===
+class BatchRequest(BaseModel):
+    queries: List[str]
+    # Queries run at once for this batch; defaults to CHAT_BATCH_PARALLELISM, capped at CHAT_BATCH_MAX_PARALLELISM
+    parallelism: Optional[int] = None
+    # True: results are streamed in input order; False: as each one finishes (every line carries its index)
+    ordered: bool = True
+
+# === Build shared components on startup ===
 from contextlib import asynccontextmanager
-from app.utils.db import init_db_schema
+from app.utils.db import pool, close_pool, write_queue
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Retrieve the agent instance or perform setup
-    init_db_schema()
+    # Migrations must finish before serving; the heavy components (LLM client, embedding
+    # model, Chroma, agent graph) are built according to WARMUP_MODE, see app.components
+    components.get("db_schema")
+    if WARMUP_MODE == "blocking":
+        await asyncio.to_thread(components.warm_up, background=False)
+    elif WARMUP_MODE == "background":
+        components.warm_up()
+    await session_store.open()
     yield
-    # Cleanup if needed
+    await session_store.close()
+    # Write out buffered interactions before the process exits
+    interaction_logger.shutdown()
+    tool_executor.shutdown()
+    close_pool()
 
 app = FastAPI(title="Agentic Retail Chatbot", lifespan=lifespan)
-agent = get_agent()
+
+
+async def get_agent():
+    """The shared agent; waits (off the event loop) if warm-up has not finished building it yet."""
+    agent = components.peek("agent")
+    if agent is None:
+        agent = await asyncio.to_thread(components.get, "agent")
+    return agent
 
 # === POST /chat ===
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
+    start = time.perf_counter()
     try:
-        response = agent(req.query) 
-        return {"response": response}
+        agent = await get_agent()
+        async with chat_admission.slot():
+            response = await agent.arun(req.query, session_id=req.session_id)
+        elapsed = time.perf_counter() - start
+        CHAT_SECONDS.observe(elapsed, "chat")
+        # run_agent reports failures as an "Agent error: ..." answer rather than raising
+        CHAT_REQUESTS.inc("chat", "error" if response.startswith("Agent error") else "ok")
+        # Only enqueues; the MLflow write happens on the logger thread
+        log_interaction(req.query, response, latency_ms=elapsed * 1000)
+        return {"response": response, "session_id": req.session_id}
+    except Overloaded as e:
+        CHAT_REQUESTS.inc("chat", "rejected")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         import traceback
+        CHAT_REQUESTS.inc("chat", "error")
         print("Agent error:", e)
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
     
-# === GET /health ===
+# === POST /chat/stream (server-sent events) ===
+stream_stats = {"streams": 0, "ttft_ms_total": 0.0, "ttft_ms_max": 0.0}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    try:
+        chat_admission.check()
+    except Overloaded as e:
+        CHAT_REQUESTS.inc("stream", "rejected")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    async def event_source():
+        start = time.perf_counter()
+        first_token = True
+        tools_used = []
+        try:
+            agent = await get_agent()
+            async with chat_admission.slot():
+                async for event, data in agent.astream(req.query, session_id=req.session_id):
+                    if event == "tool_start":
+                        tools_used.append(data["tool"])
+                    elif event == "done":
+                        elapsed = time.perf_counter() - start
+                        CHAT_SECONDS.observe(elapsed, "stream")
+                        CHAT_REQUESTS.inc("stream", "ok")
+                        log_interaction(
+                            req.query,
+                            data["response"],
+                            ",".join(dict.fromkeys(tools_used)) or "auto",
+                            elapsed * 1000,
+                        )
+                    elif event == "error":
+                        CHAT_REQUESTS.inc("stream", "error")
+                    if event == "token" and first_token:
+                        first_token = False
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                        STREAM_TTFT_SECONDS.observe(ttft_ms / 1000)
+                        stream_stats["streams"] += 1
+                        stream_stats["ttft_ms_total"] += ttft_ms
+                        stream_stats["ttft_ms_max"] = max(stream_stats["ttft_ms_max"], ttft_ms)
+                        yield _sse("metrics", {"ttft_ms": round(ttft_ms, 1)})
+                    yield _sse(event, data)
+        except Overloaded as e:
+            CHAT_REQUESTS.inc("stream", "rejected")
+            yield _sse("error", {"detail": e.detail, "status": e.status_code, "retry_after": e.retry_after})
+        except Exception as e:
+            # The agent could not be built (e.g. missing GROQ_API_KEY or RAG store)
+            CHAT_REQUESTS.inc("stream", "error")
+            yield _sse("error", {"detail": f"Agent error: {e}"})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# === POST /chat/batch (NDJSON) ===
+batch_stats = {"batches": 0, "queries": 0, "memo_calls": 0, "memo_shared": 0}
+
+
+async def _batch_item(agent, index: int, query: str) -> dict:
+    start = time.perf_counter()
+    for attempt in range(BATCH_ADMISSION_RETRIES + 1):
+        try:
+            # Batch queries take the same slots as interactive ones, so a big batch can't starve /chat
+            async with chat_admission.slot():
+                response = await agent.arun(query)
+            break
+        except Overloaded as e:
+            if attempt == BATCH_ADMISSION_RETRIES:
+                CHAT_REQUESTS.inc("batch", "rejected")
+                return {"index": index, "query": query, "error": e.detail, "status": e.status_code}
+            await asyncio.sleep(e.retry_after)
+    elapsed = time.perf_counter() - start
+    CHAT_SECONDS.observe(elapsed, "batch")
+    failed = response.startswith("Agent error")
+    CHAT_REQUESTS.inc("batch", "error" if failed else "ok")
+    log_interaction(query, response, latency_ms=elapsed * 1000)
+    if failed:
+        return {"index": index, "query": query, "error": response, "status": 500}
+    return {"index": index, "query": query, "response": response, "latency_ms": round(elapsed * 1000, 1)}
+
+
+@app.post("/chat/batch")
+async def chat_batch(req: BatchRequest):
+    """Answer many queries concurrently, streaming one JSON line per result and a summary line last.
+
+    Identical read calls (same tool or service query, same arguments) made by queries of the
+    same batch run once and are shared, see app.utils.batch_memo.
+    """
+    if not req.queries:
+        raise HTTPException(status_code=422, detail="queries must not be empty")
+    if len(req.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUERIES} queries per batch")
+    parallelism = max(1, min(req.parallelism or BATCH_PARALLELISM, BATCH_MAX_PARALLELISM))
+
+    async def lines():
+        start = time.perf_counter()
+        try:
+            agent = await get_agent()
+        except Exception as e:
+            CHAT_REQUESTS.inc("batch", "error")
+            yield json.dumps({"error": f"Agent error: {e}"}) + "\n"
+            return
+
+        memo = BatchMemo()
+        items = iter(enumerate(req.queries))
+        finished = asyncio.Queue()
+
+        async def worker():
+            # Workers pull the next query when they finish one, so at most `parallelism` run at once
+            for index, query in items:
+                try:
+                    result = await _batch_item(agent, index, query)
+                except Exception as e:
+                    result = {"index": index, "query": query, "error": f"Agent error: {e}", "status": 500}
+                await finished.put(result)
+
+        # Tasks copy the current context, so every query (and the threads it uses) sees this memo
+        with batch_scope(memo):
+            workers = [asyncio.create_task(worker()) for _ in range(parallelism)]
+        errors = 0
+        try:
+            held = {}
+            next_index = 0
+            for _ in range(len(req.queries)):
+                result = await finished.get()
+                errors += "error" in result
+                if not req.ordered:
+                    yield json.dumps(result) + "\n"
+                    continue
+                held[result["index"]] = result
+                while next_index in held:
+                    yield json.dumps(held.pop(next_index)) + "\n"
+                    next_index += 1
+        finally:
+            # Client went away: stop starting new queries
+            for w in workers:
+                w.cancel()
+
+        shared = memo.stats()
+        BATCH_MEMO_CALLS.inc("executed", amount=shared["executed"])
+        BATCH_MEMO_CALLS.inc("shared", amount=shared["shared"])
+        batch_stats["batches"] += 1
+        batch_stats["queries"] += len(req.queries)
+        batch_stats["memo_calls"] += shared["calls"]
+        batch_stats["memo_shared"] += shared["shared"]
+        yield json.dumps({
+            "done": True,
+            "count": len(req.queries),
+            "ok": len(req.queries) - errors,
+            "errors": errors,
+            "parallelism": parallelism,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            "shared_calls": shared,
+        }) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# === GET /health (liveness) and /ready (readiness) ===
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
-# === GET /metrics (placeholder) ===
-@app.get("/metrics")
-def metrics():
+
+@app.get("/ready")
+def ready():
+    """200 once every component is built, 503 while warming up or after a failed build."""
+    stats = components.stats()
+    if stats["ready"]:
+        return {"status": "ready", **stats}
+    return JSONResponse(status_code=503, content={"status": "starting", **stats})
+
+# === GET /metrics (Prometheus) and /metrics/json ===
+async def _component_stats() -> dict:
+    # Don't make a metrics scrape build the policy tool or load the embedding model
+    return_policy_tools = components.peek("return_policy")
+    embeddings = components.peek("embeddings")
+    return {
+        "startup": components.stats(),
+        "sessions": await session_store.stats(),
+        "fast_path": fast_path_router.stats(),
+        "tool_selection": tool_selector.stats(),
+        "admission": chat_admission.stats(),
+        "batch": dict(batch_stats),
+        "return_policy_cache": return_policy_tools.cache.stats() if return_policy_tools else {},
+        "policy_facts": policy_facts.stats(),
+        "result_cache": result_cache.stats(),
+        "embeddings": embeddings.stats() if embeddings else {},
+        "db_pool": pool.stats(),
+        "db_writer": write_queue.stats(),
+        "interaction_logging": interaction_logger.stats(),
+        "streaming": {
+            "streams": stream_stats["streams"],
+            "avg_ttft_ms": round(stream_stats["ttft_ms_total"] / stream_stats["streams"], 1) if stream_stats["streams"] else 0.0,
+            "max_ttft_ms": round(stream_stats["ttft_ms_max"], 1),
+        },
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render_prometheus(await _component_stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.get("/metrics/json")
+async def metrics_json():
+    histograms = registry.snapshot()
+    chat = histograms["chat_duration_seconds"]
+    answered = sum(v["count"] for v in chat.values())
+    tools_used = {}
+    for key, count in histograms["tool_calls_total"].items():
+        tool = key.split(",")[0]
+        tools_used[tool] = tools_used.get(tool, 0) + count
     return {
-        "total_queries": 0,
-        "tools_used": {},
-        "avg_response_time_ms": 0
+        "total_queries": sum(histograms["chat_requests_total"].values()),
+        "tools_used": tools_used,
+        "avg_response_time_ms": round(sum(v["avg_ms"] * v["count"] for v in chat.values()) / answered, 1) if answered else 0,
+        "instruments": histograms,
+        **(await _component_stats()),
     }
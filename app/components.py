@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+import traceback
+
+# "background" builds every component on a thread at startup (the default), "blocking"
+# builds them before the app starts serving, "lazy" waits for the first request that needs one
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+
+
+class Component:
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self.value = None
+        self.state = "pending"  # pending -> building -> ready | failed
+        self.error = None
+        self.build_s = None
+        self.lock = threading.Lock()
+
+
+class ComponentRegistry:
+    """Builds each heavy shared resource (LLM client, embedding model, Chroma, agent graph) exactly once.
+
+    Factories run on first get(), under a per-component lock so concurrent callers
+    wait for the same build instead of starting their own. A factory may get() the
+    components it depends on; warm_up() builds them in registration order, so each
+    build time in stats() is the component's own, not its dependencies'.
+    """
+
+    def __init__(self):
+        self._components = {}
+        self._warmup_thread = None
+        self._warmup_s = None
+
+    def register(self, name: str, factory):
+        self._components[name] = Component(name, factory)
+
+    def get(self, name: str):
+        component = self._components[name]
+        if component.state == "ready":
+            return component.value
+        with component.lock:
+            if component.state != "ready":
+                # A failed build is retried by the next caller (e.g. the RAG store was still being written)
+                component.state = "building"
+                start = time.perf_counter()
+                try:
+                    component.value = component.factory()
+                except Exception as e:
+                    component.state = "failed"
+                    component.error = f"{type(e).__name__}: {e}"
+                    print(f"Component '{name}' failed to build:\n", traceback.format_exc())
+                    raise
+                finally:
+                    component.build_s = time.perf_counter() - start
+                component.state = "ready"
+                component.error = None
+                print(f"Component '{name}' ready in {component.build_s * 1000:.0f} ms")
+        return component.value
+
+    def peek(self, name: str):
+        """The component if it is already built, else None; never triggers a build."""
+        component = self._components[name]
+        return component.value if component.state == "ready" else None
+
+    def is_ready(self, names=None) -> bool:
+        return all(self._components[n].state == "ready" for n in (names or self._components))
+
+    def warm_up(self, names=None, background: bool = True):
+        """Build the given components (default: all) in order, optionally on a daemon thread."""
+        names = list(names or self._components)
+
+        def run():
+            start = time.perf_counter()
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass  # recorded in stats(); the next get() retries
+            self._warmup_s = time.perf_counter() - start
+
+        if not background:
+            run()
+            return None
+        self._warmup_thread = threading.Thread(target=run, name="component-warmup", daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def stats(self) -> dict:
+        components = {
+            c.name: {
+                "state": c.state,
+                "build_ms": round(c.build_s * 1000, 1) if c.build_s is not None else None,
+                **({"error": c.error} if c.error else {}),
+            }
+            for c in self._components.values()
+        }
+        return {
+            "ready": self.is_ready(),
+            "warmup_mode": WARMUP_MODE,
+            "warmup_ms": round(self._warmup_s * 1000, 1) if self._warmup_s is not None else None,
+            "build_ms_total": round(sum(c.build_s or 0.0 for c in self._components.values()) * 1000, 1),
+            "components": components,
+        }
+
+
+components = ComponentRegistry()
+
+
+# Factories import lazily so that importing app.api stays cheap and nothing heavy loads twice
+def _build_db_schema():
+    from app.utils.db import init_db_schema
+    init_db_schema()
+    return True
+
+
+def _build_llm():
+    from app.llm import load_llm
+    return load_llm()
+
+
+def _build_embeddings():
+    from app.utils.embedding_service import build_embedding_service
+    return build_embedding_service()
+
+
+def _build_return_policy():
+    from app.tools.return_policy import ReturnPolicyTools
+    return ReturnPolicyTools(llm=components.get("llm"), embedding_fn=components.get("embeddings"))
+
+
+def _build_agent():
+    from app.agent import get_agent
+    return get_agent()
+
+
+components.register("db_schema", _build_db_schema)
+components.register("llm", _build_llm)
+components.register("embeddings", _build_embeddings)
+components.register("return_policy", _build_return_policy)
+components.register("agent", _build_agent)
@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import asynccontextmanager
+
+from app.utils.db import LazyExecutor
+
+# Per-worker limits; each uvicorn worker process gets its own controller
+MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "8"))
+MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "32"))
+QUEUE_TIMEOUT_S = float(os.getenv("CHAT_QUEUE_TIMEOUT_S", "30"))
+RETRY_AFTER_S = int(os.getenv("CHAT_RETRY_AFTER_S", "2"))
+# /chat/batch: concurrent queries per batch (default and cap), largest batch accepted, and how often
+# a query retries admission (after Retry-After) before it is reported as rejected
+BATCH_PARALLELISM = int(os.getenv("CHAT_BATCH_PARALLELISM", "4"))
+BATCH_MAX_PARALLELISM = int(os.getenv("CHAT_BATCH_MAX_PARALLELISM", str(MAX_IN_FLIGHT)))
+BATCH_MAX_QUERIES = int(os.getenv("CHAT_BATCH_MAX_QUERIES", "5000"))
+BATCH_ADMISSION_RETRIES = int(os.getenv("CHAT_BATCH_ADMISSION_RETRIES", "3"))
+# Tool calls one request may run at once when the LLM asks for several in one step
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+# Threads for blocking tool bodies: by default every admitted request can use its full tool allowance.
+# Their queries still share the DB_POOL_SIZE readers, which is the real limit on concurrent queries
+# (waits and timeouts show up under db_pool in /metrics)
+TOOL_EXECUTOR_THREADS = int(os.getenv("TOOL_EXECUTOR_THREADS", str(MAX_IN_FLIGHT * TOOL_MAX_CONCURRENCY)))
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; carries the HTTP status and Retry-After."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bound in-flight requests with a semaphore and the number of waiters with a counter.
+
+    - Below max_in_flight: admitted immediately.
+    - Otherwise wait in a queue of at most max_queue requests.
+    - Queue full -> 429, waited longer than queue_timeout -> 503, both with Retry-After.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_queue: int = MAX_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT_S,
+        retry_after: int = RETRY_AFTER_S,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._sem = asyncio.Semaphore(max_in_flight)
+        # Counters are only touched from the event loop, so no lock is needed
+        self._in_flight = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._rejected_timeout = 0
+        self._queued = 0
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+
+    def check(self):
+        """Fail fast with 429 when the wait queue is already full."""
+        if self._sem.locked() and self._waiting >= self.max_queue:
+            self._rejected_queue_full += 1
+            raise Overloaded(429, "Too many requests queued, retry later", self.retry_after)
+
+    async def _acquire(self):
+        if not self._sem.locked():
+            await self._sem.acquire()
+            return 0.0
+
+        self.check()
+        self._waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected_timeout += 1
+            raise Overloaded(503, "Timed out waiting for a free worker slot", self.retry_after)
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - start
+        self._queued += 1
+        self._wait_total_s += waited
+        self._wait_max_s = max(self._wait_max_s, waited)
+        return waited
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one in-flight slot for the duration of the block."""
+        await self._acquire()
+        self._in_flight += 1
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._sem.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "admitted": self._admitted,
+            "queued": self._queued,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_timeout": self._rejected_timeout,
+            "avg_wait_ms": round(self._wait_total_s / self._queued * 1000, 2) if self._queued else 0.0,
+            "max_wait_ms": round(self._wait_max_s * 1000, 2),
+        }
+
+
+chat_admission = AdmissionController()
+
+
+# ---------- Per-request tool concurrency ----------
+
+_tool_slots = contextvars.ContextVar("tool_slots", default=None)
+
+
+def limit_tool_concurrency(limit: int = TOOL_MAX_CONCURRENCY):
+    """Give the current request (task) its own cap on concurrent tool calls."""
+    _tool_slots.set(asyncio.Semaphore(max(1, limit)))
+
+
+# Separate from db_executor, so tool calls never queue behind the fast path or bulk cancellations
+tool_executor = LazyExecutor(TOOL_EXECUTOR_THREADS, "tool")
+
+
+@asynccontextmanager
+async def tool_slot():
+    """Hold one of the current request's tool slots; no limit outside a request."""
+    slots = _tool_slots.get()
+    if slots is None:
+        yield
+        return
+    async with slots:
+        yield
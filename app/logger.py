@@ -1,7 +1,12 @@
 import os
+import queue
+import threading
+import time
 from pathlib import Path
 import mlflow
 from datetime import datetime
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
 
 # Force MLflow to use a local file-based tracking URI and avoid bad env overrides
 try:
@@ -16,15 +21,181 @@ except Exception:
     # Non-fatal; logging will still attempt defaults
     pass
 
-def log_interaction(query: str, response: str, tool_used: str = "auto"):
-    try:
-        mlflow.start_run(run_name=f"chat-{datetime.now().isoformat()}", nested=True)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "1000"))
+LOG_FLUSH_INTERVAL_S = float(os.getenv("LOG_FLUSH_INTERVAL_S", "60"))
+LOG_MAX_BATCH = int(os.getenv("LOG_MAX_BATCH", "500"))
 
-        mlflow.log_param("query", query)
-        mlflow.log_param("tool_used", tool_used)
-        mlflow.log_text(response, "response.txt")
-        mlflow.log_metric("response_length", len(response))
+# Artifact holding every interaction of a batched run, in MLflow's table layout
+INTERACTIONS_ARTIFACT = "interactions.json"
+INTERACTION_COLUMNS = ["timestamp", "query", "tool_used", "response", "latency_ms"]
 
-        mlflow.end_run()
-    except Exception as e:
-        print("⚠️ Logging failed:", e)
+_STOP = object()
+
+
+class InteractionLogger:
+    """Buffer interactions in memory and write them to MLflow from a worker thread.
+
+    Each flush creates one run holding the whole window: counts as params,
+    per-interaction metrics through log_batch and the rows as a
+    table artifact. When the queue is full new interactions are dropped and
+    counted rather than blocking the caller.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = LOG_QUEUE_SIZE,
+        flush_interval_s: float = LOG_FLUSH_INTERVAL_S,
+        max_batch: int = LOG_MAX_BATCH,
+    ):
+        self.flush_interval_s = flush_interval_s
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._client = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.runs = 0
+        self.failures = 0
+        self.last_write_ms = 0.0
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="interaction-logger", daemon=True)
+                self._worker.start()
+
+    def log(self, query: str, response: str, tool_used: str = "auto", latency_ms: float = None):
+        """Queue one interaction; never blocks."""
+        self._ensure_worker()
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "query": query,
+            "tool_used": tool_used,
+            "response": response,
+            "latency_ms": None if latency_ms is None else round(latency_ms, 1),
+        }
+        try:
+            self._queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval_s
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            # None means the window elapsed, an Event is a flush request
+            if isinstance(item, dict):
+                batch.append(item)
+                if len(batch) < self.max_batch:
+                    continue
+            if batch:
+                self._write(batch)
+                batch = []
+            deadline = time.monotonic() + self.flush_interval_s
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
+    def _write(self, batch: list):
+        start = time.perf_counter()
+        try:
+            if self._client is None:
+                self._client = MlflowClient()
+            client = self._client
+            run = client.create_run(
+                experiment_id="0",
+                run_name=f"chat-batch-{batch[0]['timestamp']}",
+                tags={"log_format": "batched"},
+            )
+            run_id = run.info.run_id
+            now_ms = int(time.time() * 1000)
+            tools = {}
+            for r in batch:
+                # Streaming turns record every tool they called, comma separated
+                for name in (r["tool_used"] or "unknown").split(","):
+                    tools[name] = tools.get(name, 0) + 1
+
+            params = [
+                Param("interactions", str(len(batch))),
+                Param("window_start", batch[0]["timestamp"]),
+                Param("window_end", batch[-1]["timestamp"]),
+            ] + [Param(f"tool_used.{name}", str(count)) for name, count in sorted(tools.items())]
+            metrics = []
+            for step, r in enumerate(batch):
+                metrics.append(Metric("response_length", len(r["response"] or ""), now_ms, step))
+                if r["latency_ms"] is not None:
+                    metrics.append(Metric("latency_ms", r["latency_ms"], now_ms, step))
+            # log_batch caps a single call at 1000 metrics
+            for i in range(0, max(len(metrics), 1), 1000):
+                client.log_batch(run_id, metrics=metrics[i:i + 1000], params=params if i == 0 else ())
+
+            client.log_dict(
+                run_id,
+                {
+                    "columns": INTERACTION_COLUMNS,
+                    "data": [[r[c] for c in INTERACTION_COLUMNS] for r in batch],
+                },
+                INTERACTIONS_ARTIFACT,
+            )
+            client.set_terminated(run_id)
+            self.written += len(batch)
+            self.runs += 1
+        except Exception as e:
+            self.failures += 1
+            print("⚠️ Logging failed:", e)
+        finally:
+            self.last_write_ms = (time.perf_counter() - start) * 1000
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Write everything queued so far; returns False if the worker did not finish in time."""
+        if self._worker is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: float = 10.0):
+        """Flush pending interactions and stop the worker (called from the API lifespan)."""
+        flushed = self.flush(timeout)
+        worker = self._worker
+        if worker is None:
+            return flushed
+        self._worker = None
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return False
+        worker.join(timeout)
+        return flushed
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_write_ms": round(self.last_write_ms, 1),
+        }
+
+
+interaction_logger = InteractionLogger()
+
+
+def log_interaction(query: str, response: str, tool_used: str = "auto", latency_ms: float = None):
+    interaction_logger.log(query, response, tool_used, latency_ms)
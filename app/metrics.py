@@ -0,0 +1,303 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Latency buckets in seconds (Prometheus convention), shared by every latency histogram
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+class _Metric:
+    """Per-thread shards of {label values: state}.
+
+    Each thread only ever writes its own shard, so the hot path takes no lock;
+    readers sum the shards, which may be a few increments behind.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _collect(self) -> dict:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _collect(self) -> dict:
+        totals = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS, unit: str = "seconds"):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self.unit = unit
+
+    def observe(self, seconds: float, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [per-bucket counts (last one is +Inf), sum, max]
+            state = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0.0]
+        state[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        state[1] += seconds
+        if seconds > state[2]:
+            state[2] = seconds
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _collect(self) -> dict:
+        totals = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labels, (counts, total, peak) in list(shard.items()):
+                agg = totals.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0.0])
+                for i, c in enumerate(counts):
+                    agg[0][i] += c
+                agg[1] += total
+                agg[2] = max(agg[2], peak)
+        return totals
+
+    def quantile(self, counts, q: float, peak: float) -> float:
+        """Estimate a quantile from bucket counts by interpolating inside the bucket, capped at the max seen."""
+        n = sum(counts)
+        if not n:
+            return 0.0
+        rank = q * n
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else peak
+                return min(lower + (upper - lower) * (rank - seen) / c, peak)
+            seen += c
+        return peak
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "retail"):
+        self.prefix = prefix
+        self._metrics = []
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        metric = Counter(f"{self.prefix}_{name}", help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS, unit: str = "seconds") -> Histogram:
+        metric = Histogram(f"{self.prefix}_{name}", help, labelnames, buckets, unit)
+        self._metrics.append(metric)
+        return metric
+
+    def render_prometheus(self, gauges: dict = None) -> str:
+        """Prometheus text exposition; `gauges` maps component name -> stats dict."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in sorted(metric._collect().items()):
+                if metric.kind == "counter":
+                    lines.append(f"{metric.name}{_label_str(metric.labelnames, labels)} {value}")
+                    continue
+                counts, total, _ = value
+                cumulative = 0
+                for bound, c in zip(metric.buckets + ("+Inf",), counts):
+                    cumulative += c
+                    le = _label_str(metric.labelnames, labels, f'le="{bound}"')
+                    lines.append(f"{metric.name}_bucket{le} {cumulative}")
+                lines.append(f"{metric.name}_sum{_label_str(metric.labelnames, labels)} {total}")
+                lines.append(f"{metric.name}_count{_label_str(metric.labelnames, labels)} {cumulative}")
+
+        # Component stats (admission, pool, caches, ...) as plain gauges
+        for component, stats in (gauges or {}).items():
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"{self.prefix}_{component}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """JSON view: counters as totals, histograms as count/avg/p50/p95/p99/max (latencies in milliseconds)."""
+        out = {}
+        for metric in self._metrics:
+            short = metric.name[len(self.prefix) + 1:]
+            series = {}
+            for labels, value in sorted(metric._collect().items()):
+                key = ",".join(str(v) for v in labels) or "all"
+                if metric.kind == "counter":
+                    series[key] = value
+                    continue
+                counts, total, peak = value
+                n = sum(counts)
+                if metric.unit != "seconds":
+                    series[key] = {
+                        "count": n,
+                        "avg": round(total / n, 2) if n else 0.0,
+                        "p50": round(metric.quantile(counts, 0.50, peak), 2),
+                        "p95": round(metric.quantile(counts, 0.95, peak), 2),
+                        "max": round(peak, 2),
+                    }
+                    continue
+                series[key] = {
+                    "count": n,
+                    "avg_ms": round(total / n * 1000, 2) if n else 0.0,
+                    "p50_ms": round(metric.quantile(counts, 0.50, peak) * 1000, 2),
+                    "p95_ms": round(metric.quantile(counts, 0.95, peak) * 1000, 2),
+                    "p99_ms": round(metric.quantile(counts, 0.99, peak) * 1000, 2),
+                    "max_ms": round(peak * 1000, 2),
+                }
+            out[short] = series
+        return out
+
+
+registry = MetricsRegistry()
+
+CHAT_REQUESTS = registry.counter("chat_requests_total", "Chat requests by endpoint and outcome", ("endpoint", "outcome"))
+CHAT_SECONDS = registry.histogram("chat_duration_seconds", "End-to-end chat latency", ("endpoint",))
+STREAM_TTFT_SECONDS = registry.histogram("stream_ttft_seconds", "Time to first streamed token")
+LLM_CALLS = registry.counter("llm_calls_total", "LLM calls by outcome", ("outcome",))
+LLM_SECONDS = registry.histogram("llm_call_duration_seconds", "Latency of each LLM call")
+LLM_TOKENS = registry.counter("llm_tokens_total", "Tokens reported by the LLM provider", ("direction",))
+LLM_INPUT_TOKENS = registry.histogram("llm_input_tokens", "Prompt tokens per LLM call", buckets=TOKEN_BUCKETS, unit="tokens")
+PROMPT_TOKENS_EST = registry.counter(
+    "agent_prompt_tokens_estimated_total",
+    "Estimated system prompt + tool schema tokens per agent run, as sent (selected) and with every tool (all_tools)",
+    ("variant",),
+)
+BATCH_MEMO_CALLS = registry.counter(
+    "batch_memo_calls_total", "Service and tool calls inside /chat/batch, run (executed) or reused (shared)", ("outcome",)
+)
+TOOL_CALLS = registry.counter("tool_calls_total", "Tool calls by tool and outcome", ("tool", "outcome"))
+TOOL_SECONDS = registry.histogram("tool_duration_seconds", "Latency of each tool call", ("tool",))
+RESULT_CACHE_LOOKUPS = registry.counter("result_cache_lookups_total", "Service result cache lookups by function and outcome", ("function", "outcome"))
+SQL_SECONDS = registry.histogram("sql_query_duration_seconds", "Latency of each service query", ("query",))
+RETRIEVAL_SECONDS = registry.histogram("retrieval_duration_seconds", "Return-policy retrieval latency by stage", ("stage",))
+POLICY_FACT_LOOKUPS = registry.counter("policy_fact_lookups_total", "Policy questions looked up in the facts table by outcome", ("outcome",))
+POLICY_CONTEXT_CHUNKS = registry.histogram("policy_context_chunks", "Policy chunks sent to the LLM per question", buckets=SIZE_BUCKETS, unit="chunks")
+EMBED_BATCH_SIZE = registry.histogram("embedding_batch_size", "Texts per embedding model call", buckets=SIZE_BUCKETS, unit="texts")
+EMBED_QUEUE_SECONDS = registry.histogram("embedding_queue_seconds", "Wait from submitting texts to their batch starting")
+EMBED_SECONDS = registry.histogram("embedding_batch_duration_seconds", "Embedding model time per batch")
+DB_WRITE_BATCH_SIZE = registry.histogram("db_write_batch_size", "Queued writes committed per transaction", buckets=SIZE_BUCKETS, unit="writes")
+DB_WRITE_QUEUE_SECONDS = registry.histogram("db_write_queue_seconds", "Wait from submitting a write to its transaction starting")
+
+
+def timed(histogram: Histogram, label: str = None):
+    """Decorator recording each call of the function under `label`, by default its own name."""
+
+    def decorator(func):
+        name = label or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, name)
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times LLM and tool runs by run_id; pass it in the graph config's callbacks."""
+
+    # Run in the caller's thread/event loop instead of a thread-pool hop per event
+    run_inline = True
+
+    def __init__(self):
+        self._starts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            LLM_SECONDS.observe(time.perf_counter() - start)
+        LLM_CALLS.inc("ok")
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.inc("input", amount=usage.get("input_tokens", 0))
+                    LLM_TOKENS.inc("output", amount=usage.get("output_tokens", 0))
+                    LLM_INPUT_TOKENS.observe(usage.get("input_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+        LLM_CALLS.inc("error")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._starts[run_id] = (time.perf_counter(), name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            start, name = started
+            TOOL_SECONDS.observe(time.perf_counter() - start, name)
+            TOOL_CALLS.inc(name, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            TOOL_CALLS.inc(started[1], "error")
+
+
+metrics_callback = MetricsCallbackHandler()
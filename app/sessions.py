@@ -0,0 +1,145 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+# Relative to the repo root, like DB_PATH; a separate file so checkpoint writes never queue behind the retail DB
+SESSIONS_DB_PATH = str((Path(__file__).resolve().parents[1] / os.getenv("SESSIONS_DB_PATH", "db/sessions.db")).resolve())
+# Earlier turns kept per session (each as the user's question + the final answer)
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "6"))
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", "1800"))
+SESSION_EVICT_INTERVAL_S = float(os.getenv("SESSION_EVICT_INTERVAL_S", "300"))
+
+
+def window_history(messages, max_turns: int = SESSION_MAX_TURNS):
+    """Split a session's messages into (kept, dropped) so the prompt stays bounded.
+
+    The current turn (from the last HumanMessage on) is kept whole. Earlier turns are
+    condensed to the question and the final answer, without the tool calls and tool
+    output in between, and only the last `max_turns` of them are kept.
+    """
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    if len(turns) <= 1:
+        return list(messages), []
+
+    kept = []
+    for turn in turns[:-1][-max_turns:] if max_turns > 0 else []:
+        kept.append(turn[0])
+        final = next(
+            (m for m in reversed(turn) if isinstance(m, AIMessage) and m.content and not m.tool_calls),
+            None,
+        )
+        if final is not None:
+            kept.append(final)
+    kept += turns[-1]
+    kept_ids = {id(m) for m in kept}
+    return kept, [m for m in messages if id(m) not in kept_ids]
+
+
+class SessionStore:
+    """LangGraph checkpointer for conversation sessions in a local SQLite file, plus idle eviction.
+
+    Each run writes one checkpoint when the graph exits (durability="exit"), through
+    aiosqlite's thread and in WAL mode, so the event loop never blocks on disk. A sessions
+    table tracks last use so idle sessions can be deleted on a timer.
+    """
+
+    def __init__(self, path: str = SESSIONS_DB_PATH, ttl_s: float = SESSION_TTL_S):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.saver = None
+        self._conn = None
+        self._evictor = None
+        self._evicted = 0
+        self._turns = 0
+
+    async def open(self):
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = await aiosqlite.connect(self.path)
+        self.saver = AsyncSqliteSaver(self._conn)
+        await self.saver.setup()
+        async with self.saver.lock:
+            await self._conn.execute("PRAGMA synchronous=NORMAL")
+            await self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " thread_id TEXT PRIMARY KEY, created REAL NOT NULL, last_seen REAL NOT NULL, turns INTEGER NOT NULL)"
+            )
+            await self._conn.commit()
+        self._evictor = asyncio.create_task(self._evict_loop())
+
+    @property
+    def is_open(self) -> bool:
+        return self.saver is not None
+
+    def config(self, session_id: str) -> dict:
+        return {"configurable": {"thread_id": session_id}}
+
+    async def touch(self, session_id: str):
+        now = time.time()
+        self._turns += 1
+        async with self.saver.lock:
+            await self._conn.execute(
+                "INSERT INTO sessions (thread_id, created, last_seen, turns) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen, turns = turns + 1",
+                (session_id, now, now),
+            )
+            await self._conn.commit()
+
+    async def evict_idle(self) -> int:
+        cutoff = time.time() - self.ttl_s
+        async with self.saver.lock:
+            async with self._conn.execute("SELECT thread_id FROM sessions WHERE last_seen < ?", (cutoff,)) as cur:
+                idle = [row[0] for row in await cur.fetchall()]
+        for thread_id in idle:
+            await self.saver.adelete_thread(thread_id)
+        if idle:
+            async with self.saver.lock:
+                await self._conn.executemany("DELETE FROM sessions WHERE thread_id = ?", [(t,) for t in idle])
+                await self._conn.commit()
+            self._evicted += len(idle)
+            print(f"Evicted {len(idle)} idle sessions")
+        return len(idle)
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(SESSION_EVICT_INTERVAL_S)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                print(f"Session eviction failed: {e}")
+
+    async def stats(self) -> dict:
+        if not self.is_open:
+            return {"open": False}
+        async with self.saver.lock:
+            async with self._conn.execute("SELECT COUNT(*) FROM sessions") as cur:
+                active = (await cur.fetchone())[0]
+        return {
+            "open": True,
+            "active_sessions": active,
+            "turns": self._turns,
+            "evicted": self._evicted,
+            "max_turns": SESSION_MAX_TURNS,
+            "ttl_s": self.ttl_s,
+        }
+
+    async def close(self):
+        if self._evictor is not None:
+            self._evictor.cancel()
+        if self._conn is not None:
+            await self._conn.close()
+        self.saver = None
+        self._conn = None
+
+
+session_store = SessionStore()
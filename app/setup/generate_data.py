@@ -0,0 +1,140 @@
+"""Generate large synthetic products/orders/users CSVs in the same layout as data/*.csv.
+
+Rows are written as they are generated, so memory stays flat at any size:
+
+    python app/setup/generate_data.py --products 200000 --orders 5000000 --users 500000 --out data/generated
+    python app/setup/init_sqlite.py --data-dir data/generated
+"""
+import argparse
+import csv
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# category -> (product lines, price range, return window in days, share of non-returnable items)
+CATALOGUE = {
+    "shoes": (["Running Shoes", "Sneakers", "Trail Runner", "Walking Shoes", "Sandals", "Flip Flops"], (499, 15999), 30, 0.0),
+    "laptop": (["Laptop", "Notebook", "Gaming Laptop", "Ultrabook", "Chromebook", "2-in-1 Laptop"], (24999, 189999), 10, 0.0),
+    "phone": (["Smartphone", "5G Phone", "Feature Phone", "Foldable Phone"], (999, 149999), 7, 0.0),
+    "accessories": (["Earbuds", "Headphones", "Wireless Mouse", "Backpack", "Power Bank", "Smartwatch", "Monitor",
+                     "Keyboard", "Printer", "USB-C Cable"], (199, 29999), 10, 0.15),
+    "home": (["Electric Kettle", "Air Fryer", "Mixer Grinder", "Toaster", "Water Purifier", "Vacuum Cleaner"],
+             (699, 24999), 10, 0.05),
+}
+BRANDS = {
+    "shoes": ["Nike", "Adidas", "Puma", "Reebok", "Skechers", "Bata", "Asics", "New Balance", "Campus", "Woodland"],
+    "laptop": ["HP", "Lenovo", "ASUS", "Dell", "Acer", "Apple", "MSI", "Samsung", "Avita", "Infinix"],
+    "phone": ["Apple", "Samsung", "OnePlus", "Redmi", "Realme", "Vivo", "Oppo", "Motorola", "Nothing", "iQOO"],
+    "accessories": ["Boat", "Logitech", "Sony", "JBL", "Noise", "Fire-Boltt", "Wildcraft", "Mi", "Canon", "Zebronics"],
+    "home": ["Philips", "Prestige", "Bajaj", "Havells", "Pigeon", "Kent", "Usha", "Morphy Richards", "Eureka Forbes", "Inalsa"],
+}
+FEATURES = {
+    "shoes": ["with foam sole", "with Boost midsole", "with rubber outsole", "breathable mesh upper", "water resistant"],
+    "laptop": ["with Intel i5", "with Ryzen 5", "with RTX 3050", "with 16GB RAM", "with 512GB SSD", "14-inch FHD display"],
+    "phone": ["with AMOLED display", "with fast charging", "108MP camera", "5000mAh battery", "with 5G support"],
+    "accessories": ["noise cancelling", "Bluetooth 5.3", "fast charging", "ergonomic design", "42h playback", "IPS panel"],
+    "home": ["stainless steel body", "1.5L capacity", "energy efficient", "with auto shut-off", "rapid air technology"],
+}
+MODEL_SUFFIXES = ["", " Pro", " Plus", " Lite", " Max", " Neo", " 2", " 3", " 5", " X", " S", " Prime"]
+# Status mix of a mature store; delivered/returned orders get a delivered_date
+STATUSES = [("delivered", 0.60), ("shipped", 0.12), ("processing", 0.10), ("pending", 0.05),
+            ("cancelled", 0.08), ("returned", 0.05)]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ishaan", "Ananya", "Diya", "Priya", "Kavya", "Rohan", "Sneha",
+               "Arjun", "Meera", "Rahul", "Pooja", "Karan", "Neha", "Vikram", "Simran", "Nikhil", "Aisha"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Patel", "Gupta", "Singh", "Nair", "Das", "Kumar",
+              "Menon", "Joshi", "Rao", "Mehta", "Kapoor", "Chopra", "Bose", "Pillai", "Shah", "Khan"]
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Chennai", "Hyderabad", "Pune", "Kolkata", "Ahmedabad", "Jaipur", "Kochi"]
+
+FIRST_PRODUCT_ID = 101
+FIRST_USER_ID = 2001
+FIRST_ORDER_ID = 100000
+
+
+def _report(name: str, rows: int, start: float):
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)" if elapsed else f"{name}: {rows:,} rows")
+
+
+def write_products(path: Path, n: int, rng: random.Random):
+    start = time.perf_counter()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "name", "category", "price", "description", "is_returnable", "return_window_days"])
+        categories = list(CATALOGUE)
+        for i in range(n):
+            category = rng.choice(categories)
+            lines, (low, high), window, non_returnable = CATALOGUE[category]
+            brand = rng.choice(BRANDS[category])
+            line = rng.choice(lines)
+            name = f"{brand} {line}{rng.choice(MODEL_SUFFIXES)} {rng.randint(1, 999)}"
+            # Prices cluster towards the cheap end and end in 9 like real listings
+            price = int(low + (high - low) * rng.random() ** 2) // 10 * 10 + 9
+            description = f"{line} {rng.choice(FEATURES[category])}, {rng.choice(FEATURES[category])}"
+            returnable = 0 if rng.random() < non_returnable else 1
+            w.writerow([FIRST_PRODUCT_ID + i, name, category, price, description, returnable, window])
+    _report("products", n, start)
+
+
+def write_users(path: Path, n: int, rng: random.Random, today: date):
+    start = time.perf_counter()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["user_id", "name", "email", "city", "joined_date"])
+        for i in range(n):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            user_id = FIRST_USER_ID + i
+            joined = today - timedelta(days=rng.randint(0, 5 * 365))
+            w.writerow([user_id, f"{first} {last}", f"{first}.{last}{user_id}@example.com".lower(),
+                        rng.choice(CITIES), joined.isoformat()])
+    _report("users", n, start)
+
+
+def write_orders(path: Path, n: int, products: int, users: int, rng: random.Random, today: date, days: int):
+    start = time.perf_counter()
+    statuses, weights = zip(*STATUSES)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["order_id", "user_id", "product_id", "status", "ordered_date", "delivered_date"])
+        for i in range(n):
+            # A few heavy buyers and popular products, a long tail of everything else
+            if rng.random() < 0.3:
+                user_id = FIRST_USER_ID + min(int(rng.paretovariate(1.2)) - 1, users - 1)
+            else:
+                user_id = FIRST_USER_ID + rng.randrange(users)
+            product_id = FIRST_PRODUCT_ID + min(int(rng.expovariate(1 / max(products / 20, 1))), products - 1)
+            ordered = today - timedelta(days=rng.randint(0, days))
+            status = rng.choices(statuses, weights)[0]
+            # Orders from the last few days are still in flight whatever the draw said
+            age = (today - ordered).days
+            if age < 2 and status in ("delivered", "returned"):
+                status = "processing"
+            delivered = ""
+            if status in ("delivered", "returned"):
+                delivered = min(ordered + timedelta(days=rng.randint(1, 7)), today).isoformat()
+            w.writerow([FIRST_ORDER_ID + i, user_id, product_id, status, ordered.isoformat(), delivered])
+    _report("orders", n, start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365, help="spread order dates over this many days")
+    parser.add_argument("--out", default="data/generated")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(args.seed)
+    today = date.today()
+    write_products(out / "products.csv", args.products, rng)
+    write_users(out / "users.csv", args.users, rng, today)
+    write_orders(out / "orders.csv", args.orders, args.products, args.users, rng, today, args.days)
+    print(f"✅ Synthetic data written to {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
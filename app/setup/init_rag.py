@@ -1,53 +1,244 @@
+"""Sync the policy collection with every policy document under a directory, incrementally.
+
+    python app/setup/init_rag.py                         # data/**/*.txt|*.md -> RAG_DIR
+    python app/setup/init_rag.py --docs-dir data/policies --report rag_sync.json
+    python app/setup/init_rag.py --rebuild               # drop the collection and embed everything
+
+Files are hashed first; unchanged files are skipped without even being chunked.
+Changed or new files are chunked in parallel and each chunk is hashed, so only
+chunks whose text is new get embedded (in batches). Chunks that no longer exist
+are deleted and chunks that only moved get their metadata updated. Running
+ReturnPolicyTools instances are told to reload only when something changed.
+
+Deadlines, eligibility rules and category exceptions are also extracted from every
+document into the policy_facts table, which answers common questions without RAG.
+"""
+import argparse
+import hashlib
+import json
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 from dotenv import load_dotenv
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import CharacterTextSplitter
 
 import chromadb
-from chromadb.utils import embedding_functions
 
+# Before the app imports below, which read their settings at import time
 load_dotenv()
 
-# Load env vars or defaults
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+# Allow running as a script (python app/setup/init_rag.py) as well as a module
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.utils.embedding_service import EMBEDDING_MODEL, build_embedding_service
+from app.utils.policy_facts import extract_facts, store_facts
+from app.utils.semantic_cache import write_build_stamp
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Load env vars or defaults (EMBEDDING_BACKEND etc. are read by the embedding service)
 RAG_DIR = os.getenv("RAG_DIR", "rag_db")
 COLLECTION_NAME = os.getenv("RAG_COLLECTION", "return_policy")
+POLICY_DOCS_DIR = os.getenv("POLICY_DOCS_DIR", "data")
+DOC_PATTERNS = ("*.txt", "*.md")
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_file(path: str, source: str, chunk_size: int, chunk_overlap: int):
+    """Split one document; runs in a worker process. Returns (source, [(chunk_id, text, chunk_hash)])."""
+    from langchain.text_splitter import CharacterTextSplitter
+
+    text = Path(path).read_text(encoding="utf-8")
+    splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    seen = {}
+    for piece in splitter.split_text(text):
+        chunk_hash = _sha(piece)
+        # Content-addressed IDs: an unchanged chunk keeps its ID wherever it moves in the file
+        n = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = n + 1
+        chunks.append((f"{source}:{chunk_hash[:16]}:{n}", piece, chunk_hash))
+    return source, chunks
+
+
+def scan(docs_dir: Path):
+    """{source (path relative to docs_dir): absolute path} for every policy document."""
+    files = {}
+    for pattern in DOC_PATTERNS:
+        for path in docs_dir.rglob(pattern):
+            if path.is_file():
+                files[path.relative_to(docs_dir).as_posix()] = path
+    return dict(sorted(files.items()))
+
+
+def sync(args) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    docs_dir = (REPO_ROOT / args.docs_dir).resolve()
+    if not docs_dir.is_dir():
+        raise FileNotFoundError(f"Policy directory not found at: {docs_dir}")
+    files = scan(docs_dir)
+    if not files:
+        raise FileNotFoundError(f"No policy documents ({', '.join(DOC_PATTERNS)}) under: {docs_dir}")
+
+    # File hashes cover the chunking settings too, so changing them re-chunks everything
+    settings = f"{args.chunk_size}:{args.chunk_overlap}|"
+    texts = {source: path.read_text(encoding="utf-8") for source, path in files.items()}
+    doc_hashes = {source: _sha(settings + text) for source, text in texts.items()}
+
+    client = chromadb.PersistentClient(path=str((REPO_ROOT / RAG_DIR).resolve()))
+    # Same model, backend and batching as the app, so stored and query vectors match
+    embedding_fn = build_embedding_service()
+    model_id = f"{EMBEDDING_MODEL}|{embedding_fn.backend}"
+
+    rebuild = args.rebuild
+    try:
+        collection = client.get_collection(COLLECTION_NAME, embedding_function=embedding_fn)
+        if (collection.metadata or {}).get("embedding_model") != model_id:
+            print(f"Embedding model changed to {model_id}; re-embedding everything")
+            rebuild = True
+    except Exception:
+        collection = None
+    if rebuild and collection is not None:
+        client.delete_collection(COLLECTION_NAME)
+        collection = None
+    if collection is None:
+        collection = client.create_collection(
+            name=COLLECTION_NAME, embedding_function=embedding_fn, metadata={"embedding_model": model_id}
+        )
+
+    existing = collection.get(include=["metadatas"])
+    stored = dict(zip(existing["ids"], existing["metadatas"]))
+    timings["scan_s"] = time.perf_counter() - start
+
+    # Only files whose hash changed (or that are new) need chunking
+    stored_doc_hash = {}
+    for meta in stored.values():
+        stored_doc_hash.setdefault(meta.get("source"), set()).add(meta.get("doc_hash"))
+    changed = [s for s in files if stored_doc_hash.get(s) != {doc_hashes[s]}]
+    unchanged_files = [s for s in files if s not in changed]
+
+    t = time.perf_counter()
+    jobs = [(str(files[s]), s, args.chunk_size, args.chunk_overlap) for s in changed]
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as pool:
+            chunked = list(pool.map(chunk_file, *zip(*jobs)))
+    else:
+        chunked = [chunk_file(*job) for job in jobs]
+    timings["chunk_s"] = time.perf_counter() - t
+
+    wanted = {}  # chunk id -> (text, metadata) for every chunk of a changed file
+    for source, chunks in chunked:
+        for i, (chunk_id, text, chunk_hash) in enumerate(chunks):
+            wanted[chunk_id] = (text, {
+                "source": source,
+                "chunk": i,
+                "path": str(files[source]),
+                "doc_hash": doc_hashes[source],
+                "chunk_hash": chunk_hash,
+            })
+
+    keep_sources = set(unchanged_files)
+    to_add = [cid for cid in wanted if cid not in stored]
+    to_update = [cid for cid in wanted if cid in stored]
+    to_delete = [cid for cid, meta in stored.items() if cid not in wanted and meta.get("source") not in keep_sources]
+    removed_files = sorted({stored[cid].get("source") for cid in to_delete} - set(files))
+
+    t = time.perf_counter()
+    if not args.dry_run:
+        if to_delete:
+            collection.delete(ids=to_delete)
+        if to_update:
+            # Same text, so the stored vector is still right; only position/hashes changed
+            collection.update(ids=to_update, metadatas=[wanted[cid][1] for cid in to_update])
+        for i in range(0, len(to_add), args.batch_size):
+            batch = to_add[i:i + args.batch_size]
+            docs = [wanted[cid][0] for cid in batch]
+            collection.add(
+                ids=batch,
+                documents=docs,
+                metadatas=[wanted[cid][1] for cid in batch],
+                embeddings=embedding_fn(docs),
+            )
+    timings["write_s"] = time.perf_counter() - t
+
+    # Facts are cheap to extract, so they are rebuilt from every file and only written when they differ
+    t = time.perf_counter()
+    facts = [fact for source, text in texts.items() for fact in extract_facts(text, source)]
+    facts_changed = store_facts(facts) if not args.dry_run else False
+    timings["facts_s"] = time.perf_counter() - t
+
+    changed_anything = bool(to_add or to_delete or to_update) or rebuild or facts_changed
+    if changed_anything and not args.dry_run:
+        # Tells running ReturnPolicyTools instances to drop cached answers and re-open the collection
+        write_build_stamp(str((REPO_ROOT / RAG_DIR).resolve()))
+    timings["total_s"] = time.perf_counter() - start
+
+    return {
+        "collection": COLLECTION_NAME,
+        "rag_dir": RAG_DIR,
+        "docs_dir": str(docs_dir),
+        "embedding_model": model_id,
+        "dry_run": args.dry_run,
+        "rebuild": rebuild,
+        "files": {
+            "scanned": len(files),
+            "unchanged": len(unchanged_files),
+            "changed": [s for s in changed if s in stored_doc_hash],
+            "new": [s for s in changed if s not in stored_doc_hash],
+            "removed": removed_files,
+        },
+        "chunks": {
+            "embedded": len(to_add),
+            "metadata_updated": len(to_update),
+            "deleted": len(to_delete),
+            "total": len(stored) - len(to_delete) + len(to_add),
+        },
+        "facts": {
+            "extracted": len(facts),
+            "rewritten": facts_changed,
+        },
+        "timings_s": {k: round(v, 3) for k, v in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs-dir", default=POLICY_DOCS_DIR)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=256, help="chunks per embedding call / collection.add")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes used for chunking")
+    parser.add_argument("--rebuild", action="store_true", help="drop the collection and embed everything")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    parser.add_argument("--report", help="also write the change report to this JSON file")
+    args = parser.parse_args()
+
+    report = sync(args)
+    files, chunks = report["files"], report["chunks"]
+    print(
+        f"Files: {files['scanned']} scanned, {files['unchanged']} unchanged, {len(files['new'])} new, "
+        f"{len(files['changed'])} changed, {len(files['removed'])} removed"
+    )
+    for label in ("new", "changed", "removed"):
+        for source in files[label]:
+            print(f"  {label:<8} {source}")
+    print(
+        f"Chunks: {chunks['embedded']} embedded, {chunks['metadata_updated']} re-indexed, "
+        f"{chunks['deleted']} deleted, {chunks['total']} total"
+    )
+    print(f"Policy facts: {report['facts']['extracted']} extracted"
+          f"{', table rewritten' if report['facts']['rewritten'] else ', unchanged'}")
+    print("Timings: " + ", ".join(f"{k} {v}s" for k, v in report["timings_s"].items()))
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    prefix = "Dry run: nothing written. " if args.dry_run else ""
+    print(f"{prefix}RAG sync complete for collection '{COLLECTION_NAME}' at: {RAG_DIR}")
+
 
-# Paths
-policy_path = Path("data/return_policy.txt").resolve()
-if not policy_path.exists():
-    raise FileNotFoundError(f"Policy file not found at: {policy_path}")
-
-# Step 1: Load and chunk the policy document
-loader = TextLoader(str(policy_path))
-documents = loader.load()
-splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-chunks = splitter.split_documents(documents)
-
-# Step 2: Create ChromaDB Persistent Client and collection with embedding fn
-client = chromadb.PersistentClient(path=str(RAG_DIR))
-embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)
-
-# Create or reset collection to ensure a clean build
-try:
-    client.delete_collection(COLLECTION_NAME)
-except Exception:
-    # ok if it doesn't exist yet
-    pass
-
-collection = client.create_collection(name=COLLECTION_NAME, embedding_function=embedding_fn)
-
-# Step 3: Add chunked documents
-ids = [f"policy-{i}" for i in range(len(chunks))]
-docs = [c.page_content for c in chunks]
-metas = [
-    {"source": "return_policy.txt", "chunk": i, "path": str(policy_path)}
-    for i in range(len(chunks))
-]
-
-collection.add(ids=ids, documents=docs, metadatas=metas)
-
-count = collection.count()
-print(f"RAG setup complete. {count} chunks stored in collection '{COLLECTION_NAME}' at: {RAG_DIR}")
+if __name__ == "__main__":
+    main()
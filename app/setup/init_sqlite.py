@@ -1,18 +1,156 @@
+"""Recreate the SQLite DB from data/*.csv (or a generated dataset) by streaming the CSVs.
+
+    python app/setup/init_sqlite.py                                # data/ -> DB_PATH (db/retail.db)
+    python app/setup/init_sqlite.py --data-dir data/generated --db db/big.db
+
+Rows are read in chunks and inserted with executemany inside large transactions,
+with the rollback journal and fsyncs off for the load; indexes and the FTS index
+are built once at the end, which is much faster than maintaining them per row.
+"""
+import argparse
+import csv
 import os
 import sqlite3
-import pandas as pd
+import sys
+import time
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Allow running as a script (python app/setup/init_sqlite.py) as well as a module
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.utils.db import (
+    ORDERS_DDL,
+    ORDER_INDEXES,
+    POLICY_FACTS_DDL,
+    PRODUCTS_DDL,
+    SCHEMA_VERSION,
+    USERS_DDL,
+    ensure_products_fts,
+)
+
+load_dotenv()
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+# table -> (DDL, columns, default SQL for columns the CSV lacks, whether the CSV is required)
+TABLES = {
+    "products": (
+        PRODUCTS_DDL,
+        ["id", "name", "category", "price", "description", "is_returnable", "return_window_days"],
+        {"is_returnable": "1", "return_window_days": "7"},
+        True,
+    ),
+    "users": (USERS_DDL, ["user_id", "name", "email", "city", "joined_date"], {}, False),
+    "orders": (
+        ORDERS_DDL,
+        ["order_id", "user_id", "product_id", "status", "ordered_date", "delivered_date"],
+        {},
+        True,
+    ),
+}
+
+
+def load_table(conn, table: str, csv_path: Path, chunk_size: int, commit_every: int) -> int:
+    ddl, columns, defaults, _ = TABLES[table]
+    conn.execute(ddl)
+    start = time.perf_counter()
+    rows = 0
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        present = [c for c in columns if c in header]
+        pick = itemgetter(*[header.index(c) for c in present])
+        # Column affinity does the type conversion ('101' -> 101 for INTEGER, IDs stay TEXT),
+        # so rows go in as read; only empty CSV fields need mapping to NULL
+        values = ["NULLIF(?, '')" if c in present else defaults.get(c, "NULL") for c in columns]
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(values)})"
+
+        conn.execute("BEGIN")
+        since_commit = 0
+        while True:
+            chunk = [pick(r) for r in islice(reader, chunk_size) if r]
+            if not chunk:
+                break
+            conn.executemany(sql, chunk)
+            rows += len(chunk)
+            since_commit += len(chunk)
+            if since_commit >= commit_every:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN")
+                since_commit = 0
+                print(f"  {table}: {rows:,} rows so far ({rows / (time.perf_counter() - start):,.0f} rows/s)")
+        conn.execute("COMMIT")
+
+    elapsed = time.perf_counter() - start
+    print(f"{table}: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--db", default=os.getenv("DB_PATH", "db/retail.db"))
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="rows per executemany call")
+    parser.add_argument("--commit-every", type=int, default=1_000_000, help="rows per transaction")
+    args = parser.parse_args()
+
+    data_dir = (REPO_ROOT / args.data_dir).resolve()
+    db_path = (REPO_ROOT / args.db).resolve()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Autocommit mode; load_table manages its own transactions
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    total_start = time.perf_counter()
+    try:
+        # Bulk-load settings: no rollback journal or fsync (a failed load is simply rerun),
+        # a big page cache, and no FK checks until everything is in
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-262144")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA foreign_keys=OFF")
+
+        conn.execute("BEGIN")
+        conn.execute("DROP TABLE IF EXISTS products_fts")
+        for table in ("orders", "users", "products"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute("COMMIT")
+
+        for table, (_, _, _, required) in TABLES.items():
+            csv_path = data_dir / f"{table}.csv"
+            if not csv_path.exists():
+                if required:
+                    raise FileNotFoundError(f"CSV not found at: {csv_path.resolve()}")
+                continue
+            load_table(conn, table, csv_path, args.chunk_size, args.commit_every)
 
-# Ensure db/ folder exists
-os.makedirs("db", exist_ok=True)
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        for ddl in ORDER_INDEXES:
+            conn.execute(ddl)
+        # Filled by init_rag; kept if it already exists, since it doesn't depend on the CSVs
+        for ddl in POLICY_FACTS_DDL:
+            conn.execute(ddl)
+        ensure_products_fts(conn)
+        conn.execute("COMMIT")
+        print(f"Indexes and full-text index built in {time.perf_counter() - start:.1f}s")
 
-conn = sqlite3.connect("db/retail.db")
+        orphans = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if orphans:
+            print(f"⚠️ {len(orphans)} orders reference missing products")
+        conn.execute("ANALYZE")
+        # Every table the migrations create is built above, so init_db_schema has nothing to migrate
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
 
-# Load CSVs
-products = pd.read_csv("data/products.csv")
-orders = pd.read_csv("data/orders.csv")
+    print(f"✅ SQLite DB created at {db_path} in {time.perf_counter() - total_start:.1f}s")
 
-# Write to tables
-products.to_sql("products", conn, if_exists="replace", index=False)
-orders.to_sql("orders", conn, if_exists="replace", index=False)
 
-print("✅ SQLite DB created at db/retail.db")
+if __name__ == "__main__":
+    main()
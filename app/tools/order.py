@@ -1,7 +1,3 @@
-import os
-import sqlite3
-from pathlib import Path
-from dotenv import load_dotenv
 from langchain.tools import tool
 from app.utils.order_service import (
     order_by_id,
@@ -13,19 +9,15 @@ from app.utils.order_service import (
     cancel_order,
     get_cancellable_orders,
 )
+from app.utils.tool_output import compact
+
+DEFAULT_USER_ID = "2001"
 
 
 class OrderTools:
     def __init__(self):
-        load_dotenv()
-        base_dir = Path(__file__).resolve().parent.parent.parent
-        db_rel = os.getenv("DB_PATH", "db/retail.db")
-        db_path = (base_dir / db_rel).resolve()
-        if not db_path.exists():
-            raise FileNotFoundError(f"DB file not found at: {db_path}")
-
-        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
-        self.cursor = self.conn.cursor()
+        # Queries go through the shared pool in app.utils.db; results are compacted for the model
+        # (no nulls, row lists as tables, long lists cut) since every later agent hop re-sends them
         self.order_tool_list = self._setup_tools()
 
     def _setup_tools(self):
@@ -36,8 +28,8 @@ class OrderTools:
                 order = order_by_id(order_id)
                 if not order or not order.get("found", False):
                     return {"found": False, "order_id": order_id, "error": "Order not found"}
-                # Return the order data directly instead of nesting it
-                return order
+                # The user is implicit when it is the one the assistant serves
+                return compact(order, drop=("user_id",) if order.get("user_id") == DEFAULT_USER_ID else ())
             except Exception as e:
                 return {"found": False, "error": str(e), "order_id": order_id}
 
@@ -45,8 +37,7 @@ class OrderTools:
         def order_tracking_by_product(product_name: str) -> dict:
             """Find up to 5 most recent orders by product name (partial match)."""
             try:
-                # Return the service result directly (it already has proper found/orders structure)
-                return orders_by_product_name(product_name, limit=5)
+                return compact(orders_by_product_name(product_name, limit=5))
             except Exception as e:
                 return {"found": False, "error": str(e), "product_name": product_name, "orders": []}
 
@@ -54,8 +45,7 @@ class OrderTools:
         def all_orders_tool(limit: int = 20) -> dict:
             """Get the most recent orders, default limit is 20."""
             try:
-                # Return the service result directly
-                return all_orders(limit)
+                return compact(all_orders(limit))
             except Exception as e:
                 return {"found": False, "error": str(e), "limit": limit, "orders": []}
 
@@ -63,24 +53,17 @@ class OrderTools:
         def orders_by_status_tool(status: str) -> dict:
             """Get recent orders filtered by status (pending, shipped, delivered, cancelled)."""
             try:
-                # Return the service result directly
-                return orders_by_status(status)
+                return compact(orders_by_status(status))
             except Exception as e:
-                import traceback
-                return {
-                    "found": False,
-                    "status": status,
-                    "error": str(e),
-                    "traceback": traceback.format_exc(),
-                    "orders": [],
-                }
+                # The model can't act on a traceback; it goes to the server log instead
+                print(f"OrdersByStatusTool failed for '{status}': {e}")
+                return {"found": False, "status": status, "error": str(e)}
 
         @tool("OrdersByUserTool")
         def orders_by_user_tool(user_id: str) -> dict:
             """Get recent orders placed by a given user ID."""
             try:
-                # Return the service result directly
-                return orders_by_user(user_id)
+                return compact(orders_by_user(user_id))
             except Exception as e:
                 return {"found": False, "error": str(e), "user_id": user_id, "orders": []}
 
@@ -88,7 +71,7 @@ class OrderTools:
         def check_order_cancellation(order_id: str) -> dict:
             """Check if an order can be cancelled (only 'processing' orders allowed)."""
             try:
-                return can_cancel_order(order_id)
+                return compact(can_cancel_order(order_id))
             except Exception as e:
                 return {"can_cancel": False, "error": str(e), "order_id": order_id}
 
@@ -96,7 +79,8 @@ class OrderTools:
         def cancel_order_tool(order_id: str, reason: str = "Customer request") -> dict:
             """Cancel an order by order ID (only 'processing' orders allowed). Provide a reason for cancellation."""
             try:
-                return cancel_order(order_id, reason)
+                # message restates the other keys and the reason is the model's own argument
+                return compact(cancel_order(order_id, reason), drop=("message", "cancellation_reason"))
             except Exception as e:
                 return {"success": False, "error": str(e), "order_id": order_id}
 
@@ -104,7 +88,8 @@ class OrderTools:
         def get_cancellable_orders_tool(user_id: str = "2001") -> dict:
             """Get all orders that can be cancelled for user 2001 (only 'processing' orders). Use user_id parameter to override default."""
             try:
-                return get_cancellable_orders(user_id, limit=20)
+                # Every row is cancellable and count is the table's length
+                return compact(get_cancellable_orders(user_id, limit=20), drop=("can_cancel", "count"))
             except Exception as e:
                 return {"found": False, "error": str(e), "cancellable_orders": []}
 
@@ -112,9 +97,9 @@ class OrderTools:
         def my_orders_tool(limit: int = 20) -> dict:
             """Get recent orders for the current user (user 2001). This is for queries like 'my orders', 'show my recent orders'."""
             try:
-                return orders_by_user("2001", limit)
+                return compact(orders_by_user(DEFAULT_USER_ID, limit), drop=("user_id",))
             except Exception as e:
-                return {"found": False, "error": str(e), "user_id": "2001", "orders": []}
+                return {"found": False, "error": str(e), "user_id": DEFAULT_USER_ID}
 
         return [
             order_tracking,
@@ -1,50 +1,39 @@
-import os
-import sqlite3
-from pathlib import Path
-from dotenv import load_dotenv
 from langchain.tools import tool
 from app.utils.product_service import search_products as svc_search_products, products_in_category as svc_products_in_category, price_of_product as svc_price_of_product
+from app.utils.tool_output import TOOL_OUTPUT_MAX_ROWS
 
 # Pattern aligned with PlaceSearchTool: class + @tool functions + tool list
 
+def _product_lines(rows, not_found: str, max_rows: int = TOOL_OUTPUT_MAX_ROWS) -> str:
+    """One "name – ₹price" line per product (already leaner than JSON), cut to max_rows."""
+    if not rows:
+        return not_found
+    lines = [f"{name} – ₹{price}" for name, price in rows[:max_rows]]
+    if len(rows) > max_rows:
+        lines.append(f"({len(rows) - max_rows} more products not shown)")
+    return "\n".join(lines)
+
+
 class ProductTools:
     def __init__(self):
-        load_dotenv()
-        base_dir = Path(__file__).resolve().parent.parent.parent
-        db_rel = os.getenv("DB_PATH", "db/retail.db")
-        db_path = (base_dir / db_rel).resolve()
-        if not db_path.exists():
-            raise FileNotFoundError(f"DB file not found at: {db_path}")
-        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
-        self.cursor = self.conn.cursor()
+        # Queries go through the shared pool in app.utils.db
         self.product_tool_list = self._setup_tools()
 
     def _setup_tools(self):
-        cursor = self.cursor
-
         @tool("ProductSearchTool")
         def product_search(input: str) -> str:
             """Find product names and prices by partial name or category; supports 'under/over' and 'between' price filters."""
-            rows = svc_search_products(input)
-            if not rows:
-                return "No matching products found."
-            return "\n".join(f"{name} – ₹{price}" for name, price in rows)
+            return _product_lines(svc_search_products(input), "No matching products found.")
 
         @tool("ProductCategoryTool")
         def products_in_category(input: str) -> str:
             """List products in a given category."""
-            rows = svc_products_in_category(input)
-            if not rows:
-                return "No products found in that category."
-            return "\n".join(f"{name} – ₹{price}" for name, price in rows)
+            return _product_lines(svc_products_in_category(input), "No products found in that category.")
 
         @tool("ProductPriceTool")
         def price_of_product(input: str) -> str:
             """Get the price for a product by name (partial match)."""
-            rows = svc_price_of_product(input)
-            if not rows:
-                return "No products found with that name."
-            return "\n".join(f"{n} – ₹{p}" for n, p in rows)
+            return _product_lines(svc_price_of_product(input), "No products found with that name.")
 
         return [product_search, products_in_category, price_of_product]
 
@@ -1,4 +1,6 @@
+import asyncio
 import os
+import time
 import requests
 import warnings
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
@@ -15,64 +17,226 @@ def patched_request(self, method, url, *args, **kwargs):
 
 requests.Session.request = patched_request
 
-from langchain.tools import tool
-
-import chromadb
-from chromadb.utils import embedding_functions
-
-from app.llm import load_llm
+from langchain.tools import StructuredTool
+
+from app.utils.batch_memo import shared_in_batch
+from app.utils.hybrid_retriever import HybridRetriever
+from app.utils.policy_facts import POLICY_FACTS_ENABLED, policy_facts
+from app.utils.semantic_cache import SemanticCache
+from app.metrics import POLICY_CONTEXT_CHUNKS, RETRIEVAL_SECONDS
+
+# "hybrid" (BM25 + vector, fused, adaptive k) or "vector" (plain Chroma top POLICY_TOP_K)
+POLICY_RETRIEVAL = os.getenv("POLICY_RETRIEVAL", "hybrid")
+POLICY_TOP_K = int(os.getenv("POLICY_TOP_K", "6"))
+# "generate": the tool answers with its own LLM call over the chunks; "retrieve": it returns the chunks
+# and the agent answers from them in the call that would otherwise only rephrase the tool's answer
+POLICY_ANSWER_MODE = os.getenv("POLICY_ANSWER_MODE", "generate")
+# Chunk metadata passed to the agent in retrieve mode (the rest is bookkeeping for init_rag)
+POLICY_CONTEXT_METADATA = ("source", "chunk")
+
+
+def build_policy_prompt(input: str, results) -> str:
+    docs = results.get("documents", [[]])[0]
+    metadatas = results.get("metadatas", [[]])[0]
+    if not docs:
+        context = "No relevant policy context found."
+    else:
+        pairs = [
+            f"[chunk {m.get('chunk', i)}] {d}" if isinstance(m, dict) else d
+            for i, (d, m) in enumerate(zip(docs, metadatas))
+        ]
+        context = "\n\n".join(pairs)
+
+    return (
+        "You are a retail policy assistant. Answer ONLY using the context.\n"
+        "- If the context states a deadline (e.g., 30 days), include it.\n"
+        "- If the answer is not in the context, say 'I don't know based on the policy context.'\n\n"
+        f"Policy context:\n{context}\n\nQuestion: {input}\nFinal answer:"
+    )
+
+
+def policy_context(input: str, results) -> dict:
+    """Ranked policy chunks as tool output, with duplicate texts (e.g. the same clause in two files) dropped."""
+    docs = results.get("documents", [[]])[0]
+    metadatas = results.get("metadatas", [[]])[0] or [None] * len(docs)
+    # Hybrid retrieval reports fused scores (higher is better), plain Chroma queries distances
+    scores = (results.get("scores") or [[]])[0]
+    distances = (results.get("distances") or [[]])[0]
+    chunks, seen = [], set()
+    for i, (doc, meta) in enumerate(zip(docs, metadatas)):
+        key = " ".join((doc or "").lower().split())
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        chunk = {"rank": len(chunks) + 1}
+        chunk.update({k: meta[k] for k in POLICY_CONTEXT_METADATA if isinstance(meta, dict) and k in meta})
+        if i < len(scores):
+            chunk["score"] = scores[i]
+        elif i < len(distances):
+            chunk["distance"] = round(distances[i], 5)
+        chunk["text"] = doc
+        chunks.append(chunk)
+    if not chunks:
+        return {"found": False, "question": input, "error": "No relevant policy context found."}
+    return {"found": True, "question": input, "chunks": chunks}
+
+
+def policy_fact_context(input: str, fact: dict) -> dict:
+    """Retrieve-mode output for a question the policy facts table settles."""
+    return {
+        "found": True,
+        "question": input,
+        "answer": fact["answer"],
+        "sources": sorted({f["source"] for f in fact["facts"]}) or ["products"],
+    }
 
 
 class ReturnPolicyTools:
-    def __init__(self):
+    def __init__(self, llm, embedding_fn):
+        # Imported here: app.agent imports this module, and chromadb takes most of a second to load
+        import chromadb
+
+        # The LLM client and the batching embedding service are shared components (see app.components)
         self.rag_dir = os.getenv("RAG_DIR", "rag_db")
         self.collection_name = os.getenv("RAG_COLLECTION", "return_policy")
-        self.embedding_model = os.getenv(
-            "EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-        )
         self.client = chromadb.PersistentClient(path=self.rag_dir)
+        self.embedding_fn = embedding_fn
         self.collection = self.client.get_or_create_collection(
             name=self.collection_name,
-            embedding_function=embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name=self.embedding_model
-            ),
+            embedding_function=self.embedding_fn,
         )
-        self.llm = load_llm()
+        self.retriever = self._build_retriever()
+        self.cache_enabled = os.getenv("POLICY_CACHE_ENABLED", "1") != "0"
+        self.cache = SemanticCache(
+            self.rag_dir,
+            threshold=float(os.getenv("POLICY_CACHE_THRESHOLD", "0.92")),
+            max_entries=int(os.getenv("POLICY_CACHE_SIZE", "256")),
+            ttl_s=float(os.getenv("POLICY_CACHE_TTL_S", "3600")),
+        )
+        self.answer_mode = POLICY_ANSWER_MODE
+        self.facts = policy_facts if POLICY_FACTS_ENABLED else None
+        self.llm = llm
         self.return_policy_tool_list = self._setup_tools()
 
+    def _build_retriever(self):
+        # The BM25 side keeps the chunks in memory, so it is rebuilt along with the collection
+        return HybridRetriever(self.collection) if POLICY_RETRIEVAL == "hybrid" else None
+
+    def _current_collection(self):
+        """Return the collection, re-opening it (and dropping cached answers) after init_rag rebuilt it."""
+        if self.cache.check_build():
+            self.collection = self.client.get_or_create_collection(
+                name=self.collection_name,
+                embedding_function=self.embedding_fn,
+            )
+            self.retriever = self._build_retriever()
+        return self.collection
+
+    def retrieve(self, input: str, embedding):
+        """Policy chunks for the prompt, in Chroma's query() result layout."""
+        with RETRIEVAL_SECONDS.time("query"):
+            if self.retriever is not None:
+                results = self.retriever.retrieve(input, embedding)
+            else:
+                results = self.collection.query(query_embeddings=[embedding], n_results=POLICY_TOP_K)
+        POLICY_CONTEXT_CHUNKS.observe(len(results["ids"][0]))
+        return results
+
     def _setup_tools(self):
-        collection = self.collection
         llm = self.llm
-
-        @tool("ReturnPolicyTool")
+        cache = self.cache
+
+        # Within a /chat/batch, the same question is answered once and shared
+        @shared_in_batch
+        def return_policy_context(input: str) -> dict:
+            """Find the return/refund policy passages relevant to a question."""
+            fact = self.facts.lookup(input) if self.facts else None
+            if fact is not None:
+                return policy_fact_context(input, fact)
+            self._current_collection()
+            with RETRIEVAL_SECONDS.time("embed"):
+                embedding = self.embedding_fn([input])[0]
+            return policy_context(input, self.retrieve(input, embedding))
+
+        @shared_in_batch
+        async def areturn_policy_context(input: str) -> dict:
+            fact = self.facts.lookup(input) if self.facts else None
+            if fact is not None:
+                return policy_fact_context(input, fact)
+            await asyncio.to_thread(self._current_collection)
+            with RETRIEVAL_SECONDS.time("embed"):
+                embedding = (await self.embedding_fn.aembed([input]))[0]
+            return policy_context(input, await asyncio.to_thread(self.retrieve, input, embedding))
+
+        @shared_in_batch
         def return_policy_answer(input: str) -> str:
             """Answer return/refund questions using RAG from the policy database."""
-            results = collection.query(query_texts=[input], n_results=6)
-            docs = results.get("documents", [[]])[0]
-            metadatas = results.get("metadatas", [[]])[0]
-            if not docs:
-                context = "No relevant policy context found."
-            else:
-                pairs = [
-                    f"[chunk {m.get('chunk', i)}] {d}" if isinstance(m, dict) else d
-                    for i, (d, m) in enumerate(zip(docs, metadatas))
-                ]
-                context = "\n\n".join(pairs)
-
-            prompt = (
-                "You are a retail policy assistant. Answer ONLY using the context.\n"
-                "- If the context states a deadline (e.g., 30 days), include it.\n"
-                "- If the answer is not in the context, say 'I don't know based on the policy context.'\n\n"
-                f"Policy context:\n{context}\n\nQuestion: {input}\nFinal answer:"
+            # Deadlines and eligibility rules stated in the documents need no retrieval or LLM call
+            fact = self.facts.lookup(input) if self.facts else None
+            if fact is not None:
+                return fact["answer"]
+            self._current_collection()
+            # Embed once and reuse the vector for both the cache lookup and the Chroma query
+            with RETRIEVAL_SECONDS.time("embed"):
+                embedding = self.embedding_fn([input])[0]
+            if self.cache_enabled:
+                cached = cache.lookup(embedding)
+                if cached is not None:
+                    return cached
+            results = self.retrieve(input, embedding)
+            start = time.perf_counter()
+            response = llm.invoke(build_policy_prompt(input, results))
+            answer = getattr(response, "content", str(response))
+            if self.cache_enabled:
+                cache.store(embedding, answer, time.perf_counter() - start)
+            return answer
+
+        @shared_in_batch
+        async def areturn_policy_answer(input: str) -> str:
+            fact = self.facts.lookup(input) if self.facts else None
+            if fact is not None:
+                return fact["answer"]
+            # Embeddings come from the batching service's future; Chroma is sync-only, so it goes to a worker thread
+            await asyncio.to_thread(self._current_collection)
+            with RETRIEVAL_SECONDS.time("embed"):
+                embedding = (await self.embedding_fn.aembed([input]))[0]
+            if self.cache_enabled:
+                cached = cache.lookup(embedding)
+                if cached is not None:
+                    return cached
+            results = await asyncio.to_thread(self.retrieve, input, embedding)
+            start = time.perf_counter()
+            response = await llm.ainvoke(build_policy_prompt(input, results))
+            answer = getattr(response, "content", str(response))
+            if self.cache_enabled:
+                cache.store(embedding, answer, time.perf_counter() - start)
+            return answer
+
+        if self.answer_mode == "retrieve":
+            # No LLM call inside the tool (and so nothing for the answer cache to save)
+            return_policy_tool = StructuredTool.from_function(
+                func=return_policy_context,
+                coroutine=areturn_policy_context,
+                name="ReturnPolicyTool",
+                description="Find the return/refund policy passages relevant to a question, ranked best first.",
             )
-            response = llm.invoke(prompt)
-            return getattr(response, "content", str(response))
-
-        return [return_policy_answer]
-
-
-return_policy_tools = ReturnPolicyTools()
-return_policy_tool_list = return_policy_tools.return_policy_tool_list
-
-# Backwards compatibility
-return_policy_tool = return_policy_tool_list[0]
+        else:
+            return_policy_tool = StructuredTool.from_function(
+                func=return_policy_answer,
+                coroutine=areturn_policy_answer,
+                name="ReturnPolicyTool",
+            )
+        return [return_policy_tool]
+
+
+def __getattr__(name):
+    # The instance is built once by the component registry, on first use rather than at import
+    from app.components import components
+    if name == "return_policy_tools":
+        return components.get("return_policy")
+    if name == "return_policy_tool_list":
+        return components.get("return_policy").return_policy_tool_list
+    if name == "return_policy_tool":
+        # Backwards compatibility
+        return components.get("return_policy").return_policy_tool_list[0]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
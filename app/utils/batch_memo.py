@@ -0,0 +1,132 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# The memo of the batch the current task/thread belongs to; None outside /chat/batch
+_current = contextvars.ContextVar("batch_memo", default=None)
+
+
+class BatchMemo:
+    """Share the results of identical read calls across the queries of one batch.
+
+    The first call of fn(args) runs it and the result is kept for the rest of the batch;
+    identical calls made while it runs wait for it instead of running again. Failures are
+    not kept. A call that changes data clears the memo, so later reads see the change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> Future
+        self.calls = 0
+        self.hits = 0
+        self.invalidations = 0
+
+    def _claim(self, key):
+        """(future, owner): the owner runs the call and resolves the future, everyone else waits on it."""
+        with self._lock:
+            self.calls += 1
+            future = self._entries.get(key)
+            if future is not None:
+                self.hits += 1
+                return future, False
+            future = self._entries[key] = Future()
+            return future, True
+
+    def _fail(self, key, future, error):
+        with self._lock:
+            if self._entries.get(key) is future:
+                del self._entries[key]
+        future.set_exception(error)
+
+    def call(self, key, fn):
+        future, owner = self._claim(key)
+        if not owner:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        future.set_result(result)
+        return result
+
+    async def acall(self, key, coro_fn):
+        future, owner = self._claim(key)
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        future.set_result(result)
+        return result
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls, hits = self.calls, self.hits
+        return {
+            "calls": calls,
+            "executed": calls - hits,
+            "shared": hits,
+            "invalidations": self.invalidations,
+        }
+
+
+@contextmanager
+def batch_scope(memo: BatchMemo):
+    """Make `memo` the current batch memo for this task (and threads/tasks it starts)."""
+    token = _current.set(memo)
+    try:
+        yield memo
+    finally:
+        _current.reset(token)
+
+
+def _key(func, args, kwargs):
+    return (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+
+def shared_in_batch(func):
+    """Decorator for read-only calls: inside a batch, identical calls run once. No-op outside a batch."""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def awrapper(*args, **kwargs):
+            memo = _current.get()
+            if memo is None:
+                return await func(*args, **kwargs)
+            return await memo.acall(_key(func, args, kwargs), lambda: func(*args, **kwargs))
+
+        return awrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        memo = _current.get()
+        if memo is None:
+            return func(*args, **kwargs)
+        return memo.call(_key(func, args, kwargs), lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def invalidates_batch(func):
+    """Decorator for calls that change data: never shared, and clear the batch memo once they ran."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            memo = _current.get()
+            if memo is not None:
+                memo.invalidate()
+
+    return wrapper
@@ -1,9 +1,18 @@
+import asyncio
+import contextvars
+import functools
 import os
+import queue
 import sqlite3
 import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 
+from app.metrics import DB_WRITE_BATCH_SIZE, DB_WRITE_QUEUE_SECONDS
+
 load_dotenv()
 
 _BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,51 +27,630 @@ if not _DB_PATH.exists():
         _DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     # raise FileNotFoundError(f"DB file not found at: {_DB_PATH}")
 
-# Use thread-local storage for connections
-_local_storage = threading.local()
+# Pool sizing and per-connection tuning
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "5"))
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", str(64 * 1024)))
+STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+# Writes queued while a write transaction runs are committed together in the next one, up to this many
+WRITE_MAX_BATCH = int(os.getenv("DB_WRITE_MAX_BATCH", "64"))
+
+
+class PoolTimeout(TimeoutError):
+    """No pooled connection became free within DB_POOL_TIMEOUT_S."""
+
+
+def _connect(readonly: bool) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(
+            f"{_DB_PATH.as_uri()}?mode=ro", uri=True,
+            check_same_thread=False, isolation_level=None, cached_statements=STATEMENT_CACHE,
+        )
+    else:
+        conn = sqlite3.connect(
+            str(_DB_PATH),
+            check_same_thread=False, isolation_level=None, cached_statements=STATEMENT_CACHE,
+        )
+        # WAL lets the readers keep going while the writer commits
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA foreign_keys=ON")
+    if readonly:
+        conn.execute("PRAGMA query_only=1")
+    return conn
+
+
+class ConnectionPool:
+    """Bounded set of read-only connections plus a single writer connection.
+
+    Connections are opened lazily up to `size` readers. When all readers are
+    checked out, callers wait up to `timeout` seconds and then get PoolTimeout.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT_S):
+        self.size = size
+        self.timeout = timeout
+        # LIFO so the most recently used connection (warm page cache) is reused first
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "peak_in_use": 0,
+            "writer_checkouts": 0,
+            "writer_waits": 0,
+            "writer_wait_ms_total": 0.0,
+        }
+
+    def _record_wait(self, prefix: str, waited_s: float):
+        ms = waited_s * 1000
+        self._stats[f"{prefix}waits"] += 1
+        self._stats[f"{prefix}wait_ms_total"] += ms
+        if prefix == "":
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], ms)
+
+    def _checkout(self) -> sqlite3.Connection:
+        with self._lock:
+            # Don't barge past threads already waiting for a connection
+            conn = None
+            if not self._waiting:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    pass
+            create = conn is None and self._created < self.size
+            if create:
+                self._created += 1
+            elif conn is None:
+                self._waiting += 1
+        if create:
+            try:
+                conn = _connect(readonly=True)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        elif conn is None:
+            start = time.perf_counter()
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._waiting -= 1
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"No database connection free after {self.timeout}s")
+            with self._lock:
+                self._waiting -= 1
+                self._record_wait("", time.perf_counter() - start)
+        with self._lock:
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+        return conn
 
-def get_connection():
-    if not hasattr(_local_storage, "connection"):
-        # Connect to the DB for this thread
-        _local_storage.connection = sqlite3.connect(str(_DB_PATH), check_same_thread=False)
-        # Enable WAL mode for better concurrency
+    def _checkin(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    @contextmanager
+    def reader(self):
+        """Check out a read-only connection for the duration of the block."""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    @contextmanager
+    def writer(self):
+        """Hold the single writer connection inside a BEGIN IMMEDIATE transaction."""
+        start = time.perf_counter()
+        if not self._writer_lock.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeout(f"Writer connection busy after {self.timeout}s")
         try:
-            _local_storage.connection.execute("PRAGMA journal_mode=WAL;")
-        except:
-            pass
-    return _local_storage.connection
+            waited = time.perf_counter() - start
+            with self._lock:
+                self._stats["writer_checkouts"] += 1
+                if waited > 0.001:
+                    self._record_wait("writer_", waited)
+            if self._writer is None:
+                self._writer = _connect(readonly=False)
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                # Also after a failed COMMIT, which leaves the transaction open
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        finally:
+            self._writer_lock.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = self._in_use
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            in_use, created, waiting = self._in_use, self._created, self._waiting
+        waits = stats["waits"]
+        return {
+            "size": self.size,
+            "open": created,
+            "in_use": in_use,
+            "waiting": waiting,
+            "saturation": round(in_use / self.size, 2) if self.size else 0.0,
+            "peak_in_use": stats["peak_in_use"],
+            "checkouts": stats["checkouts"],
+            "waits": waits,
+            "timeouts": stats["timeouts"],
+            "avg_wait_ms": round(stats["wait_ms_total"] / waits, 2) if waits else 0.0,
+            "max_wait_ms": round(stats["wait_ms_max"], 2),
+            "writer_checkouts": stats["writer_checkouts"],
+            "writer_waits": stats["writer_waits"],
+            "writer_avg_wait_ms": round(stats["writer_wait_ms_total"] / stats["writer_waits"], 2)
+            if stats["writer_waits"] else 0.0,
+        }
+
+
+pool = ConnectionPool()
+
+
+def reader():
+    """Context manager yielding a pooled read-only connection."""
+    return pool.reader()
+
+
+def writer():
+    """Context manager yielding the writer connection inside a transaction.
 
-def get_cursor():
-    return get_connection().cursor()
+    Held by the write queue's thread; app code writes through write() instead, so
+    its writes queue up in-process rather than wait on the writer lock.
+    """
+    return pool.writer()
 
-def close_connection():
-    if hasattr(_local_storage, "connection"):
+
+_STOP = object()
+
+
+class _Write:
+    __slots__ = ("call", "future", "enqueued")
+
+    def __init__(self, call):
+        self.call = call
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class WriteQueue:
+    """Single thread that runs every write on the writer connection.
+
+    Callers submit a function of the connection and wait on a future. The thread takes
+    the first write plus whatever else is queued (up to max_batch), runs them in one
+    BEGIN IMMEDIATE transaction, each inside its own savepoint so a failing write only
+    undoes itself, commits once and then resolves the futures. Writers in this process
+    never wait on SQLite's lock, and under load many writes share one commit.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = WRITE_MAX_BATCH):
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._transactions = 0
+        self._writes = 0
+        self._failed = 0
+        self._max_batch_seen = 0
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        """Queue func(conn, *args, **kwargs); the future resolves once its transaction committed."""
+        if threading.current_thread() is self._worker:
+            # The thread would wait on itself
+            raise RuntimeError("write() called from inside a queued write")
+        write = _Write(lambda conn: func(conn, *args, **kwargs))
+        # Under the lock, so a write never lands behind a stopping thread's last look at the queue
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._worker.start()
+            self._queue.put(write)
+        return write.future
+
+    def _collect(self, first: _Write):
+        batch = [first]
+        stop = False
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _commit(self, batch):
+        outcomes = []
         try:
-            _local_storage.connection.close()
-        except:
-            pass
-        del _local_storage.connection
+            with self.pool.writer() as conn:
+                started = time.perf_counter()
+                for write in batch:
+                    DB_WRITE_QUEUE_SECONDS.observe(started - write.enqueued)
+                    conn.execute("SAVEPOINT queued_write")
+                    try:
+                        outcomes.append((write, write.call(conn), None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO queued_write")
+                        outcomes.append((write, None, e))
+                    conn.execute("RELEASE queued_write")
+        except Exception as e:
+            # BEGIN or COMMIT failed: nothing in the batch was written
+            outcomes = [(write, None, e) for write in batch]
+        # Only now, so a caller never sees a result its transaction might still lose
+        for write, result, error in outcomes:
+            if error is None:
+                write.future.set_result(result)
+            else:
+                write.future.set_exception(error)
+        return sum(error is not None for _, _, error in outcomes)
+
+    def _run(self):
+        try:
+            self._serve()
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self):
+        """Fail the writes queued behind the stop, so their callers don't wait forever."""
+        with self._lock:
+            if self._worker is threading.current_thread():
+                self._worker = None
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    item.future.set_exception(RuntimeError("Write queue closed before this write ran"))
+
+    def _serve(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            DB_WRITE_BATCH_SIZE.observe(len(batch))
+            failed = self._commit(batch)
+            with self._lock:
+                self._transactions += 1
+                self._writes += len(batch)
+                self._failed += failed
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            if stop:
+                return
+
+    def close(self, timeout: float = 5.0):
+        """Finish the writes already queued, then stop the thread."""
+        with self._lock:
+            worker = self._worker
+            if worker is not None:
+                self._queue.put(_STOP)
+        if worker is not None:
+            worker.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            transactions, writes, failed, peak = self._transactions, self._writes, self._failed, self._max_batch_seen
+        return {
+            "max_batch": self.max_batch,
+            "transactions": transactions,
+            "writes": writes,
+            "failed": failed,
+            "avg_batch_size": round(writes / transactions, 2) if transactions else 0.0,
+            "max_batch_size": peak,
+            "queued": self._queue.qsize(),
+        }
+
+
+write_queue = WriteQueue(pool)
+
+
+def write(func, *args, **kwargs):
+    """Run func(conn, *args, **kwargs) on the writer thread inside a transaction; returns its result.
+
+    Blocks until the transaction holding it has committed, and re-raises what func raised
+    (its changes are rolled back, the rest of the transaction is not).
+    """
+    return write_queue.submit(func, *args, **kwargs).result()
+
+
+class LazyExecutor:
+    """Thread pool created on first use; shutdown() drops it, so a later app lifespan gets a new one."""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max(1, max_workers)
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.thread_name_prefix)
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Threads for async callers of the (blocking) services: one per pooled reader plus one for the
+# writer, so queued calls wait on the event loop instead of parking threads on pool checkout
+db_executor = LazyExecutor(POOL_SIZE + 1, "db")
+
+
+def run_in_db_executor(func, executor: LazyExecutor = db_executor):
+    """Async variant of a blocking service function, run on `executor` with the caller's context."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(executor.get(), call)
+
+    return wrapper
+
+
+def close_pool():
+    db_executor.shutdown()
+    write_queue.close()
+    pool.close()
+
+PRODUCTS_FTS_TRIGGERS = {
+    "products_fts_ai": """
+        CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, category, description)
+            VALUES (new.id, new.name, new.category, new.description);
+        END
+    """,
+    "products_fts_ad": """
+        CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, category, description)
+            VALUES ('delete', old.id, old.name, old.category, old.description);
+        END
+    """,
+    "products_fts_au": """
+        CREATE TRIGGER products_fts_au AFTER UPDATE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, category, description)
+            VALUES ('delete', old.id, old.name, old.category, old.description);
+            INSERT INTO products_fts(rowid, name, category, description)
+            VALUES (new.id, new.name, new.category, new.description);
+        END
+    """,
+}
+
+
+def ensure_products_fts(conn):
+    """Create the products_fts index and its sync triggers, rebuilding the index if either was missing.
+
+    Recreating the products table (e.g. init_sqlite.py) drops the triggers, so a
+    missing trigger means the index may be stale.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'products_fts%'")
+    existing = {r[0] for r in cur.fetchall()}
+    missing_triggers = [name for name in PRODUCTS_FTS_TRIGGERS if name not in existing]
+    if "products_fts" in existing and not missing_triggers:
+        return False
+
+    print("Migrating: Building products_fts full-text index")
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, category, description,
+            content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """
+    )
+    for name in missing_triggers:
+        cur.execute(PRODUCTS_FTS_TRIGGERS[name])
+    cur.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+    return True
+
+# ---------- Schema ----------
+
+PRODUCTS_DDL = """
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        category TEXT,
+        price NUMERIC,
+        description TEXT,
+        is_returnable INTEGER DEFAULT 1,
+        return_window_days INTEGER DEFAULT 7
+    )
+"""
+
+# IDs are TEXT because every caller passes them as strings (tool arguments, URLs).
+# status_norm lets status filters use an index instead of LOWER(status) on every row.
+ORDERS_DDL = """
+    CREATE TABLE orders (
+        order_id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        product_id INTEGER NOT NULL REFERENCES products(id),
+        status TEXT NOT NULL,
+        status_norm TEXT GENERATED ALWAYS AS (lower(status)) VIRTUAL,
+        ordered_date TEXT,
+        delivered_date TEXT
+    )
+"""
+
+# Only created when the dataset ships a users.csv (see app/setup/generate_data.py)
+USERS_DDL = """
+    CREATE TABLE users (
+        user_id TEXT PRIMARY KEY,
+        name TEXT,
+        email TEXT,
+        city TEXT,
+        joined_date TEXT
+    )
+"""
+
+# Deadlines and eligibility rules extracted from the policy documents by init_rag (see app.utils.policy_facts).
+# One row per rule and subject; subject is tokenized ('' for store-wide rules), text is the policy sentence.
+POLICY_FACTS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS policy_facts (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        days_min INTEGER,
+        days_max INTEGER,
+        text TEXT NOT NULL,
+        source TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_policy_facts_kind_subject ON policy_facts(kind, subject)",
+]
+
+# Shaped after the order queries: per-user and per-status listings newest first,
+# the global newest-first listing, and the product join.
+ORDER_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_orders_user_date ON orders(user_id, ordered_date)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_status_date ON orders(status_norm, ordered_date)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(ordered_date)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_product ON orders(product_id)",
+]
+
+
+def _table_columns(cur, table: str) -> list:
+    cur.execute(f"PRAGMA table_info({table})")
+    return [r[1] for r in cur.fetchall()]
+
+
+def _migrate_return_policy_columns(cur):
+    """Add is_returnable and return_window_days to products"""
+    cols = _table_columns(cur, "products")
+    if "is_returnable" not in cols:
+        cur.execute("ALTER TABLE products ADD COLUMN is_returnable INTEGER DEFAULT 1")
+    if "return_window_days" not in cols:
+        cur.execute("ALTER TABLE products ADD COLUMN return_window_days INTEGER DEFAULT 7")
+
+
+def _migrate_keys_and_indexes(cur):
+    """Rebuild products/orders with primary and foreign keys, status_norm and order indexes"""
+    # The FTS triggers belong to the old products table; the next migration recreates them
+    for name in PRODUCTS_FTS_TRIGGERS:
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    old_cols = set(_table_columns(cur, "products"))
+    cur.execute("ALTER TABLE products RENAME TO products_old")
+    cur.execute(PRODUCTS_DDL)
+    cols = [c for c in ["id", "name", "category", "price", "description", "is_returnable", "return_window_days"]
+            if c in old_cols]
+    cur.execute(f"INSERT INTO products ({', '.join(cols)}) SELECT {', '.join(cols)} FROM products_old")
+    cur.execute("DROP TABLE products_old")
+
+    cur.execute("ALTER TABLE orders RENAME TO orders_old")
+    cur.execute(ORDERS_DDL)
+    cur.execute(
+        """
+        INSERT INTO orders (order_id, user_id, product_id, status, ordered_date, delivered_date)
+        SELECT CAST(order_id AS TEXT), CAST(user_id AS TEXT), product_id, status,
+               NULLIF(ordered_date, ''), NULLIF(delivered_date, '')
+        FROM orders_old
+        """
+    )
+    cur.execute("DROP TABLE orders_old")
+    for ddl in ORDER_INDEXES:
+        cur.execute(ddl)
+
+    cur.execute("PRAGMA foreign_key_check")
+    orphans = cur.fetchall()
+    if orphans:
+        print(f"Migration warning: {len(orphans)} orders reference missing products")
+
+
+def _migrate_products_fts(cur):
+    """Build the products_fts full-text index"""
+    ensure_products_fts(cur.connection)
+
+
+def _migrate_policy_facts(cur):
+    """Create the policy_facts table"""
+    for ddl in POLICY_FACTS_DDL:
+        cur.execute(ddl)
+
+
+# Applied in order; PRAGMA user_version records how many have run.
+# Append new migrations, never reorder or edit released ones.
+MIGRATIONS = [
+    _migrate_return_policy_columns,
+    _migrate_keys_and_indexes,
+    _migrate_products_fts,
+    _migrate_policy_facts,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
 
 def init_db_schema():
     """Ensure schema migrations are applied."""
-    # Create a fresh connection for migration to avoid interfering with thread locals roughly,
-    # though it doesn't matter much for startup.
-    conn = sqlite3.connect(str(_DB_PATH))
+    # Autocommit mode so each migration runs in its own explicit transaction
+    conn = sqlite3.connect(str(_DB_PATH), isolation_level=None)
     cur = conn.cursor()
     
     try:
-        cur.execute("PRAGMA table_info(products)")
-        cols = [r[1] for r in cur.fetchall()]
-        
-        if "is_returnable" not in cols:
-            print("Migrating: Adding is_returnable to products")
-            cur.execute("ALTER TABLE products ADD COLUMN is_returnable INTEGER DEFAULT 1")
-            
-        if "return_window_days" not in cols:
-            print("Migrating: Adding return_window_days to products")
-            cur.execute("ALTER TABLE products ADD COLUMN return_window_days INTEGER DEFAULT 7")
-            
-        conn.commit()
+        version = cur.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            print(f"Migrating: v{number} {migration.__doc__}")
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                migration(cur)
+                cur.execute(f"PRAGMA user_version = {number}")
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+        # Recreating products outside the migrations (e.g. init_sqlite.py) drops the FTS triggers
+        cur.execute("BEGIN IMMEDIATE")
+        ensure_products_fts(conn)
+        cur.execute("COMMIT")
+        cur.execute("PRAGMA optimize")
     except Exception as e:
         print(f"Migration warning: {e}")
     finally:
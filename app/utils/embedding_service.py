@@ -0,0 +1,178 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+from chromadb.api.types import EmbeddingFunction
+
+from app.metrics import EMBED_BATCH_SIZE, EMBED_QUEUE_SECONDS, EMBED_SECONDS
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+# "torch" (sentence-transformers default) or "onnx" (ONNX Runtime; needs `pip install optimum[onnxruntime]`)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Model file inside the repo's onnx/ folder; the int8-quantized export by default, "" for the fp32 model.onnx
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "3"))
+
+_STOP = object()
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class EmbeddingService(EmbeddingFunction):
+    """Chroma-compatible embedding function that micro-batches concurrent callers.
+
+    Callers put their texts on a queue and wait on a future. One worker thread takes
+    the first request, keeps collecting until it has max_batch texts or max_wait_ms
+    has passed, encodes them all in one model call and hands each caller its slice.
+    Under load the batch also fills up while the previous one is encoding, so
+    requests stop competing for the CPU one text at a time.
+    """
+
+    def __init__(self, embedding_fn, max_batch: int = EMBED_MAX_BATCH, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        self._ef = embedding_fn
+        self.backend = getattr(embedding_fn, "backend_name", EMBEDDING_BACKEND)
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._max_batch_seen = 0
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    # ---------- Chroma EmbeddingFunction interface ----------
+
+    def __call__(self, input: List[str]):
+        return self.submit(list(input)).result()
+
+    def name(self):
+        # Same name as the wrapped function, so collections built with either open with either
+        return self._ef.name()
+
+    def get_config(self):
+        return self._ef.get_config()
+
+    @staticmethod
+    def build_from_config(config):
+        from chromadb.utils import embedding_functions
+        return embedding_functions.SentenceTransformerEmbeddingFunction.build_from_config(config)
+
+    def default_space(self):
+        return self._ef.default_space()
+
+    # ---------- Batching ----------
+
+    def submit(self, texts: List[str]) -> Future:
+        request = _Request(texts)
+        if not texts:
+            request.future.set_result([])
+        else:
+            self._queue.put(request)
+        return request.future
+
+    async def aembed(self, texts: List[str]):
+        """Await the embeddings without holding a thread while the batch is collected and encoded."""
+        return await asyncio.wrap_future(self.submit(list(texts)))
+
+    def _collect(self, first: _Request):
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait_s
+        stop = False
+        while size < self.max_batch:
+            try:
+                # Take whatever is already queued, then wait out the rest of the window
+                timeout = deadline - time.perf_counter()
+                item = self._queue.get_nowait() if timeout <= 0 else self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+            size += len(item.texts)
+        return batch, size, stop
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, size, stop = self._collect(first)
+            started = time.perf_counter()
+            for request in batch:
+                EMBED_QUEUE_SECONDS.observe(started - request.enqueued)
+            EMBED_BATCH_SIZE.observe(size)
+            try:
+                vectors = self._ef([text for request in batch for text in request.texts])
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+            else:
+                offset = 0
+                for request in batch:
+                    request.future.set_result(vectors[offset:offset + len(request.texts)])
+                    offset += len(request.texts)
+            EMBED_SECONDS.observe(time.perf_counter() - started)
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._texts += size
+                self._max_batch_seen = max(self._max_batch_seen, size)
+            if stop:
+                return
+
+    def close(self):
+        self._queue.put(_STOP)
+
+    def stats(self) -> dict:
+        with self._lock:
+            batches, requests, texts, peak = self._batches, self._requests, self._texts, self._max_batch_seen
+        return {
+            "backend": self.backend,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_s * 1000,
+            "batches": batches,
+            "requests": requests,
+            "texts": texts,
+            "avg_batch_size": round(texts / batches, 2) if batches else 0.0,
+            "max_batch_size": peak,
+            "queued": self._queue.qsize(),
+        }
+
+
+def load_embedding_function(model_name: str = EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND):
+    """The sentence-transformers embedding function, on ONNX Runtime when asked and available."""
+    from chromadb.utils import embedding_functions
+
+    if backend == "onnx":
+        kwargs = {"backend": "onnx"}
+        if EMBEDDING_ONNX_FILE:
+            kwargs["model_kwargs"] = {"file_name": EMBEDDING_ONNX_FILE}
+        try:
+            ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name, **kwargs)
+            ef.backend_name = f"onnx:{EMBEDDING_ONNX_FILE or 'onnx/model.onnx'}"
+            return ef
+        except Exception as e:
+            print(f"ONNX embedding backend unavailable ({e}); falling back to torch")
+    ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+    ef.backend_name = "torch"
+    return ef
+
+
+def build_embedding_service() -> EmbeddingService:
+    return EmbeddingService(load_embedding_function())
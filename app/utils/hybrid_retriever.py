@@ -0,0 +1,125 @@
+import heapq
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+# How many candidates each retriever contributes, the relevance cutoff (fraction of the best
+# score within a retriever) and the bounds on how many chunks go into the prompt
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))
+HYBRID_CUTOFF = float(os.getenv("HYBRID_CUTOFF", "0.5"))
+HYBRID_MIN_K = int(os.getenv("HYBRID_MIN_K", "1"))
+HYBRID_MAX_K = int(os.getenv("HYBRID_MAX_K", "4"))
+RRF_K = 60
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its my of on or the this to what when "
+    "where which will with you your".split()
+)
+
+
+def tokenize(text: str):
+    # Crude plural folding so "phone" matches "Phones" and "day" matches "days"
+    return [
+        t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+        for t in _TOKEN.findall(text.lower())
+        if t not in _STOPWORDS
+    ]
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory list of chunks; exact terms like "30" or "electronics" count fully."""
+
+    def __init__(self, ids, documents, k1: float = 1.5, b: float = 0.75):
+        self.ids = list(ids)
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(list)  # term -> [(doc index, term frequency)]
+        self._lengths = []
+        for i, doc in enumerate(documents):
+            tf = Counter(tokenize(doc or ""))
+            self._lengths.append(sum(tf.values()))
+            for term, n in tf.items():
+                self._postings[term].append((i, n))
+        n_docs = len(self.ids)
+        self._avg_len = (sum(self._lengths) / n_docs) if n_docs else 1.0
+        self._idf = {
+            term: math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self._postings.items()
+        }
+
+    def search(self, query: str, k: int):
+        """Top-k (id, score) pairs, best first; chunks sharing no query term are not returned."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                norm = 1 - self.b + self.b * self._lengths[i] / self._avg_len
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.ids[i], score) for i, score in top]
+
+
+class HybridRetriever:
+    """Vector + BM25 retrieval fused with reciprocal rank fusion, with k chosen by a score cutoff.
+
+    Each retriever contributes its top `candidates`; a chunk's fused score is the sum of
+    1 / (60 + rank) over the lists it appears in, and sets the order. The cutoff is applied
+    per retriever: a chunk is kept (between min_k and max_k of them) when, in a list it
+    appears in, it scores at least `cutoff` x that list's best (BM25 score, or the best
+    vector distance over its distance). Comparing fused scores instead would drop every
+    chunk only one retriever found as soon as another chunk was found by both.
+    Results use Chroma's query() layout so callers can treat both the same.
+    """
+
+    def __init__(self, collection, candidates: int = HYBRID_CANDIDATES, cutoff: float = HYBRID_CUTOFF,
+                 min_k: int = HYBRID_MIN_K, max_k: int = HYBRID_MAX_K):
+        self.collection = collection
+        self.candidates = candidates
+        self.cutoff = cutoff
+        self.min_k = min_k
+        self.max_k = max_k
+        # The chunks are small and few, so keep them in memory next to the BM25 index
+        data = collection.get(include=["documents", "metadatas"])
+        self._chunks = {
+            cid: (doc, meta) for cid, doc, meta in zip(data["ids"], data["documents"], data["metadatas"])
+        }
+        self.bm25 = BM25Index(data["ids"], data["documents"])
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def retrieve(self, query: str, embedding) -> dict:
+        if not self._chunks:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "scores": [[]]}
+        n = min(self.candidates, len(self._chunks))
+        vector = self.collection.query(query_embeddings=[embedding], n_results=n, include=["distances"])
+        lexical = self.bm25.search(query, n)
+
+        # Relevance relative to the best hit of the same retriever, 1.0 for that hit
+        relevance = defaultdict(float)
+        distances = vector["distances"][0]
+        for cid, distance in zip(vector["ids"][0], distances):
+            relevance[cid] = max(relevance[cid], distances[0] / distance if distance > 0 else 1.0)
+        for cid, score in lexical:
+            relevance[cid] = max(relevance[cid], score / lexical[0][1])
+
+        fused = defaultdict(float)
+        for ranking in (vector["ids"][0], [cid for cid, _ in lexical]):
+            for rank, cid in enumerate(ranking, 1):
+                fused[cid] += 1 / (RRF_K + rank)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        chosen = [
+            (cid, score)
+            for i, (cid, score) in enumerate(ranked[:self.max_k])
+            if i < self.min_k or relevance[cid] >= self.cutoff
+        ]
+        chosen = [(cid, score) for cid, score in chosen if cid in self._chunks]
+        return {
+            "ids": [[cid for cid, _ in chosen]],
+            "documents": [[self._chunks[cid][0] for cid, _ in chosen]],
+            "metadatas": [[self._chunks[cid][1] for cid, _ in chosen]],
+            "scores": [[round(score, 5) for _, score in chosen]],
+        }
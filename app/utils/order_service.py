@@ -1,5 +1,9 @@
+import os
 from typing import List, Dict, Optional
-from .db import get_cursor
+from .db import reader, write
+from app.metrics import SQL_SECONDS, timed
+from .batch_memo import invalidates_batch, shared_in_batch
+from .result_cache import result_cache
 from datetime import datetime, timezone
 
 # ---------- Helper functions ----------
@@ -19,19 +23,17 @@ def parse_date(date_str: str) -> Optional[datetime]:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt
 
+@shared_in_batch
+@result_cache.cached(tags=lambda **_: ["products"])
+@timed(SQL_SECONDS)
 def get_product_return_policy(product_id: int, default_window: int = 7) -> Dict:
     """Return product-level return policy."""
-    cur = get_cursor()
-    cur.execute("PRAGMA table_info(products)")
-    cols = [r[1] for r in cur.fetchall()]
-    conn = cur.connection
-
-    # Schema checks moved to app/utils/db.py:init_db_schema()
-
-    cur.execute(
-        "SELECT is_returnable, return_window_days FROM products WHERE id = ?", (product_id,)
-    )
-    row = cur.fetchone()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT is_returnable, return_window_days FROM products WHERE id = ?", (product_id,)
+        )
+        row = cur.fetchone()
     if not row:
         return {"is_returnable": None, "return_window_days": default_window}
     is_ret, win = row
@@ -40,64 +42,84 @@ def get_product_return_policy(product_id: int, default_window: int = 7) -> Dict:
         "return_window_days": None if win is None else int(win),
     }
 
+def _returnability_columns(default_window: int = 7) -> str:
+    """SELECT-list fragment giving days_since, return_window and eligible for `orders o JOIN products p`.
+
+    All three are NULL/0 unless the order is delivered, so a single statement answers
+    the return question without re-reading the order or the product.
+    """
+    delivered = "o.status_norm = 'delivered'"
+    days = "CAST(julianday('now') - julianday(o.delivered_date) AS INTEGER)"
+    window = f"COALESCE(p.return_window_days, {int(default_window)})"
+    return f"""
+        CASE WHEN {delivered} THEN {days} END AS days_since,
+        CASE WHEN {delivered} THEN {window} END AS return_window,
+        CASE WHEN {delivered} AND {days} <= {window} THEN 1 ELSE 0 END AS eligible
+    """
+
 def is_returnable(order_id: str, return_window_days: int = 7) -> bool:
-    cur = get_cursor()
-    cur.execute("SELECT status, delivered_date, product_id FROM orders WHERE order_id = ?", (order_id.strip(),))
-    row = cur.fetchone()
-    if not row:
-        return False
-    status, delivered_on, product_id = row
-    if status.lower() != "delivered":
-        return False
-    policy = get_product_return_policy(product_id)
-    window = policy.get("return_window_days", return_window_days)
-    dt = parse_date(delivered_on)
-    if not dt:
-        return False
-    now = datetime.now(timezone.utc)
-    return (now - dt).days <= window
+    return get_returnability_info(order_id, return_window_days)["eligible"]
 
+@shared_in_batch
+@result_cache.cached(tags=lambda order_id, **_: [f"order:{str(order_id).strip()}"])
+@timed(SQL_SECONDS)
 def get_returnability_info(order_id: str, default_window: int = 7) -> Dict:
     """Return structured return eligibility info."""
-    cur = get_cursor()
-    cur.execute("SELECT status, delivered_date, product_id FROM orders WHERE order_id = ?", (order_id.strip(),))
-    row = cur.fetchone()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT {_returnability_columns(default_window)}
+            FROM orders o
+            LEFT JOIN products p ON p.id = o.product_id
+            WHERE o.order_id = ?
+            """,
+            (order_id.strip(),)
+        )
+        row = cur.fetchone()
     if not row:
         return {"eligible": False, "days_since": None, "window": None}
-    status, delivered_on, product_id = row
-    if status.lower() != "delivered":
-        return {"eligible": False, "days_since": None, "window": None}
+    days_since, window, eligible = row
+    return {"eligible": bool(eligible), "days_since": days_since, "window": window}
 
-    policy = get_product_return_policy(product_id, default_window)
-    window = policy.get("return_window_days", default_window)
-    dt = parse_date(delivered_on)
-    if not dt:
-        return {"eligible": False, "days_since": None, "window": window}
+# ---------- Order queries ----------
+# Cached results are tagged with every order they contain (plus the tags below); writes
+# invalidate the tags they touch, see _invalidate_cancelled
 
-    now = datetime.now(timezone.utc)
-    days_since = (now - dt).days
-    eligible = days_since <= window
-    return {"eligible": eligible, "days_since": days_since, "window": window}
+_STATUS_SYNONYMS = {
+    "pending": ["pending", "processing"],
+    "processing": ["pending", "processing"],
+    "delivered": ["delivered"],
+    "cancelled": ["cancelled", "canceled"],
+    "returned": ["returned"],
+}
 
-# ---------- Order queries ----------
 
+def _statuses(status_filter: str) -> List[str]:
+    key = status_filter.strip().lower()
+    return _STATUS_SYNONYMS.get(key, [key])
+
+
+@shared_in_batch
+@result_cache.cached(tags=lambda order_id, **_: [f"order:{str(order_id).strip()}"])
+@timed(SQL_SECONDS)
 def order_by_id(order_id: str) -> Dict:
-    cur = get_cursor()
-    cur.execute(
-        """
-        SELECT o.status, p.name, o.delivered_date, o.user_id, p.id
-        FROM orders o
-        JOIN products p ON p.id = o.product_id
-        WHERE o.order_id = ?
-        """,
-        (order_id.strip(),)
-    )
-    row = cur.fetchone()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT o.status, p.name, o.delivered_date, o.user_id, {_returnability_columns()}
+            FROM orders o
+            JOIN products p ON p.id = o.product_id
+            WHERE o.order_id = ?
+            """,
+            (order_id.strip(),)
+        )
+        row = cur.fetchone()
     if not row:
         return {"found": False, "order_id": order_id}
 
-    status, product_name, date, user_id, product_id = row
-    returnability = get_returnability_info(order_id)
+    status, product_name, date, user_id, days_since, window, eligible = row
     return {
         "found": True,
         "order_id": order_id,
@@ -105,26 +127,30 @@ def order_by_id(order_id: str) -> Dict:
         "status": status,
         "date": date,
         "user_id": user_id,
-        "returnable": returnability.get("eligible"),
-        "days_since_delivery": returnability.get("days_since"),
-        "return_window_days": returnability.get("window")
+        "returnable": bool(eligible),
+        "days_since_delivery": days_since,
+        "return_window_days": window
     }
 
+@shared_in_batch
+@result_cache.cached()
+@timed(SQL_SECONDS)
 def orders_by_product_name(product_name: str, limit: int = 5) -> Dict:
-    cur = get_cursor()
     like = f"%{product_name.strip()}%"
-    cur.execute(
-        """
-        SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
-        FROM orders o
-        JOIN products p ON p.id = o.product_id
-        WHERE p.name LIKE ? COLLATE NOCASE
-        ORDER BY date(o.ordered_date) DESC
-        LIMIT ?
-        """,
-        (like, limit)
-    )
-    rows = cur.fetchall()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
+            FROM orders o
+            JOIN products p ON p.id = o.product_id
+            WHERE p.name LIKE ? COLLATE NOCASE
+            ORDER BY o.ordered_date DESC
+            LIMIT ?
+            """,
+            (like, limit)
+        )
+        rows = cur.fetchall()
     if not rows:
         return {"found": False, "query": product_name, "orders": []}
 
@@ -134,97 +160,109 @@ def orders_by_product_name(product_name: str, limit: int = 5) -> Dict:
     ]
     return {"found": True, "query": product_name, "orders": orders}
 
+@shared_in_batch
+@result_cache.cached()
+@timed(SQL_SECONDS)
 def all_orders(limit: int = 20) -> Dict:
-    cur = get_cursor()
-    cur.execute(
-        """
-        SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
-        FROM orders o
-        JOIN products p ON p.id = o.product_id
-        ORDER BY date(o.ordered_date) DESC
-        LIMIT ?
-        """,
-        (limit,)
-    )
-    rows = cur.fetchall()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
+            FROM orders o
+            JOIN products p ON p.id = o.product_id
+            ORDER BY o.ordered_date DESC
+            LIMIT ?
+            """,
+            (limit,)
+        )
+        rows = cur.fetchall()
     orders = [
         {"order_id": oid, "user_id": uid, "status": st, "date": dt, "product_name": pname}
         for oid, uid, st, dt, pname in rows
     ]
     return {"found": bool(rows), "orders": orders}
 
+@shared_in_batch
+@result_cache.cached(tags=lambda user_id, **_: [f"user:{str(user_id).strip()}"])
+@timed(SQL_SECONDS)
 def orders_by_user(user_id: str, limit: int = 20) -> Dict:
-    cur = get_cursor()
-    cur.execute(
-        """
-        SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
-        FROM orders o
-        JOIN products p ON p.id = o.product_id
-        WHERE o.user_id = ?
-        ORDER BY date(o.ordered_date) DESC
-        LIMIT ?
-        """,
-        (user_id.strip(), limit)
-    )
-    rows = cur.fetchall()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
+            FROM orders o
+            JOIN products p ON p.id = o.product_id
+            WHERE o.user_id = ?
+            ORDER BY o.ordered_date DESC
+            LIMIT ?
+            """,
+            (user_id.strip(), limit)
+        )
+        rows = cur.fetchall()
     orders = [
         {"order_id": oid, "user_id": uid, "status": st, "date": dt, "product_name": pname}
         for oid, uid, st, dt, pname in rows
     ]
     return {"found": bool(rows), "user_id": user_id, "orders": orders}
 
+@shared_in_batch
+@result_cache.cached(tags=lambda status_filter, **_: [f"status:{s}" for s in _statuses(status_filter)])
+@timed(SQL_SECONDS)
 def orders_by_status(status_filter: str, limit: int = 20) -> Dict:
-    cur = get_cursor()
-    key = status_filter.strip().lower()
-    synonyms = {
-        "pending": ["pending", "processing"],
-        "processing": ["pending", "processing"],
-        "delivered": ["delivered"],
-        "cancelled": ["cancelled", "canceled"],
-        "returned": ["returned"],
-    }
-    statuses = synonyms.get(key, [key])
-    placeholders = ",".join(["?" for _ in statuses])
-    sql = f"""
+    statuses = _statuses(status_filter)
+    # One index-ordered arm per status merged by UNION ALL; an IN (...) list
+    # would need a temp B-tree to sort the combined rows by date
+    arm = """
         SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
         FROM orders o
         JOIN products p ON p.id = o.product_id
-        WHERE LOWER(o.status) IN ({placeholders})
-        ORDER BY date(o.ordered_date) DESC
-        LIMIT ?
+        WHERE o.status_norm = ?
     """
-    cur.execute(sql, [s for s in statuses] + [limit])
-    rows = cur.fetchall()
+    sql = " UNION ALL ".join([arm] * len(statuses)) + " ORDER BY 4 DESC LIMIT ?"
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, [s for s in statuses] + [limit])
+        rows = cur.fetchall()
     orders = [
         {"order_id": oid, "user_id": uid, "status": st, "date": dt, "product_name": pname}
         for oid, uid, st, dt, pname in rows
     ]
     return {"found": bool(rows), "status_filter": status_filter, "orders": orders}
 
+@shared_in_batch
+@result_cache.cached(tags=lambda user_id, **_: [f"user:{str(user_id).strip()}"])
+@timed(SQL_SECONDS)
 def orders_returnable_by_user(user_id: str, return_window_days: int = 7, limit: int = 100) -> Dict:
-    cur = get_cursor()
-    cur.execute(
-        """
-        SELECT o.order_id, o.status, o.delivered_date, p.name
-        FROM orders o
-        JOIN products p ON p.id = o.product_id
-        WHERE o.user_id = ?
-        ORDER BY date(o.delivered_date) DESC
-        LIMIT ?
-        """,
-        (user_id.strip(), limit)
-    )
-    rows = cur.fetchall()
-    returnable_orders = []
-    for order_id, status, date, product_name in rows:
-        if status.lower() == "delivered" and is_returnable(order_id, return_window_days):
-            returnable_orders.append({
-                "order_id": order_id,
-                "product_name": product_name,
-                "date": date,
-                "user_id": user_id,
-                "returnable": True
-            })
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT order_id, product_name, date FROM (
+                SELECT o.order_id, p.name AS product_name, o.delivered_date AS date,
+                       {_returnability_columns(return_window_days)}
+                FROM orders o
+                JOIN products p ON p.id = o.product_id
+                WHERE o.user_id = ? AND o.status_norm = 'delivered'
+            )
+            WHERE eligible = 1
+            ORDER BY date DESC
+            LIMIT ?
+            """,
+            (user_id.strip(), limit)
+        )
+        rows = cur.fetchall()
+    returnable_orders = [
+        {
+            "order_id": order_id,
+            "product_name": product_name,
+            "date": date,
+            "user_id": user_id,
+            "returnable": True
+        }
+        for order_id, product_name, date in rows
+    ]
     return {
         "found": bool(returnable_orders),
         "user_id": user_id,
@@ -233,125 +271,196 @@ def orders_returnable_by_user(user_id: str, return_window_days: int = 7, limit:
 
 # ---------- Order cancellation functions ----------
 
+def _cancel_refusal(status: str) -> Optional[str]:
+    """Why an order with this status can't be cancelled, or None if it can (only processing orders)."""
+    status_lower = status.lower()
+    if status_lower == "processing":
+        return None
+    elif status_lower == "delivered":
+        return "Delivered orders cannot be cancelled"
+    elif status_lower in ["cancelled", "canceled"]:
+        return "Order already cancelled"
+    elif status_lower in ["pending", "shipped"]:
+        return f"Orders with status '{status}' cannot be cancelled"
+    else:
+        return f"Cannot cancel order with status: {status}"
+
+@shared_in_batch
+@result_cache.cached(tags=lambda order_id, **_: [f"order:{str(order_id).strip()}"])
+@timed(SQL_SECONDS)
 def can_cancel_order(order_id: str) -> Dict:
     """Check if an order can be cancelled based on its current status (only processing orders allowed)."""
-    cur = get_cursor()
-    cur.execute("SELECT status, ordered_date FROM orders WHERE order_id = ?", (order_id.strip(),))
-    row = cur.fetchone()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT status, ordered_date FROM orders WHERE order_id = ?", (order_id.strip(),))
+        row = cur.fetchone()
     
     if not row:
         return {"can_cancel": False, "reason": "Order not found", "order_id": order_id}
     
     status, ordered_date = row
-    status_lower = status.lower()
-    
-    # Define cancellation rules - only processing orders can be cancelled
-    if status_lower == "processing":
+    refusal = _cancel_refusal(status)
+    if refusal is None:
         return {"can_cancel": True, "reason": "Order can be cancelled", "order_id": order_id, "status": status}
-    elif status_lower == "delivered":
-        return {"can_cancel": False, "reason": "Delivered orders cannot be cancelled", "order_id": order_id, "status": status}
-    elif status_lower in ["cancelled", "canceled"]:
-        return {"can_cancel": False, "reason": "Order already cancelled", "order_id": order_id, "status": status}
-    elif status_lower in ["pending", "shipped"]:
-        return {"can_cancel": False, "reason": f"Orders with status '{status}' cannot be cancelled", "order_id": order_id, "status": status}
-    else:
-        return {"can_cancel": False, "reason": f"Cannot cancel order with status: {status}", "order_id": order_id, "status": status}
+    return {"can_cancel": False, "reason": refusal, "order_id": order_id, "status": status}
 
-def cancel_order(order_id: str, reason: str = "Customer request") -> Dict:
-    """Cancel an order by updating its status to cancelled."""
-    cur = get_cursor()
-    conn = cur.connection
-    
-    # First check if cancellation is allowed
-    can_cancel = can_cancel_order(order_id)
-    if not can_cancel.get("can_cancel", False):
-        return {
-            "success": False, 
-            "order_id": order_id,
-            "error": can_cancel.get("reason", "Cancellation not allowed"),
-            "current_status": can_cancel.get("status")
+# IDs per statement, well below SQLite's bound-parameter limit
+_CANCEL_CHUNK = 500
+# Most orders one cancel_orders call may name; it holds the single writer throughout
+CANCEL_MAX_ORDERS = int(os.getenv("CANCEL_MAX_ORDERS", "1000"))
+
+def _chunks(order_ids: List[str]):
+    for i in range(0, len(order_ids), _CANCEL_CHUNK):
+        yield order_ids[i:i + _CANCEL_CHUNK]
+
+# Timed on the writer thread, so the histogram holds SQL time only; the wait for the
+# writer is db_write_queue_seconds
+@timed(SQL_SECONDS, "cancel_processing")
+def _cancel_processing(conn, order_ids: List[str]) -> List[tuple]:
+    """Cancel those of order_ids that are still processing; (order_id, user_id, product_name) of each.
+
+    The status check is the UPDATE's own WHERE clause, so an order is cancelled by at
+    most one caller however many try at once, without a SELECT before or after.
+    """
+    cancelled = []
+    for chunk in _chunks(order_ids):
+        cancelled += conn.execute(
+            f"""
+            UPDATE orders SET status = 'cancelled'
+            WHERE order_id IN ({', '.join('?' * len(chunk))}) AND status_norm = 'processing'
+            RETURNING order_id, user_id, (SELECT p.name FROM products p WHERE p.id = orders.product_id)
+            """,
+            chunk
+        ).fetchall()
+    return cancelled
+
+def _invalidate_cancelled(rows: List[tuple]):
+    # Drop cached results that mention these orders or their users, or list processing/cancelled orders
+    result_cache.invalidate([
+        *(f"order:{oid}" for oid, _, _ in rows),
+        *{f"user:{str(uid).strip()}" for _, uid, _ in rows},
+        *(f"status:{s}" for s in _statuses("processing")),
+        "status:cancelled",
+    ])
+
+@timed(SQL_SECONDS, "cancel_refusals")
+def _refusals(order_ids: List[str]) -> Dict[str, Dict]:
+    """For orders that weren't cancelled: the error and current status of each, from one read."""
+    if not order_ids:
+        return {}
+    statuses = {}
+    with reader() as conn:
+        for chunk in _chunks(order_ids):
+            statuses.update(conn.execute(
+                f"SELECT order_id, status FROM orders WHERE order_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ).fetchall())
+    return {
+        oid: {
+            "order_id": oid,
+            "error": (_cancel_refusal(statuses[oid]) or "Cancellation not allowed") if oid in statuses else "Order not found",
+            "current_status": statuses.get(oid),
         }
-    
+        for oid in order_ids
+    }
+
+@invalidates_batch
+def cancel_order(order_id: str, reason: str = "Customer request") -> Dict:
+    """Cancel an order by updating its status to cancelled (only processing orders allowed)."""
     try:
-        # Get current order details for logging
-        cur.execute(
-            "SELECT o.status, p.name FROM orders o JOIN products p ON o.product_id = p.id WHERE o.order_id = ?", 
-            (order_id.strip(),)
-        )
-        order_details = cur.fetchone()
-        
-        if not order_details:
-            return {"success": False, "order_id": order_id, "error": "Order not found"}
-        
-        current_status, product_name = order_details
-        
-        # Update order status to cancelled
-        cur.execute(
-            "UPDATE orders SET status = 'cancelled' WHERE order_id = ?", 
-            (order_id.strip(),)
-        )
-        
-        if cur.rowcount == 0:
-            return {"success": False, "order_id": order_id, "error": "Failed to update order status"}
-        
-        conn.commit()
-        
+        # One conditional UPDATE on the write queue; the status is only read again to explain a refusal
+        rows = write(_cancel_processing, [order_id.strip()])
+    except Exception as e:
         return {
-            "success": True,
+            "success": False,
             "order_id": order_id,
-            "product_name": product_name,
-            "previous_status": current_status,
-            "new_status": "cancelled",
-            "cancellation_reason": reason,
-            "message": f"Order {order_id} for {product_name} has been successfully cancelled"
+            "error": f"Database error: {str(e)}"
         }
-        
+
+    if not rows:
+        refusal = _refusals([order_id.strip()])[order_id.strip()]
+        return {"success": False, **refusal, "order_id": order_id}
+
+    _invalidate_cancelled(rows)
+    _, user_id, product_name = rows[0]
+    return {
+        "success": True,
+        "order_id": order_id,
+        "product_name": product_name,
+        "previous_status": "processing",
+        "new_status": "cancelled",
+        "cancellation_reason": reason,
+        "message": f"Order {order_id} for {product_name} has been successfully cancelled"
+    }
+
+@invalidates_batch
+def cancel_orders(order_ids: List[str], reason: str = "Customer request") -> Dict:
+    """Cancel several orders in one transaction; each is cancelled only if it is still processing.
+
+    At most CANCEL_MAX_ORDERS distinct IDs; more raise ValueError.
+    """
+    ids = list(dict.fromkeys(str(oid).strip() for oid in order_ids if str(oid).strip()))
+    if len(ids) > CANCEL_MAX_ORDERS:
+        raise ValueError(f"At most {CANCEL_MAX_ORDERS} orders per call")
+    try:
+        rows = write(_cancel_processing, ids)
     except Exception as e:
-        conn.rollback()
         return {
             "success": False,
-            "order_id": order_id,
+            "order_ids": ids,
             "error": f"Database error: {str(e)}"
         }
 
+    if rows:
+        _invalidate_cancelled(rows)
+    done = {oid for oid, _, _ in rows}
+    refused = _refusals([oid for oid in ids if oid not in done])
+    return {
+        "success": bool(rows),
+        "cancelled": [
+            {"order_id": oid, "user_id": uid, "product_name": pname, "previous_status": "processing"}
+            for oid, uid, pname in rows
+        ],
+        "not_cancelled": list(refused.values()),
+        "cancellation_reason": reason,
+        "count": len(rows),
+    }
+
+@shared_in_batch
+@result_cache.cached(tags=lambda user_id, **_: [f"user:{str(user_id).strip()}" if user_id else "status:processing"])
+@timed(SQL_SECONDS)
 def get_cancellable_orders(user_id: str = None, limit: int = 20) -> Dict:
     """Get orders that can be cancelled (processing status only)."""
-    cur = get_cursor()
-    
     # Build query based on whether user_id is provided - only processing orders
+    select = """
+        SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name,
+               CAST(julianday('now') - julianday(o.ordered_date) AS INTEGER)
+        FROM orders o
+        JOIN products p ON p.id = o.product_id
+    """
     if user_id:
-        sql = """
-            SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
-            FROM orders o
-            JOIN products p ON p.id = o.product_id
-            WHERE o.user_id = ? AND LOWER(o.status) = 'processing'
-            ORDER BY date(o.ordered_date) DESC
+        sql = select + """
+            WHERE o.user_id = ? AND o.status_norm = 'processing'
+            ORDER BY o.ordered_date DESC
             LIMIT ?
         """
         params = (user_id.strip(), limit)
     else:
-        sql = """
-            SELECT o.order_id, o.user_id, o.status, o.ordered_date, p.name
-            FROM orders o
-            JOIN products p ON p.id = o.product_id
-            WHERE LOWER(o.status) = 'processing'
-            ORDER BY date(o.ordered_date) DESC
+        sql = select + """
+            WHERE o.status_norm = 'processing'
+            ORDER BY o.ordered_date DESC
             LIMIT ?
         """
         params = (limit,)
     
-    cur.execute(sql, params)
-    rows = cur.fetchall()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
     
     # All processing orders are cancellable
-    cancellable_orders = []
-    now = datetime.now(timezone.utc)
-    
-    for oid, uid, st, dt, pname in rows:
-        order_dt = parse_date(dt)
-        days_since_order = (now - order_dt).days if order_dt else None
-        
-        cancellable_orders.append({
+    cancellable_orders = [
+        {
             "order_id": oid, 
             "user_id": uid, 
             "status": st, 
@@ -359,7 +468,9 @@ def get_cancellable_orders(user_id: str = None, limit: int = 20) -> Dict:
             "product_name": pname,
             "can_cancel": True,
             "days_since_order": days_since_order
-        })
+        }
+        for oid, uid, st, dt, pname, days_since_order in rows
+    ]
     
     return {
         "found": bool(cancellable_orders),
@@ -0,0 +1,303 @@
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.metrics import POLICY_FACT_LOOKUPS
+from app.utils.db import reader, write, POLICY_FACTS_DDL
+from app.utils.hybrid_retriever import tokenize
+from app.utils.semantic_cache import BUILD_STAMP_FILE
+
+# Set to 0 to send every policy question to retrieval (ReturnPolicyTool and the fast path)
+POLICY_FACTS_ENABLED = os.getenv("POLICY_FACTS_ENABLED", "1") != "0"
+
+# ---------- Extraction (run by init_rag at ingest) ----------
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_DAYS = re.compile(r"\b(\d+)(?:\s*[–-]\s*(\d+))?[- ](?:business |working )?days?\b", re.I)
+_REFUND = re.compile(r"\brefund", re.I)
+_DAMAGED = re.compile(r"\bdamaged\b", re.I)
+_DAMAGED_REMEDY = re.compile(r"\b(free returns?|replaced|replacement)\b", re.I)
+_NOT_RETURNABLE = re.compile(r"\b(not returnable|non-returnable|cannot be returned)\b", re.I)
+_REPLACEMENT = re.compile(r"\breplacement\b", re.I)
+_RETURN = re.compile(r"\breturn", re.I)
+# Where the subject of a rule ends: "Laptops and tablets | have a 10-day return window"
+_SUBJECT_END = re.compile(
+    r"\s+(?:can be returned|can be replaced|may be returned|cannot be returned|ha(?:ve|s) an?|"
+    r"(?:are|is) (?:not |non-)?returnable)\b",
+    re.I,
+)
+_STORE_WIDE = re.compile(r"^you (?:may|can) return (?:most |all |any )?(?:items|products)\b", re.I)
+_LIST_SPLIT = re.compile(r",\s*(?:and |or |including |such as |like )?|\s+(?:and|or|including|such as|like)\s+", re.I)
+# Qualifiers after the noun: "earbuds | with a broken hygiene seal", "orders | delivered to ..."
+_QUALIFIER = re.compile(r"\s+(?:once|with|if|when|that|for|after|unless|marked|delivered|shipped|bought)\b.*$", re.I)
+_DETERMINER = re.compile(r"^(?:some|most|all|any|the|a|an|your)\s+", re.I)
+# Too generic to be a subject on their own
+_GENERIC = {"item", "product", "order", "thing"}
+
+
+def terms(text: str):
+    """tokenize() plus "-ies"/"-ches" plural folding, so "accessories"/"accessory" and "watches"/"watch" meet."""
+    out = []
+    for t in tokenize(text):
+        if t.endswith("ie"):
+            t = t[:-2] + "y"
+        elif t.endswith(("che", "she", "xe")):
+            t = t[:-1]
+        out.append(t)
+    return out
+
+
+def _subjects(phrase: str):
+    """Normalized subjects of a rule: each listed noun phrase, plus the head noun of two-word ones."""
+    subjects = []
+    for part in _LIST_SPLIT.split(_DETERMINER.sub("", phrase.strip())):
+        tokens = terms(_DETERMINER.sub("", _QUALIFIER.sub("", part.strip())))
+        if not tokens or set(tokens) <= _GENERIC:
+            continue
+        for subject in (" ".join(tokens), tokens[-1] if len(tokens) == 2 else None):
+            if subject and subject not in subjects:
+                subjects.append(subject)
+    return subjects
+
+
+def _subject_phrase(sentence: str):
+    if ":" in sentence:
+        return sentence.split(":", 1)[1].rstrip(".")
+    end = _SUBJECT_END.search(sentence)
+    return sentence[:end.start()] if end else None
+
+
+def extract_facts(text: str, source: str):
+    """Deadlines, eligibility rules and exceptions stated in one policy document.
+
+    Rule-based and conservative: a sentence becomes a fact only when its kind and what it
+    applies to are clear from its wording; everything else stays RAG-only. Each fact keeps
+    the sentence itself, which is what gets shown as the answer.
+    """
+    facts = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(line for line in paragraph.splitlines() if not line.lstrip().startswith("#"))
+        for sentence in _SENTENCE.split(paragraph.strip()):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            days = _DAYS.search(sentence)
+            low = int(days.group(1)) if days else None
+            high = int(days.group(2) or days.group(1)) if days else None
+            subjects = None
+            if _REFUND.search(sentence) and days:
+                kind, subjects = "refund_time", [""]
+            elif _DAMAGED.search(sentence) and _DAMAGED_REMEDY.search(sentence):
+                kind, subjects = "damaged", [""]
+            elif _NOT_RETURNABLE.search(sentence):
+                kind = "not_returnable"
+            elif _REPLACEMENT.search(sentence) and days:
+                kind = "replacement_window"
+            elif _RETURN.search(sentence) and days:
+                kind = "return_window"
+                if _STORE_WIDE.search(sentence):
+                    subjects = [""]
+            else:
+                continue
+            if subjects is None:
+                phrase = _subject_phrase(sentence)
+                subjects = _subjects(phrase) if phrase else []
+            for subject in subjects:
+                facts.append({
+                    "kind": kind, "subject": subject, "days_min": low, "days_max": high,
+                    "text": sentence, "source": source,
+                })
+    return facts
+
+
+_FACT_COLUMNS = ("kind", "subject", "days_min", "days_max", "text", "source")
+
+
+def _replace_facts(conn, rows) -> bool:
+    for ddl in POLICY_FACTS_DDL:
+        conn.execute(ddl)
+    current = conn.execute(f"SELECT {', '.join(_FACT_COLUMNS)} FROM policy_facts ORDER BY id").fetchall()
+    if current == rows:
+        return False
+    conn.execute("DELETE FROM policy_facts")
+    conn.executemany(f"INSERT INTO policy_facts ({', '.join(_FACT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+    return True
+
+
+def store_facts(facts) -> bool:
+    """Replace the policy_facts table with `facts`; returns False (and writes nothing) when unchanged."""
+    # In document order, so answers quote sentences in the order the policy states them
+    rows = list(dict.fromkeys(tuple(f[c] for c in _FACT_COLUMNS) for f in facts))
+    return write(_replace_facts, rows)
+
+
+# ---------- Lookup ----------
+
+_QUESTION_ORDER_ID = re.compile(r"\b\d{4,}\b")
+# Compound, action or follow-up ("can I return it?") questions need retrieval or the agent, not a single fact
+_NEEDS_RAG = re.compile(
+    r"\b(and|or|vs|versus|cancel\w*|exchange\w*|warranty|how do|how can|where|it|this|that|them|these|those)\b|,"
+)
+# About the user's own orders: the agent can look them up, a generic rule would only guess
+_PERSONAL = re.compile(r"\b(my|mine|our|i (have |had |just )?(ordered|bought|purchased|got|received))\b")
+_ASKS_REFUND_TIME = re.compile(r"\brefunds?\b.*\b(how long|when|how many days|take|takes)\b|\b(how long|when)\b.*\brefund")
+_ASKS_DAMAGED = re.compile(r"\b(damaged|defective|wrong|broken)\b")
+_ASKS_RETURN = re.compile(r"\b(return\w*|refundable|send (it |them )?back)\b")
+_ASKS_ELIGIBILITY = re.compile(
+    r"\b(how (many|long)|days?|window|deadline|can i (still )?(return|send)|returnable|refundable|eligible|allowed)\b"
+)
+# Question words that say nothing about what is being returned
+_FILLER = set(terms(
+    "how many long days have return returnable returned returning refund refundable refunds window deadline "
+    "item product thing purchase order time take takes get back after before within eligible allowed send "
+    "policy period much still there general standard usual normal need buy bought delivery delivered "
+    "damaged defective wrong broken arrived came"
+))
+RETURN_KINDS = ("return_window", "replacement_window", "not_returnable")
+
+
+class PolicyFacts:
+    """Answers common policy questions from the policy_facts table, without embeddings, Chroma or an LLM.
+
+    The facts are loaded into memory on first use and again whenever init_rag writes a new
+    build stamp. A question is answered only when it asks one thing the facts settle: a
+    refund time, damaged-item returns, or the return window/eligibility of one kind of item,
+    and nothing else: any other word (a number of days, "worn", "last week") could change the
+    answer, so such questions go to retrieval too.
+    Items no document covers are answered from the products' is_returnable/return_window_days
+    columns by category; anything else returns None and goes to retrieval.
+    """
+
+    def __init__(self, rag_dir: str = None, max_extra_words: int = 0):
+        self.rag_dir = rag_dir or os.getenv("RAG_DIR", "rag_db")
+        self.max_extra_words = max_extra_words
+        self._lock = threading.Lock()
+        self._stamp_mtime = -1
+        self._facts = {}  # (kind, subject) -> [fact]
+        self._subjects = []  # (subject tokens, subject), most specific first
+        self._categories = {}  # category tokens -> catalogue summary
+        self.loads = 0
+        self.lookups = 0
+        self.hits = 0
+
+    def _stamp(self):
+        try:
+            return os.stat(Path(self.rag_dir) / BUILD_STAMP_FILE).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        facts, categories = {}, {}
+        try:
+            with reader() as conn:
+                for kind, subject, low, high, text, source in conn.execute(
+                    "SELECT kind, subject, days_min, days_max, text, source FROM policy_facts ORDER BY source, id"
+                ):
+                    facts.setdefault((kind, subject), []).append(
+                        {"kind": kind, "subject": subject, "days_min": low, "days_max": high, "text": text, "source": source}
+                    )
+                for category, n, returnable, low, high in conn.execute(
+                    "SELECT category, COUNT(*), SUM(is_returnable), MIN(return_window_days), MAX(return_window_days) "
+                    "FROM products WHERE category IS NOT NULL GROUP BY category"
+                ):
+                    tokens = tuple(terms(category))
+                    if tokens:
+                        categories[tokens] = (category, n, returnable or 0, low, high)
+        except sqlite3.OperationalError as e:
+            # Schema not migrated yet; every question goes to retrieval until the next reload
+            print(f"Policy facts unavailable: {e}")
+        subjects = sorted({s for _, s in facts if s}, key=lambda s: -len(s.split()))
+        with self._lock:
+            self._facts = facts
+            self._subjects = [(set(s.split()), s) for s in subjects]
+            self._categories = categories
+            self.loads += 1
+
+    def _reload_if_rebuilt(self):
+        stamp = self._stamp()
+        if stamp != self._stamp_mtime:
+            self._stamp_mtime = stamp
+            self._load()
+
+    def _answer(self, kind: str, facts):
+        texts = list(dict.fromkeys(f["text"] for f in facts))
+        return {"kind": kind, "answer": " ".join(texts), "facts": facts}
+
+    @staticmethod
+    def _catalogue_answer(category, n, returnable, low, high):
+        if not returnable:
+            return f"Products in the {category} category are not returnable."
+        window = f"{low} days" if low == high else f"{low}–{high} days depending on the product"
+        answer = f"Products in the {category} category can be returned within {window} of delivery."
+        if returnable < n:
+            answer += f" {n - returnable} of {n} {category} products are marked non-returnable on their product page."
+        return answer
+
+    def _match(self, question: str):
+        q = question.lower().replace("’", "'")
+        if _QUESTION_ORDER_ID.search(q) or _NEEDS_RAG.search(q) or _PERSONAL.search(q):
+            return None
+        tokens = set(terms(q))
+        # Numbers count: "after 10 days" is a different question from the window itself
+        words = tokens - _FILLER
+
+        if _ASKS_REFUND_TIME.search(q) and len(words) <= self.max_extra_words:
+            facts = self._facts.get(("refund_time", ""))
+            return self._answer("refund_time", facts) if facts else None
+        if not _ASKS_RETURN.search(q):
+            return None
+        if _ASKS_DAMAGED.search(q):
+            facts = self._facts.get(("damaged", ""))
+            return self._answer("damaged", facts) if facts and len(words) <= self.max_extra_words else None
+        if not _ASKS_ELIGIBILITY.search(q):
+            return None
+
+        best = None
+        for subject_tokens, subject in self._subjects:
+            if best is not None and len(subject_tokens) < len(best[0]):
+                break
+            if subject_tokens <= tokens and any((k, subject) in self._facts for k in RETURN_KINDS):
+                best = best or (subject_tokens, [])
+                best[1].append(subject)
+        if best is not None:
+            if len(words - best[0]) > self.max_extra_words:
+                return None
+            facts = [f for k in RETURN_KINDS for s in best[1] for f in self._facts.get((k, s), [])]
+            return self._answer("return_window", facts)
+
+        for category_tokens, summary in self._categories.items():
+            if set(category_tokens) <= tokens and len(words - set(category_tokens)) <= self.max_extra_words:
+                return {"kind": "catalogue", "answer": self._catalogue_answer(*summary), "facts": []}
+
+        facts = self._facts.get(("return_window", ""))
+        if facts and not words:
+            return self._answer("return_window", facts)
+        return None
+
+    def lookup(self, question: str):
+        """{"kind", "answer", "facts"} when a stored fact settles the question, else None."""
+        self._reload_if_rebuilt()
+        result = self._match(question)
+        with self._lock:
+            self.lookups += 1
+            if result is not None:
+                self.hits += 1
+        POLICY_FACT_LOOKUPS.inc("hit" if result is not None else "miss")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "facts": sum(len(v) for v in self._facts.values()),
+                "subjects": len(self._subjects),
+                "categories": len(self._categories),
+                "loads": self.loads,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            }
+
+
+policy_facts = PolicyFacts()
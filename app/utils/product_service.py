@@ -1,6 +1,10 @@
 from typing import List, Tuple
 import re
-from .db import get_cursor
+import sqlite3
+from .db import reader
+from app.metrics import SQL_SECONDS, timed
+from .batch_memo import shared_in_batch
+from .result_cache import result_cache
 
 
 def _to_number(num_str: str, has_k: str | None) -> float:
@@ -47,16 +51,26 @@ def extract_terms(text: str) -> List[str]:
         "over", "above", "more", "between", "and", "to", "from", "price", "priced",
         "products", "items", "the", "of", "for", "with", "in",
     }
-    tokens = [w for w in t.split() if not w.isdigit() and w not in stop]
+    # Drop bare numbers and price amounts like "50k"; parse_price_filter handles those
+    tokens = [w for w in t.split() if not re.fullmatch(r"\d+k?", w) and w not in stop]
     # naive singularization
     normalized = [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in tokens]
     return normalized
 
 
-def search_products(query: str) -> List[tuple]:
-    """Search products by tokens in name/category and optional price filter (under/over/between)."""
-    cur = get_cursor()
+def _price_clause(query: str, column: str = "price") -> Tuple[List[str], list]:
     op, v1, v2 = parse_price_filter(query)
+    if op == "<" and v1 is not None:
+        return [f"{column} < ?"], [v1]
+    if op == ">" and v1 is not None:
+        return [f"{column} > ?"], [v1]
+    if op == "between" and v1 is not None and v2 is not None:
+        return [f"{column} BETWEEN ? AND ?"], [v1, v2]
+    return [], []
+
+
+def _search_products_like(cur, query: str) -> List[tuple]:
+    """Substring search over name/category; used when products_fts is unavailable."""
     terms = extract_terms(query)
 
     where = []
@@ -70,15 +84,9 @@ def search_products(query: str) -> List[tuple]:
             params.extend([like, like])
         where.append("(" + " OR ".join(name_or_cat) + ")")
 
-    if op == "<" and v1 is not None:
-        where.append("price < ?")
-        params.append(v1)
-    elif op == ">" and v1 is not None:
-        where.append("price > ?")
-        params.append(v1)
-    elif op == "between" and v1 is not None and v2 is not None:
-        where.append("price BETWEEN ? AND ?")
-        params.extend([v1, v2])
+    price_where, price_params = _price_clause(query)
+    where += price_where
+    params += price_params
 
     where_sql = " AND ".join(where) if where else "1=1"
     sql = f"SELECT name, price FROM products WHERE {where_sql} LIMIT 50"
@@ -86,21 +94,77 @@ def search_products(query: str) -> List[tuple]:
     return cur.fetchall()
 
 
+def _search_products_fts(cur, query: str, limit: int = 50) -> List[tuple]:
+    """Full-text search over name/category/description, best bm25 matches first.
+
+    Only products matching every term are returned when there are any; otherwise
+    falls back to products matching any term (the old LIKE behaviour).
+    """
+    terms = extract_terms(query)
+    if not terms:
+        # Price-only query: nothing to rank on
+        return _search_products_like(cur, query)
+
+    price_where, price_params = _price_clause(query, "p.price")
+    where_sql = " AND ".join(["products_fts MATCH ?"] + price_where)
+    sql = f"""
+        SELECT p.name, p.price
+        FROM products_fts
+        JOIN products p ON p.id = products_fts.rowid
+        WHERE {where_sql}
+        ORDER BY bm25(products_fts, 10.0, 5.0, 1.0)
+        LIMIT ?
+    """
+    # Terms are already reduced to [a-z0-9], so quoting is safe; prefix match keeps
+    # "laptop" matching "laptops" and "air" matching "airdopes" like the LIKE search did
+    phrases = [f'"{w}"*' for w in terms]
+    cur.execute(sql, tuple([" AND ".join(phrases)] + price_params + [limit]))
+    rows = cur.fetchall()
+    if not rows and len(terms) > 1:
+        cur.execute(sql, tuple([" OR ".join(phrases)] + price_params + [limit]))
+        rows = cur.fetchall()
+    return rows
+
+
+@shared_in_batch
+@result_cache.cached(tags=lambda **_: ["products"])
+@timed(SQL_SECONDS)
+def search_products(query: str) -> List[tuple]:
+    """Search products by tokens in name/category/description and optional price filter (under/over/between)."""
+    with reader() as conn:
+        cur = conn.cursor()
+        try:
+            return _search_products_fts(cur, query)
+        except sqlite3.OperationalError as e:
+            if "products_fts" not in str(e):
+                raise
+            # Schema not migrated yet (init_db_schema builds the index)
+            return _search_products_like(cur, query)
+
+
+@shared_in_batch
+@result_cache.cached(tags=lambda **_: ["products"])
+@timed(SQL_SECONDS)
 def products_in_category(category: str) -> List[tuple]:
-    cur = get_cursor()
     like = f"%{category}%"
-    cur.execute(
-        "SELECT name, price FROM products WHERE category LIKE ?",
-        (like,),
-    )
-    return cur.fetchall()
-
-
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT name, price FROM products WHERE category LIKE ?",
+            (like,),
+        )
+        return cur.fetchall()
+
+
+@shared_in_batch
+@result_cache.cached(tags=lambda **_: ["products"])
+@timed(SQL_SECONDS)
 def price_of_product(name: str) -> List[tuple]:
-    cur = get_cursor()
     like = f"%{name}%"
-    cur.execute(
-        "SELECT name, price FROM products WHERE name LIKE ? ORDER BY LENGTH(name) ASC LIMIT 5",
-        (like,),
-    )
-    return cur.fetchall()
+    with reader() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT name, price FROM products WHERE name LIKE ? ORDER BY LENGTH(name) ASC LIMIT 5",
+            (like,),
+        )
+        return cur.fetchall()
@@ -0,0 +1,348 @@
+import functools
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from app.metrics import RESULT_CACHE_LOOKUPS
+
+# "memory" (per process, the default), "sqlite" (one file shared by every worker) or "off"
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "60"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "4096"))
+# Relative to the repo root, like DB_PATH
+RESULT_CACHE_PATH = str(
+    (Path(__file__).resolve().parents[2] / os.getenv("RESULT_CACHE_PATH", "db/result_cache.db")).resolve()
+)
+
+
+class MemoryBackend:
+    """Per-process LRU with TTL and a tag -> keys index for invalidation."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._tags = {}  # tag -> set of keys
+        self._version = 0
+        self.evictions = 0
+
+    def version(self) -> int:
+        return self._version
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[1] < time.monotonic():
+                self._drop(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[0]
+
+    def set(self, key, value, tags, ttl_s: float, version: int):
+        with self._lock:
+            # An invalidation ran while the value was being computed; it may already be stale
+            if version != self._version:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl_s, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags) -> int:
+        with self._lock:
+            self._version += 1
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "evictions": self.evictions}
+
+
+class SQLiteBackend:
+    """Cache table in a SQLite file shared by every worker process, so invalidations reach all of them.
+
+    Values are pickled (they only ever come from this app's own service functions).
+    LRU is approximate: last_used is refreshed at most every few seconds per entry,
+    and overflow is trimmed every `trim_every` writes.
+    """
+
+    name = "sqlite"
+    TOUCH_INTERVAL_S = 5.0
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_entries: int = RESULT_CACHE_MAX_ENTRIES, trim_every: int = 64):
+        self.path = path
+        self.max_entries = max_entries
+        self.trim_every = trim_every
+        self._local = threading.local()
+        self._writes = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL, last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used);
+                CREATE TABLE IF NOT EXISTS tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_tags_key ON tags(key);
+                CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL);
+                INSERT OR IGNORE INTO meta (id, version) VALUES (1, 0);
+                """
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; services run on the request thread pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self) -> int:
+        return self._conn().execute("SELECT version FROM meta WHERE id = 1").fetchone()[0]
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires, last_used FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        now = time.time()
+        if row[1] < now:
+            conn.execute("DELETE FROM entries WHERE key = ? AND expires < ?", (key, now))
+            return False, None
+        if now - row[2] > self.TOUCH_INTERVAL_S:
+            conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value, tags, ttl_s: float, version: int):
+        conn = self._conn()
+        now = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # An invalidation (from any worker) ran while the value was being computed
+            if conn.execute("SELECT version FROM meta WHERE id = 1").fetchone()[0] != version:
+                conn.execute("ROLLBACK")
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires, last_used) VALUES (?, ?, ?, ?)",
+                (key, blob, now + ttl_s, now),
+            )
+            conn.execute("DELETE FROM tags WHERE key = ?", (key,))
+            conn.executemany("INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)", [(t, key) for t in tags])
+            self._writes += 1
+            if self._writes % self.trim_every == 0:
+                self._trim(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _trim(self, conn, now: float):
+        conn.execute("DELETE FROM entries WHERE expires < ?", (now,))
+        overflow = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_used LIMIT ?)", (overflow,)
+            )
+            self.evictions += overflow
+        conn.execute("DELETE FROM tags WHERE key NOT IN (SELECT key FROM entries)")
+
+    def invalidate(self, tags) -> int:
+        tags = list(tags)
+        if not tags:
+            return 0
+        marks = ",".join("?" * len(tags))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE meta SET version = version + 1 WHERE id = 1")
+            removed = conn.execute(
+                f"DELETE FROM entries WHERE key IN (SELECT key FROM tags WHERE tag IN ({marks}))", tags
+            ).rowcount
+            conn.execute(f"DELETE FROM tags WHERE tag IN ({marks})", tags)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return removed
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE meta SET version = version + 1 WHERE id = 1")
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM tags")
+        conn.execute("COMMIT")
+
+    def stats(self) -> dict:
+        entries = self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"entries": entries, "evictions": self.evictions, "path": self.path}
+
+
+def _result_tags(value, tags: set):
+    # Every order a result mentions, so a write to any of them drops it. Users are not tagged
+    # here: a list of one user's orders is tagged by its user_id argument instead, so a write
+    # to one order doesn't drop every other list that happens to include that user's orders
+    if isinstance(value, dict):
+        if value.get("order_id") is not None:
+            tags.add(f"order:{str(value['order_id']).strip()}")
+        for v in value.values():
+            if isinstance(v, (list, dict)):
+                _result_tags(v, tags)
+    elif isinstance(value, list):
+        for v in value:
+            _result_tags(v, tags)
+
+
+class ResultCache:
+    """TTL + LRU cache for service query results, invalidated by tag when data changes.
+
+    Each cached result is tagged with the orders it contains plus whatever the decorated
+    function adds from its arguments (e.g. "user:2001", "status:processing"). Writes
+    call invalidate() with the tags they touched once they have committed.
+    """
+
+    def __init__(self, backend=None, ttl_s: float = RESULT_CACHE_TTL_S):
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._functions = {}  # name -> {"hits": n, "misses": n}
+        self.invalidations = 0
+        self.invalidated_entries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def _count(self, name: str, outcome: str):
+        RESULT_CACHE_LOOKUPS.inc(name, outcome)
+        with self._lock:
+            counts = self._functions.setdefault(name, {"hits": 0, "misses": 0})
+            counts["hits" if outcome == "hit" else "misses"] += 1
+
+    def cached(self, tags=None):
+        """Decorator caching the function's result; `tags(**arguments)` adds tags from its arguments.
+
+        The undecorated function stays available as `.uncached` for reads that must be fresh.
+        """
+
+        def decorator(func):
+            name = func.__name__
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return func(*args, **kwargs)
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = f"{name}:{json.dumps(bound.arguments, sort_keys=True, default=str)}"
+                try:
+                    found, value = self.backend.get(key)
+                    if found:
+                        self._count(name, "hit")
+                        return value
+                    version = self.backend.version()
+                except sqlite3.Error as e:
+                    print(f"Result cache unavailable for {name}: {e}")
+                    return func(*args, **kwargs)
+                self._count(name, "miss")
+                value = func(*args, **kwargs)
+                entry_tags = set(tags(**bound.arguments)) if tags else set()
+                _result_tags(value, entry_tags)
+                try:
+                    self.backend.set(key, value, entry_tags, self.ttl_s, version)
+                except sqlite3.Error as e:
+                    print(f"Result cache write failed for {name}: {e}")
+                return value
+
+            wrapper.uncached = func
+            return wrapper
+
+        return decorator
+
+    def invalidate(self, tags) -> int:
+        """Drop every entry carrying any of the tags; call after the write has committed."""
+        if self.backend is None:
+            return 0
+        removed = self.backend.invalidate(set(tags))
+        with self._lock:
+            self.invalidations += 1
+            self.invalidated_entries += removed
+        return removed
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        if self.backend is None:
+            return {"backend": "off"}
+        with self._lock:
+            functions = {name: dict(counts) for name, counts in sorted(self._functions.items())}
+        hits = sum(c["hits"] for c in functions.values())
+        lookups = hits + sum(c["misses"] for c in functions.values())
+        for counts in functions.values():
+            n = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / n, 4) if n else 0.0
+        return {
+            "backend": self.backend.name,
+            "ttl_s": self.ttl_s,
+            **self.backend.stats(),
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "invalidated_entries": self.invalidated_entries,
+            "functions": functions,
+        }
+
+
+def build_backend(name: str = RESULT_CACHE_BACKEND):
+    if name == "off":
+        return None
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name != "memory":
+        print(f"Unknown RESULT_CACHE_BACKEND '{name}', using memory")
+    return MemoryBackend()
+
+
+result_cache = ResultCache(build_backend())
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# init_rag.py rewrites this file whenever it rebuilds the collection
+BUILD_STAMP_FILE = ".build_id"
+
+
+def write_build_stamp(rag_dir: str) -> str:
+    """Record a new build ID for the RAG collection so caches keyed on it are dropped."""
+    build_id = uuid.uuid4().hex
+    path = Path(rag_dir) / BUILD_STAMP_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(build_id)
+    return build_id
+
+
+def read_build_stamp(rag_dir: str) -> Optional[str]:
+    try:
+        return (Path(rag_dir) / BUILD_STAMP_FILE).read_text().strip() or None
+    except OSError:
+        return None
+
+
+class SemanticCache:
+    """Answer cache keyed on query embeddings.
+
+    A lookup is a hit when the cosine similarity to a stored query is >= threshold.
+    Entries are evicted LRU beyond max_entries and expire after ttl_s seconds.
+    The whole cache is dropped when the RAG build stamp in rag_dir changes.
+    """
+
+    def __init__(self, rag_dir: str, threshold: float = 0.92, max_entries: int = 256, ttl_s: float = 3600):
+        self.rag_dir = rag_dir
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (unit vector, answer, created_at, llm_latency_s)
+        self._matrix = None  # stacked vectors in _entries order, rebuilt lazily
+        self._keys = []
+        self._next_key = 0
+        self._stamp_mtime = None
+        self.build_id = read_build_stamp(rag_dir)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_llm_s = 0.0
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        v = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def check_build(self) -> bool:
+        """Clear the cache if the collection was rebuilt; returns True when that happened."""
+        try:
+            mtime = os.stat(Path(self.rag_dir) / BUILD_STAMP_FILE).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._stamp_mtime:
+            return False
+        self._stamp_mtime = mtime
+        build_id = read_build_stamp(self.rag_dir)
+        if build_id == self.build_id:
+            return False
+        self.build_id = build_id
+        self.clear()
+        self.invalidations += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self._keys = []
+
+    def _evict_expired(self, now: float):
+        expired = [k for k, e in self._entries.items() if now - e[2] > self.ttl_s]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, embedding) -> Optional[str]:
+        q = self._unit(embedding)
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            if self._entries:
+                if self._matrix is None:
+                    self._keys = list(self._entries.keys())
+                    self._matrix = np.stack([self._entries[k][0] for k in self._keys])
+                scores = self._matrix @ q
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = self._keys[best]
+                    # move_to_end keeps _keys/_matrix valid since only the order changes
+                    self._entries.move_to_end(key)
+                    _, answer, _, latency = self._entries[key]
+                    self.hits += 1
+                    self.saved_llm_s += latency
+                    return answer
+            self.misses += 1
+            return None
+
+    def store(self, embedding, answer: str, llm_latency_s: float = 0.0):
+        with self._lock:
+            self._entries[self._next_key] = (self._unit(embedding), answer, time.monotonic(), llm_latency_s)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "saved_llm_ms": round(self.saved_llm_s * 1000, 1),
+            "build_id": self.build_id,
+        }
@@ -0,0 +1,71 @@
+import os
+
+# Rows of a list result shown to the model; the rest are summarized as "N more ... not shown"
+TOOL_OUTPUT_MAX_ROWS = int(os.getenv("TOOL_OUTPUT_MAX_ROWS", "10"))
+# The keys the system prompt and run_agent's check_not_found rely on; always kept, even when falsy
+CONTRACT_KEYS = ("found", "success", "can_cancel")
+
+
+def _empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def table(rows, columns, key: str = "rows", max_rows: int = TOOL_OUTPUT_MAX_ROWS) -> dict:
+    """Row tuples as one column header plus value lists, cut to max_rows with a count of the rest."""
+    out = {"columns": list(columns), "rows": [list(r) for r in rows[:max_rows]]}
+    if len(rows) > max_rows:
+        out["more"] = f"{len(rows) - max_rows} more {key.replace('_', ' ')} not shown"
+    return out
+
+
+def _tabulate(key: str, rows, drop, max_rows: int):
+    """(columns with the same value on every row, table of the rest) for a list of row dicts."""
+    columns = []
+    for row in rows:
+        for column, value in row.items():
+            if column not in drop and column not in columns and not _empty(value):
+                columns.append(column)
+    shared = {}
+    if len(rows) > 1:
+        for column in columns:
+            first = rows[0].get(column)
+            if column not in CONTRACT_KEYS and all(row.get(column) == first for row in rows):
+                shared[column] = first
+    columns = [c for c in columns if c not in shared]
+    return shared, table([tuple(row.get(c) for c in columns) for row in rows], columns, key, max_rows)
+
+
+def compact(result, drop=(), max_rows: int = TOOL_OUTPUT_MAX_ROWS):
+    """Token-lean version of a service result, for a ToolMessage.
+
+    Null and empty values and the `drop` keys are left out (top level and in rows), except
+    the found/success/can_cancel flags. Lists of two or more row dicts become a table;
+    a column with the same value on every row (e.g. the user's ID) is moved to the top
+    level once, unless that key is already there with another value.
+    """
+    if not isinstance(result, dict):
+        return result
+    out = {}
+    for key, value in result.items():
+        if key in CONTRACT_KEYS:
+            out[key] = value
+        elif key in drop or _empty(value):
+            continue
+        elif isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+            if len(value) == 1:
+                out[key] = [{k: v for k, v in value[0].items() if k not in drop and not _empty(v)}]
+                continue
+            shared, rows = _tabulate(key, value, drop, max_rows)
+            for column, shared_value in shared.items():
+                existing = result.get(column)
+                if column not in drop and (_empty(existing) or existing == shared_value):
+                    out[column] = shared_value
+                else:
+                    # Conflicts with a top-level key: keep it as a column
+                    rows["columns"].append(column)
+                    for row in rows["rows"]:
+                        row.append(shared_value)
+            out[key] = rows
+        else:
+            out[key] = value
+    return out
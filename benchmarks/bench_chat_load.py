@@ -0,0 +1,212 @@
+"""End-to-end load test of app.api:app with a scripted fake LLM, fully offline.
+
+Usage:
+    python benchmarks/bench_chat_load.py --concurrency 16 --requests 400 --llm-latency-ms 300
+
+Each worker posts a query drawn from a weighted mix of query types to /chat
+through httpx's in-process ASGI transport (no sockets, no uvicorn), so the
+numbers measure the app: admission control, fast path, agent graph, tools,
+SQLite and the policy retriever. The fake LLM sleeps --llm-latency-ms per call,
+which usually dominates; set it to 0 to see the app's own overhead.
+
+The JSON report holds overall throughput and latency percentiles, the same per
+query type, HTTP status counts and the app's own per-stage histograms from
+/metrics/json (chat, LLM, each tool, each SQL query, retrieval). Keep reports
+from two commits and pass --baseline to print the p50/p95/throughput deltas.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from harness import REPO_ROOT, ScriptedChatModel, git_commit, prepare_offline_app, sample_order_ids, write_json
+
+QUERY_TYPES = {
+    "order_status": ["Where is my order {oid}?", "What's the status of order {oid}", "Track order {oid} for me"],
+    "my_orders": ["Show my recent orders", "What are my orders?"],
+    "orders_by_status": ["Which orders are delivered?", "List pending orders", "Show shipped orders"],
+    "product_search": ["Show me laptops under 50000", "I'm looking for running shoes", "price of earbuds"],
+    "return_policy": ["Can I return shoes after 20 days?", "How long do refunds take?", "What is the exchange policy?"],
+    "cancel": ["Please cancel order {oid}", "Which of my orders can I cancel?"],
+    "smalltalk": ["hi there", "thanks, that's all"],
+    # Several independent tool calls in one agent step (not in the default mix)
+    "multi_tool": [
+        "Can I cancel orders {oid}, {oid2} or {oid3}?",
+        "Show my orders and the return policy",
+        "What is the return policy for shoes and electronics?",
+    ],
+}
+DEFAULT_MIX = "order_status=4,my_orders=2,orders_by_status=1,product_search=3,return_policy=3,cancel=1,smalltalk=1"
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in QUERY_TYPES:
+            raise SystemExit(f"Unknown query type {name!r}; choose from {', '.join(QUERY_TYPES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "max": round(ordered[-1], 2),
+    }
+
+
+async def run_load(api, args, mix: dict, order_ids: list) -> dict:
+    import httpx
+
+    rng = random.Random(args.seed)
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    plan = []
+    for _ in range(args.requests):
+        kind = rng.choices(kinds, weights)[0]
+        template = rng.choice(QUERY_TYPES[kind])
+        ids = rng.sample(order_ids, 3) if "{oid2}" in template else [rng.choice(order_ids)] * 3
+        query = template.format(oid=ids[0], oid2=ids[1], oid3=ids[2])
+        plan.append((kind, query))
+
+    results = []
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with api.app.router.lifespan_context(api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+            async def worker():
+                while True:
+                    try:
+                        kind, query = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    start = time.perf_counter()
+                    resp = await client.post("/chat", json={"query": query})
+                    results.append((kind, resp.status_code, (time.perf_counter() - start) * 1000))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            wall_s = time.perf_counter() - started
+            app_metrics = (await client.get("/metrics/json")).json()
+
+    ok = [ms for _, status, ms in results if status == 200]
+    status_counts = {}
+    for _, status, _ in results:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+    by_type = {
+        kind: percentiles([ms for k, status, ms in results if k == kind and status == 200])
+        for kind in kinds
+    }
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "mix": mix,
+            "fast_path": not args.no_fast_path,
+            "tool_selection": not args.no_tool_selection,
+        },
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(ok) / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": percentiles(ok),
+        "by_query_type": by_type,
+        "status_codes": status_counts,
+        "llm_calls": int(sum(app_metrics.get("instruments", {}).get("llm_calls_total", {}).values())),
+        "llm_input_tokens_per_request": round(
+            app_metrics.get("instruments", {}).get("llm_tokens_total", {}).get("input", 0) / len(ok), 1
+        ) if ok else 0.0,
+        "stages": app_metrics.get("instruments", {}),
+        "components": {k: v for k, v in app_metrics.items() if k != "instruments"},
+    }
+
+
+def print_summary(report: dict, baseline: dict = None):
+    lat = report["latency_ms"]
+    print(f"commit {report['commit']}  {report['config']['requests']} requests, concurrency {report['config']['concurrency']}")
+    print(f"throughput {report['throughput_rps']} req/s   p50 {lat.get('p50')} ms   p95 {lat.get('p95')} ms   p99 {lat.get('p99')} ms")
+    print(f"status codes {report['status_codes']}   LLM calls {report['llm_calls']}   "
+          f"LLM input tokens/request {report['llm_input_tokens_per_request']}")
+    print(f"\n{'query type':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind, p in report["by_query_type"].items():
+        print(f"{kind:<18}{p.get('count', 0):>6}{p.get('p50', '-'):>10}{p.get('p95', '-'):>10}{p.get('p99', '-'):>10}")
+
+    print(f"\n{'stage':<48}{'n':>7}{'avg ms':>10}{'p95 ms':>10}")
+    for metric, series in report["stages"].items():
+        for key, value in series.items():
+            if isinstance(value, dict) and "avg_ms" in value:
+                print(f"{metric + ':' + key:<48}{value['count']:>7}{value['avg_ms']:>10}{value['p95_ms']:>10}")
+
+    if baseline:
+        def delta(new, old):
+            return f"{new} vs {old} ({(new - old) / old * 100:+.1f}%)" if old else f"{new} vs {old}"
+
+        print(f"\nvs baseline {baseline.get('commit')}:")
+        print("  throughput", delta(report["throughput_rps"], baseline["throughput_rps"]))
+        for q in ("p50", "p95", "p99"):
+            print(f"  {q}", delta(lat.get(q, 0), baseline["latency_ms"].get(q, 0)))
+        print("  LLM input tokens/request", delta(
+            report["llm_input_tokens_per_request"], baseline.get("llm_input_tokens_per_request", 0)
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted query types (default: {DEFAULT_MIX})")
+    parser.add_argument("--no-fast-path", action="store_true", help="send every query through the LLM agent")
+    parser.add_argument("--no-tool-selection", action="store_true", help="bind every tool on every agent call")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--workdir", help="where to build the temp DB/RAG store (default: a fresh temp dir)")
+    parser.add_argument("--out", help="JSON report path (default: benchmarks/results/chat_load_<commit>.json)")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    out = Path(args.out).resolve() if args.out else REPO_ROOT / "benchmarks" / "results" / f"chat_load_{git_commit()}.json"
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    workdir = Path(args.workdir).resolve() if args.workdir else Path(tempfile.mkdtemp(prefix="chat_load_"))
+
+    llm = ScriptedChatModel(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms, seed=args.seed)
+    env = {}
+    if args.no_fast_path:
+        env["FAST_PATH_ENABLED"] = "0"
+    if args.no_tool_selection:
+        env["TOOL_SELECTION_ENABLED"] = "0"
+    api, _ = prepare_offline_app(workdir, llm, env)
+    order_ids = sample_order_ids(workdir / "retail.db")
+
+    report = asyncio.run(run_load(api, args, parse_mix(args.mix), order_ids))
+    write_json(out, report)
+    print_summary(report, baseline)
+    print(f"\nReport written to {out}")
+
+
+if __name__ == "__main__":
+    main()
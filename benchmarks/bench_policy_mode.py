@@ -0,0 +1,108 @@
+"""Compare ReturnPolicyTool's answer modes end to end: generate vs retrieve.
+
+Usage:
+    python benchmarks/bench_policy_mode.py --requests 200 --concurrency 8 --llm-latency-ms 300
+
+In "generate" mode the tool writes an answer with its own LLM call and the agent
+rephrases it, so a policy question costs three LLM calls; in "retrieve" mode the
+tool returns the ranked chunks and the agent answers from them in two. Each mode
+runs the return_policy queries of bench_chat_load against the offline app in its
+own process (the mode is read at import), with the semantic answer cache off
+unless --cache is given, since it would hide the tool's LLM call on repeats, and
+the policy facts table off, since it answers most of these questions in either mode.
+Token counts are the scripted model's usage (~4 characters per token) over every
+LLM call, the tool's own included.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from harness import REPO_ROOT, ScriptedChatModel, git_commit, prepare_offline_app, sample_order_ids, write_json
+
+MODES = ("generate", "retrieve")
+
+
+def run_mode(args) -> dict:
+    """Child process: load the app in one mode and run the policy queries through /chat."""
+    from bench_chat_load import run_load
+
+    llm = ScriptedChatModel(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms, seed=args.seed)
+    env = {
+        "POLICY_ANSWER_MODE": args.mode, "POLICY_CACHE_ENABLED": "1" if args.cache else "0", "POLICY_FACTS_ENABLED": "0",
+    }
+    workdir = Path(tempfile.mkdtemp(prefix=f"policy_mode_{args.mode}_"))
+    api, _ = prepare_offline_app(workdir, llm, env)
+    load_args = argparse.Namespace(
+        requests=args.requests, concurrency=args.concurrency, seed=args.seed,
+        llm_latency_ms=args.llm_latency_ms, llm_jitter_ms=args.llm_jitter_ms,
+        no_fast_path=False, no_tool_selection=False,
+    )
+    report = asyncio.run(run_load(api, load_args, {"return_policy": 1.0}, sample_order_ids(workdir / "retail.db")))
+    ok = report["latency_ms"].get("count", 0)
+    tokens = report["stages"].get("llm_tokens_total", {})
+    return {
+        "mode": args.mode,
+        "throughput_rps": report["throughput_rps"],
+        "latency_ms": report["latency_ms"],
+        "status_codes": report["status_codes"],
+        "llm_calls_per_request": round(report["llm_calls"] / ok, 2) if ok else 0.0,
+        "input_tokens_per_request": round(tokens.get("input", 0) / ok, 1) if ok else 0.0,
+        "output_tokens_per_request": round(tokens.get("output", 0) / ok, 1) if ok else 0.0,
+        "tool_ms": report["stages"].get("tool_duration_seconds", {}).get("ReturnPolicyTool"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cache", action="store_true", help="keep the semantic answer cache on (generate mode)")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help="JSON report path (default: benchmarks/results/policy_mode_<commit>.json)")
+    args = parser.parse_args()
+
+    if args.mode:
+        write_json(Path(args.out), run_mode(args))
+        return
+
+    results = {}
+    for mode in MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            child_out = Path(tmp) / f"{mode}.json"
+            cmd = [sys.executable, __file__, "--mode", mode, "--out", str(child_out),
+                   "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                   "--llm-latency-ms", str(args.llm_latency_ms), "--llm-jitter-ms", str(args.llm_jitter_ms),
+                   "--seed", str(args.seed)] + (["--cache"] if args.cache else [])
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+            results[mode] = json.loads(child_out.read_text(encoding="utf-8"))
+
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "requests": args.requests, "concurrency": args.concurrency, "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms, "cache": args.cache,
+        },
+        "modes": results,
+    }
+    out = Path(args.out).resolve() if args.out else REPO_ROOT / "benchmarks" / "results" / f"policy_mode_{report['commit']}.json"
+    write_json(out, report)
+
+    print(f"{args.requests} policy questions, concurrency {args.concurrency}, LLM latency {args.llm_latency_ms} ms")
+    print(f"\n{'mode':<10}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'LLM calls':>11}{'in tok':>9}{'out tok':>9}")
+    for mode, r in results.items():
+        lat = r["latency_ms"]
+        print(f"{mode:<10}{r['throughput_rps']:>8}{lat.get('p50', '-'):>9}{lat.get('p95', '-'):>9}"
+              f"{r['llm_calls_per_request']:>11}{r['input_tokens_per_request']:>9}{r['output_tokens_per_request']:>9}")
+    print(f"\nReport written to {out}")
+
+
+if __name__ == "__main__":
+    main()
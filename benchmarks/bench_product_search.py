@@ -0,0 +1,123 @@
+"""Compare the LIKE-based and FTS5-based product search on synthetic catalogues.
+
+Usage:
+    python benchmarks/bench_product_search.py --sizes 100000 1000000
+
+Reading the numbers: LIKE stops at the first 50 rows that match *any* term, in
+table order, so it is cheap for broad terms but returns unranked, mostly
+irrelevant rows, and it has to scan the whole table when few rows match.
+FTS5 returns products matching *all* terms ranked by bm25; its cost grows with
+the number of matching rows it has to score, not with the table size.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.utils.db import ensure_products_fts
+from app.utils.product_service import _search_products_fts, _search_products_like
+
+CATEGORIES = {
+    "shoes": ["Running Shoes", "Sneakers", "Trail Runner", "Walking Shoes", "Sandals"],
+    "laptop": ["Laptop", "Notebook", "Gaming Laptop", "Ultrabook", "Chromebook"],
+    "phone": ["Smartphone", "5G Phone", "Feature Phone", "Foldable Phone"],
+    "accessories": ["Earbuds", "Headphones", "Mouse", "Backpack", "Power Bank", "Smartwatch", "Monitor"],
+    "home": ["Electric Kettle", "Air Fryer", "Mixer Grinder", "Toaster", "Water Purifier"],
+}
+DESCRIPTIONS = ["with fast charging", "with foam sole", "noise cancelling Bluetooth", "with AMOLED display",
+                "stainless steel body", "lightweight for college", "with RTX graphics", "ergonomic wireless",
+                "with 2 year warranty", "water resistant", "energy efficient", "with USB-C"]
+SYLLABLES = ["ka", "zo", "ri", "mun", "tel", "vex", "lo", "dra", "quin", "sa", "bor", "nex", "pi", "tor", "gal"]
+
+
+def make_words(rng, count: int, parts: int):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(parts)).capitalize())
+    return sorted(words)
+
+
+def build_db(path: str, n: int, seed: int = 7):
+    """Create a catalogue of n products with ~500 brands and ~2000 product lines."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, category TEXT, price INTEGER, description TEXT)"
+    )
+    rng = random.Random(seed)
+    brands = make_words(rng, 500, 3)
+    lines = make_words(rng, 2000, 4)
+    cats = list(CATEGORIES)
+
+    def rows():
+        for i in range(n):
+            cat = rng.choice(cats)
+            name = f"{rng.choice(brands)} {rng.choice(lines)} {rng.choice(CATEGORIES[cat])} {rng.randint(1, 99)}"
+            yield (i + 1, name, cat, rng.randint(500, 150000), rng.choice(DESCRIPTIONS))
+
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?)", rows())
+    conn.commit()
+    start = time.perf_counter()
+    ensure_products_fts(conn)
+    conn.commit()
+
+    # Build queries from the generated vocabulary so they have realistic selectivity
+    q_rng = random.Random(seed + 1)
+    queries = {
+        "brand": f"{q_rng.choice(brands)}",
+        "brand + line": f"{q_rng.choice(brands)} {q_rng.choice(lines)}",
+        "line + type under 50k": f"{q_rng.choice(lines)} laptops under 50k",
+        "brand + type between": f"{q_rng.choice(brands)} phones between 20k and 40k",
+        "description term": "bluetooth",
+        "category (broad)": "air fryer",
+        "no match": "xylophone",
+    }
+    return conn, time.perf_counter() - start, queries
+
+
+def time_search(fn, cur, query: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(cur, query)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn, fts_build_s, queries = build_db(os.path.join(tmp, "bench.db"), n)
+            cur = conn.cursor()
+            print(f"\n{n:,} products (FTS index built in {fts_build_s:.1f}s)")
+            print(f"{'query':24} {'LIKE ms':>10} {'FTS5 ms':>10} {'speedup':>8}  {'LIKE rows':>9} {'FTS rows':>9}")
+            like_total = fts_total = 0.0
+            for label, q in queries.items():
+                like_ms = time_search(_search_products_like, cur, q, args.repeat)
+                fts_ms = time_search(_search_products_fts, cur, q, args.repeat)
+                like_rows = len(_search_products_like(cur, q))
+                fts_rows = len(_search_products_fts(cur, q))
+                like_total += like_ms
+                fts_total += fts_ms
+                print(
+                    f"{label:24} {like_ms:10.2f} {fts_ms:10.2f} {like_ms / fts_ms:7.1f}x"
+                    f"  {like_rows:9} {fts_rows:9}"
+                )
+            print(f"{'total':24} {like_total:10.2f} {fts_total:10.2f} {like_total / fts_total:7.1f}x")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
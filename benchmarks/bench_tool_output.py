@@ -0,0 +1,164 @@
+"""Prompt tokens of each order/product tool's output, before and after compaction.
+
+Usage:
+    python benchmarks/bench_tool_output.py                 # data/*.csv
+    python benchmarks/bench_tool_output.py --generated     # synthetic catalogue (app/setup/generate_data.py)
+
+Every tool is called with a handful of representative arguments drawn from the
+DB. "before" is what the tool used to put in its ToolMessage (the service result
+as-is, or the old "name – ₹price" lines for product tools), "after" is the
+current tool output, both serialized the way LangChain does it. A ToolMessage is
+re-sent on every later agent hop, so its savings count once per hop.
+Tokens: tiktoken cl100k_base, or chars/4 without it.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from eval_policy_retrieval import token_counter
+from harness import REPO_ROOT, build_db, git_commit, write_json
+
+
+def generate(data_dir: Path, products: int, orders: int, users: int, seed: int = 42):
+    from app.setup import generate_data
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    generate_data.write_products(data_dir / "products.csv", products, rng)
+    generate_data.write_orders(data_dir / "orders.csv", orders, products, users, rng, date.today(), 365)
+
+
+def sample_args(db_path: Path, n: int, seed: int = 7) -> dict:
+    """Arguments per tool, picked from what is in the DB so most calls find something."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(str(db_path))
+    try:
+        def column(sql):
+            values = [r[0] for r in conn.execute(sql)]
+            return rng.sample(values, min(n, len(values))) if values else []
+
+        order_ids = column("SELECT order_id FROM orders LIMIT 5000")
+        # Heaviest buyers first, so list tools see full pages
+        users = column("SELECT user_id FROM orders GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 50")
+        processing = column("SELECT order_id FROM orders WHERE lower(status) = 'processing' LIMIT 500")
+        names = column("SELECT name FROM products LIMIT 2000")
+        categories = column("SELECT DISTINCT category FROM products")
+    finally:
+        conn.close()
+    words = [name.split()[1] if len(name.split()) > 1 else name for name in names]
+    return {
+        "OrderTrackingTool": [{"order_id": str(o)} for o in order_ids],
+        "OrderTrackingByProductTool": [{"product_name": w} for w in words],
+        "AllOrdersTool": [{"limit": 20}],
+        "OrdersByStatusTool": [{"status": s} for s in ("delivered", "shipped", "pending", "cancelled")],
+        "OrdersByUserTool": [{"user_id": str(u)} for u in users],
+        "OrderCancellationCheckTool": [{"order_id": str(o)} for o in order_ids],
+        "CancellableOrdersTool": [{"user_id": str(u)} for u in users] + [{"user_id": ""}],
+        "MyOrdersTool": [{}],
+        "ProductSearchTool": [{"input": w} for w in words] + [{"input": f"{c} under 20000"} for c in categories],
+        "ProductCategoryTool": [{"input": c} for c in categories],
+        "ProductPriceTool": [{"input": w} for w in words],
+    }
+
+
+def before(name: str, args: dict):
+    """What the tool returned before its output was compacted."""
+    from app.utils import order_service as orders
+    from app.utils import product_service as products
+
+    lines = lambda rows, empty: "\n".join(f"{n} – ₹{p}" for n, p in rows) if rows else empty
+    calls = {
+        "OrderTrackingTool": lambda a: orders.order_by_id(a["order_id"]),
+        "OrderTrackingByProductTool": lambda a: orders.orders_by_product_name(a["product_name"], limit=5),
+        "AllOrdersTool": lambda a: orders.all_orders(a.get("limit", 20)),
+        "OrdersByStatusTool": lambda a: orders.orders_by_status(a["status"]),
+        "OrdersByUserTool": lambda a: orders.orders_by_user(a["user_id"]),
+        "OrderCancellationCheckTool": lambda a: orders.can_cancel_order(a["order_id"]),
+        "CancellableOrdersTool": lambda a: orders.get_cancellable_orders(a.get("user_id", "2001"), limit=20),
+        "MyOrdersTool": lambda a: orders.orders_by_user("2001", a.get("limit", 20)),
+        "ProductSearchTool": lambda a: lines(products.search_products(a["input"]), "No matching products found."),
+        "ProductCategoryTool": lambda a: lines(products.products_in_category(a["input"]), "No products found in that category."),
+        "ProductPriceTool": lambda a: lines(products.price_of_product(a["input"]), "No products found with that name."),
+    }
+    return calls[name](args)
+
+
+def serialize(output) -> str:
+    # What ends up in the ToolMessage (langchain_core.tools stringifies dicts as JSON)
+    return output if isinstance(output, str) else json.dumps(output, ensure_ascii=False)
+
+
+def run(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="tool_output_"))
+    data_dir = REPO_ROOT / "data"
+    if args.generated:
+        data_dir = workdir / "data"
+        generate(data_dir, args.products, args.orders, args.users)
+    db_path = workdir / "retail.db"
+    build_db(db_path, data_dir)
+    os.environ.update({"DB_PATH": str(db_path), "RESULT_CACHE_BACKEND": "off"})
+
+    from app.utils.db import init_db_schema
+    from app.tools.order import order_tool_list
+    from app.tools.product import product_tool_list
+
+    init_db_schema()
+    tools = {t.name: t for t in (*order_tool_list, *product_tool_list)}
+    count_tokens, tokenizer = token_counter()
+
+    per_tool = {}
+    for name, calls in sample_args(db_path, args.samples).items():
+        rows = []
+        for call in calls:
+            old = count_tokens(serialize(before(name, call)))
+            new = count_tokens(serialize(tools[name].invoke(call)))
+            rows.append((old, new))
+        if not rows:
+            continue
+        old_avg = statistics.fmean(o for o, _ in rows)
+        new_avg = statistics.fmean(n for _, n in rows)
+        per_tool[name] = {
+            "calls": len(rows),
+            "tokens_before": round(old_avg, 1),
+            "tokens_after": round(new_avg, 1),
+            "reduction": round(1 - new_avg / old_avg, 3) if old_avg else 0.0,
+        }
+    return {
+        "commit": git_commit(),
+        "dataset": "generated" if args.generated else "data/*.csv",
+        "tokenizer": tokenizer,
+        "tools": per_tool,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generated", action="store_true", help="use a synthetic dataset instead of data/*.csv")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=10, help="arguments tried per tool")
+    parser.add_argument("--out", help="JSON report path (default: benchmarks/results/tool_output_<commit>.json)")
+    args = parser.parse_args()
+
+    report = run(args)
+    out = Path(args.out).resolve() if args.out else REPO_ROOT / "benchmarks" / "results" / f"tool_output_{report['commit']}.json"
+    write_json(out, report)
+
+    print(f"dataset {report['dataset']}, tokens: {report['tokenizer']}")
+    print(f"\n{'tool':<28}{'calls':>6}{'before':>9}{'after':>9}{'saved':>8}")
+    for name, t in report["tools"].items():
+        print(f"{name:<28}{t['calls']:>6}{t['tokens_before']:>9}{t['tokens_after']:>9}{-t['reduction']:>+8.1%}")
+    print(f"\nReport written to {out}")
+
+
+if __name__ == "__main__":
+    main()
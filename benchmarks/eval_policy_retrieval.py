@@ -0,0 +1,138 @@
+"""Offline evaluation of policy retrieval: vector top-k vs hybrid BM25 + vector.
+
+Usage:
+    python benchmarks/eval_policy_retrieval.py                    # real embedding model
+    python benchmarks/eval_policy_retrieval.py --hash-embeddings  # no model download, fully offline
+
+Builds a throwaway collection from benchmarks/data/policies with init_rag's sync,
+then runs every question in benchmarks/data/policy_questions.json through each
+retrieval mode. A question counts as recalled when the chunks that would go into
+the prompt contain every expected phrase. Prompt tokens are counted on the exact
+prompt ReturnPolicyTool sends (tiktoken cl100k_base, or chars/4 without it).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from harness import REPO_ROOT, HashEmbeddingFunction, git_commit, write_json
+
+DATA_DIR = REPO_ROOT / "benchmarks" / "data"
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text)), "cl100k_base"
+    except Exception:
+        return lambda text: len(text) // 4, "chars/4"
+
+
+def build_collection(docs_dir: Path, workdir: Path, hash_embeddings: bool):
+    os.environ.update({"RAG_DIR": str(workdir / "rag_db"), "ANONYMIZED_TELEMETRY": "False"})
+    if hash_embeddings:
+        from chromadb.utils import embedding_functions
+        embedding_functions.SentenceTransformerEmbeddingFunction = HashEmbeddingFunction
+
+    import chromadb
+    from app.setup import init_rag
+    from app.utils.embedding_service import build_embedding_service
+
+    init_rag.sync(argparse.Namespace(
+        docs_dir=str(docs_dir), chunk_size=500, chunk_overlap=50, batch_size=256,
+        workers=1, rebuild=True, dry_run=False, report=None,
+    ))
+    embedding_fn = build_embedding_service()
+    client = chromadb.PersistentClient(path=os.environ["RAG_DIR"])
+    return client.get_collection(init_rag.COLLECTION_NAME, embedding_function=embedding_fn), embedding_fn
+
+
+def evaluate(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="policy_eval_"))
+    # init_rag also writes the policy facts table; keep it out of the app's DB (read when app.utils.db is imported)
+    os.environ["DB_PATH"] = str(workdir / "facts.db")
+    from app.tools.return_policy import build_policy_prompt
+    from app.utils.hybrid_retriever import HybridRetriever
+
+    questions = json.loads(Path(args.questions).read_text(encoding="utf-8"))
+    collection, embedding_fn = build_collection(Path(args.docs_dir).resolve(), workdir, args.hash_embeddings)
+    hybrid = HybridRetriever(collection, candidates=args.candidates, cutoff=args.cutoff,
+                             min_k=args.min_k, max_k=args.max_k)
+    count_tokens, tokenizer = token_counter()
+
+    modes = {
+        f"vector@{args.baseline_k}": lambda q, e: collection.query(query_embeddings=[e], n_results=args.baseline_k),
+        "vector@3": lambda q, e: collection.query(query_embeddings=[e], n_results=3),
+        "hybrid": hybrid.retrieve,
+    }
+    rows = {name: [] for name in modes}
+    misses = {name: [] for name in modes}
+    for item in questions:
+        question = item["question"]
+        embedding = embedding_fn([question])[0]
+        for name, retrieve in modes.items():
+            results = retrieve(question, embedding)
+            context = " ".join(results["documents"][0]).lower()
+            hit = all(phrase.lower() in context for phrase in item["expect"])
+            rows[name].append((hit, len(results["documents"][0]), count_tokens(build_policy_prompt(question, results))))
+            if not hit:
+                misses[name].append(question)
+
+    baseline_tokens = statistics.fmean(t for _, _, t in rows[f"vector@{args.baseline_k}"])
+    summary = {}
+    for name, results in rows.items():
+        tokens = statistics.fmean(t for _, _, t in results)
+        summary[name] = {
+            "recall": round(sum(h for h, _, _ in results) / len(results), 3),
+            "avg_chunks": round(statistics.fmean(k for _, k, _ in results), 2),
+            "chunk_counts": {str(k): sum(1 for _, n, _ in results if n == k) for k in sorted({n for _, n, _ in results})},
+            "avg_prompt_tokens": round(tokens, 1),
+            "prompt_token_reduction": round(1 - tokens / baseline_tokens, 3) if baseline_tokens else 0.0,
+            "misses": misses[name],
+        }
+    return {
+        "commit": git_commit(),
+        "questions": len(questions),
+        "chunks_in_collection": collection.count(),
+        "embeddings": "hash" if args.hash_embeddings else embedding_fn.backend,
+        "tokenizer": tokenizer,
+        "hybrid_config": {"candidates": args.candidates, "cutoff": args.cutoff, "min_k": args.min_k, "max_k": args.max_k},
+        "modes": summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=str(DATA_DIR / "policy_questions.json"))
+    parser.add_argument("--docs-dir", default=str(DATA_DIR / "policies"))
+    parser.add_argument("--hash-embeddings", action="store_true", help="bag-of-words hash embeddings instead of the model")
+    parser.add_argument("--baseline-k", type=int, default=6, help="n_results of the vector-only baseline")
+    parser.add_argument("--candidates", type=int, default=4)
+    parser.add_argument("--cutoff", type=float, default=0.5)
+    parser.add_argument("--min-k", type=int, default=1)
+    parser.add_argument("--max-k", type=int, default=4)
+    parser.add_argument("--out", help="JSON report path (default: benchmarks/results/policy_retrieval_<commit>.json)")
+    args = parser.parse_args()
+
+    report = evaluate(args)
+    out = Path(args.out).resolve() if args.out else REPO_ROOT / "benchmarks" / "results" / f"policy_retrieval_{report['commit']}.json"
+    write_json(out, report)
+
+    print(f"{report['questions']} questions over {report['chunks_in_collection']} chunks "
+          f"(embeddings: {report['embeddings']}, tokens: {report['tokenizer']})")
+    print(f"\n{'mode':<12}{'recall':>8}{'chunks':>8}{'tokens':>9}{'vs baseline':>13}")
+    for name, m in report["modes"].items():
+        print(f"{name:<12}{m['recall']:>8}{m['avg_chunks']:>8}{m['avg_prompt_tokens']:>9}{-m['prompt_token_reduction']:>+13.1%}")
+    for name, m in report["modes"].items():
+        for question in m["misses"]:
+            print(f"  {name} missed: {question}")
+    print(f"\nReport written to {out}")
+
+
+if __name__ == "__main__":
+    main()
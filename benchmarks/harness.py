@@ -0,0 +1,265 @@
+"""Offline test harness for benchmarks that need the full app.
+
+- ScriptedChatModel stands in for ChatGroq: it picks tool calls from the query
+  with a few regexes and answers from the tool output, sleeping a configurable
+  latency per call so throughput numbers include realistic LLM waits.
+- HashEmbeddingFunction replaces the sentence-transformers model with a
+  deterministic bag-of-words hash, so the policy collection can be built and
+  queried without downloading anything.
+- prepare_offline_app() builds a throwaway SQLite DB from data/*.csv and a
+  Chroma collection from data/return_policy.txt in a temp directory, points the
+  app at them, patches the LLM/embeddings and imports app.api.
+
+Nothing here is used by the app itself.
+"""
+import asyncio
+import csv
+import json
+import os
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+_ORDER_ID = re.compile(r"\b(\d{4,})\b")
+_STATUS = re.compile(r"\b(pending|processing|shipped|delivered|cancelled|canceled|returned)\b")
+
+
+def _tool_call(name: str, **args) -> AIMessage:
+    return _tool_calls((name, args))
+
+
+def _tool_calls(*calls) -> AIMessage:
+    """One AI message requesting several tools at once, as models do for independent lookups."""
+    return AIMessage(content="", tool_calls=[
+        {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"} for name, args in calls
+    ])
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Deterministic chat model that emits the tool calls the system prompt asks for."""
+
+    latency_ms: float = 300.0
+    jitter_ms: float = 50.0
+    seed: int = 0
+    calls: int = 0
+    prompt_chars: int = 0
+    # Size of the tool schemas bound by bind_tools(), counted into the reported input tokens
+    tool_chars: int = 0
+    _rng: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        return self.model_copy(update={"tool_chars": sum(len(json.dumps(convert_to_openai_tool(t))) for t in tools)})
+
+    def _delay(self) -> float:
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        return max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _reply(self, messages) -> AIMessage:
+        self.calls += 1
+        self.prompt_chars += sum(len(str(m.content)) for m in messages)
+        last = messages[-1]
+
+        if isinstance(last, ToolMessage):
+            results = []
+            for m in reversed(messages):
+                if not isinstance(m, ToolMessage):
+                    break
+                results.append(m)
+            if len(results) > 1:
+                # Several tools ran in one step: answer from all of them
+                return AIMessage(content="Here is what I found: " + " | ".join(m.content[:80] for m in reversed(results)))
+            # Second step of a cancellation: only cancel when the check allowed it
+            if last.name == "OrderCancellationCheckTool" and '"can_cancel": true' in last.content:
+                oid = _ORDER_ID.search(last.content)
+                if oid:
+                    return _tool_call("OrderCancellationTool", order_id=oid.group(1))
+            return AIMessage(content=f"Here is what I found: {last.content[:200]}")
+
+        text = str(last.content)
+        if "Policy context:" in text:
+            # ReturnPolicyTool's own completion over the retrieved chunks
+            return AIMessage(content="According to the return policy, eligible items can be returned within the stated window.")
+
+        q = text.lower()
+        oid = _ORDER_ID.search(q)
+        if not oid and re.search(r"\b(it|that|this one)\b", q):
+            # Follow-up in a session: resolve "it" to the last order ID the user mentioned
+            earlier = [m for m in messages[:-1] if isinstance(m, HumanMessage) and _ORDER_ID.search(str(m.content))]
+            oid = _ORDER_ID.search(str(earlier[-1].content)) if earlier else None
+        status = _STATUS.search(q)
+        oids = _ORDER_ID.findall(q)
+        policy = re.search(r"return|refund|exchange|policy", q)
+        if "cancel" in q and len(oids) > 1:
+            return _tool_calls(*(("OrderCancellationCheckTool", {"order_id": o}) for o in oids))
+        if policy and re.search(r"\bmy\b.*\borders?\b", q):
+            return _tool_calls(("MyOrdersTool", {}), ("ReturnPolicyTool", {"input": text}))
+        topics = re.findall(r"\b(shoes|electronics|phones?|clothing|laptops?)\b", q)
+        if policy and not oid and len(topics) > 1:
+            return _tool_calls(*(("ReturnPolicyTool", {"input": f"return policy for {t}"}) for t in topics))
+        if policy and not oid:
+            return _tool_call("ReturnPolicyTool", input=text)
+        if "cancel" in q and oid:
+            return _tool_call("OrderCancellationCheckTool", order_id=oid.group(1))
+        if "cancel" in q:
+            return _tool_call("CancellableOrdersTool", user_id="2001")
+        if oid:
+            return _tool_call("OrderTrackingTool", order_id=oid.group(1))
+        if status:
+            return _tool_call("OrdersByStatusTool", status=status.group(1))
+        if re.search(r"\bmy\b.*\borders?\b", q):
+            return _tool_call("MyOrdersTool")
+        if re.search(r"price|under|over|between|cost|show me|looking for", q):
+            return _tool_call("ProductSearchTool", input=text)
+        return AIMessage(content="I can help with orders, products and returns.")
+
+    def _with_usage(self, messages, reply: AIMessage) -> AIMessage:
+        # Roughly what a provider would bill: ~4 characters per token
+        input_tokens = (sum(len(str(m.content)) for m in messages) + self.tool_chars) // 4
+        output_tokens = max(1, len(str(reply.content)) // 4)
+        reply.usage_metadata = {
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens,
+        }
+        return reply
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._with_usage(messages, self._reply(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._with_usage(messages, self._reply(messages)))])
+
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    """Deterministic stand-in for SentenceTransformerEmbeddingFunction (same call signature)."""
+
+    def __init__(self, model_name: str = "hash", dim: int = 384, **kwargs):
+        self.dim = dim
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        out = []
+        for text in input:
+            v = np.zeros(self.dim, dtype=np.float32)
+            for word in re.findall(r"\w+", text.lower()):
+                v[zlib.crc32(word.encode()) % self.dim] += 1.0
+            norm = np.linalg.norm(v)
+            out.append(v / norm if norm else v)
+        return out
+
+
+def build_db(path: Path, data_dir: Path = REPO_ROOT / "data") -> None:
+    """Load data_dir/{products,orders}.csv into a fresh SQLite file; init_db_schema migrates it on startup."""
+    conn = sqlite3.connect(str(path))
+    for table in ("products", "orders"):
+        with open(data_dir / f"{table}.csv", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            conn.execute(f"CREATE TABLE {table} ({', '.join(header)})")
+            conn.executemany(
+                f"INSERT INTO {table} VALUES ({', '.join('?' * len(header))})",
+                reader,
+            )
+    conn.commit()
+    conn.close()
+
+
+def build_rag(rag_dir: Path, collection_name: str) -> None:
+    import chromadb
+    from app.utils.db import init_db_schema
+    from app.utils.policy_facts import extract_facts, store_facts
+    from app.utils.semantic_cache import write_build_stamp
+
+    text = (REPO_ROOT / "data" / "return_policy.txt").read_text(encoding="utf-8")
+    # Same facts init_rag would extract, so policy questions can skip retrieval as in production
+    init_db_schema()
+    store_facts(extract_facts(text, "return_policy.txt"))
+    chunks = [c.strip() for c in re.split(r"\n\s*\n", text) if c.strip()]
+    client = chromadb.PersistentClient(path=str(rag_dir))
+    collection = client.get_or_create_collection(name=collection_name, embedding_function=HashEmbeddingFunction())
+    collection.add(
+        ids=[f"policy-{i}" for i in range(len(chunks))],
+        documents=chunks,
+        metadatas=[{"source": "return_policy.txt", "chunk": i} for i in range(len(chunks))],
+    )
+    write_build_stamp(str(rag_dir))
+
+
+def prepare_offline_app(workdir: Path, llm: Optional[ScriptedChatModel] = None, env: Optional[dict] = None):
+    """Point the app at temp data stores, patch out network dependencies and import app.api.
+
+    Must run before anything under app/ is imported. Returns (app.api module, llm).
+    """
+    workdir.mkdir(parents=True, exist_ok=True)
+    db_path = workdir / "retail.db"
+    rag_dir = workdir / "rag_db"
+    if not db_path.exists():
+        build_db(db_path)
+
+    os.environ.update({
+        "DB_PATH": str(db_path),
+        "RAG_DIR": str(rag_dir),
+        "RAG_COLLECTION": "return_policy",
+        "SESSIONS_DB_PATH": str(workdir / "sessions.db"),
+        "ANONYMIZED_TELEMETRY": "False",
+        # Keep MLflow writes out of the repo and off the hot path
+        "LOG_FLUSH_INTERVAL_S": "3600",
+        **(env or {}),
+    })
+    os.chdir(workdir)
+
+    from chromadb.utils import embedding_functions
+    embedding_functions.SentenceTransformerEmbeddingFunction = HashEmbeddingFunction
+
+    if not rag_dir.exists():
+        build_rag(rag_dir, os.environ["RAG_COLLECTION"])
+
+    llm = llm or ScriptedChatModel()
+    import app.llm
+    app.llm.load_llm = lambda: llm
+
+    import app.api as api
+    return api, llm
+
+
+def sample_order_ids(db_path: Path, limit: int = 200) -> List[str]:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return [str(r[0]) for r in conn.execute("SELECT order_id FROM orders LIMIT ?", (limit,))]
+    finally:
+        conn.close()
+
+
+def write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, default=str), encoding="utf-8")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
@@ -0,0 +1,196 @@
+"""Concurrency stress test for order cancellation: throughput and double-cancels.
+
+Usage:
+    python benchmarks/stress_cancel.py --threads 16 --contenders 4 --orders 2000
+
+Every target order is processing, and --contenders callers try to cancel each one at
+the same time, spread over --threads threads. An order must be reported cancelled to
+exactly one of them. Three ways of cancelling run against the same targets (reset to
+processing before each):
+
+- check_then_update: the old cancel_order, i.e. can_cancel_order's SELECT, then a
+  SELECT and an unconditional UPDATE in a writer transaction
+- cancel_order: one conditional UPDATE ... RETURNING through the write queue
+- cancel_orders: the same, --bulk-size orders per call
+
+"double_cancels" counts orders more than one caller was told it cancelled, and
+"locked_errors" the calls that failed with "database is locked".
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_chat_load import percentiles
+from bench_tool_output import generate
+from harness import REPO_ROOT, build_db, git_commit, write_json
+
+
+def check_then_update(order_id: str) -> dict:
+    """cancel_order as it was: the status check and the update in separate steps."""
+    from app.utils.db import writer
+    from app.utils.order_service import can_cancel_order
+
+    check = can_cancel_order.uncached(order_id)
+    if not check.get("can_cancel", False):
+        return {"success": False, "order_id": order_id, "error": check.get("reason")}
+    try:
+        with writer() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT o.status, p.name, o.user_id FROM orders o JOIN products p ON o.product_id = p.id WHERE o.order_id = ?",
+                (order_id,)
+            )
+            if not cur.fetchone():
+                return {"success": False, "order_id": order_id, "error": "Order not found"}
+            cur.execute("UPDATE orders SET status = 'cancelled' WHERE order_id = ?", (order_id,))
+            if cur.rowcount == 0:
+                return {"success": False, "order_id": order_id, "error": "Failed to update order status"}
+    except Exception as e:
+        return {"success": False, "order_id": order_id, "error": f"Database error: {e}"}
+    return {"success": True, "order_id": order_id}
+
+
+def reset(order_ids):
+    from app.utils.db import write
+    from app.utils.result_cache import result_cache
+
+    def processing(conn, ids):
+        conn.executemany("UPDATE orders SET status = 'processing' WHERE order_id = ?", [(oid,) for oid in ids])
+
+    write(processing, order_ids)
+    result_cache.clear()
+
+
+def run_method(name: str, targets, args) -> dict:
+    from app.utils.db import write_queue
+    from app.utils.order_service import cancel_order, cancel_orders
+
+    reset(targets)
+    rng = random.Random(args.seed)
+    if name == "cancel_orders":
+        # Each contender cancels every order in its own shuffled chunks
+        calls = []
+        for _ in range(args.contenders):
+            ids = list(targets)
+            rng.shuffle(ids)
+            calls += [ids[i:i + args.bulk_size] for i in range(0, len(ids), args.bulk_size)]
+    else:
+        calls = [oid for oid in targets for _ in range(args.contenders)]
+    rng.shuffle(calls)
+
+    cancel = {"check_then_update": check_then_update, "cancel_order": cancel_order}.get(name)
+    wins = {oid: 0 for oid in targets}
+    latencies, errors = [], []
+    lock = threading.Lock()
+    next_call = iter(calls)
+    before = write_queue.stats()
+
+    def worker():
+        while True:
+            with lock:
+                call = next(next_call, None)
+            if call is None:
+                return
+            start = time.perf_counter()
+            if cancel is not None:
+                result = cancel(call)
+                won = [call] if result.get("success") else []
+                failures = [] if won else [result.get("error", "")]
+            else:
+                result = cancel_orders(call)
+                won = [row["order_id"] for row in result.get("cancelled", [])]
+                failures = [result["error"]] if "error" in result else [r["error"] for r in result["not_cancelled"]]
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                for oid in won:
+                    wins[oid] += 1
+                errors.extend(failures)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    after = write_queue.stats()
+    transactions = after["transactions"] - before["transactions"]
+    writes = after["writes"] - before["writes"]
+    return {
+        "calls": len(calls),
+        "wall_s": round(wall, 3),
+        "calls_per_s": round(len(calls) / wall, 1),
+        "orders_cancelled_per_s": round(sum(1 for w in wins.values() if w) / wall, 1),
+        "latency_ms": percentiles(latencies),
+        "cancelled": sum(1 for w in wins.values() if w),
+        "double_cancels": sum(1 for w in wins.values() if w > 1),
+        "not_cancelled": sum(1 for w in wins.values() if w == 0),
+        "locked_errors": sum(1 for e in errors if "locked" in str(e)),
+        "queued_writes": writes,
+        "writes_per_transaction": round(writes / transactions, 2) if transactions else 0.0,
+    }
+
+
+def run(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="stress_cancel_"))
+    data_dir = workdir / "data"
+    generate(data_dir, products=500, orders=max(10 * args.orders, 1000), users=200)
+    db_path = workdir / "retail.db"
+    build_db(db_path, data_dir)
+    os.environ.update({"DB_PATH": str(db_path), "RESULT_CACHE_BACKEND": "memory"})
+
+    from app.utils.db import init_db_schema, reader
+
+    init_db_schema()
+    with reader() as conn:
+        targets = [r[0] for r in conn.execute(
+            "SELECT order_id FROM orders WHERE status_norm IN ('processing', 'pending') LIMIT ?", (args.orders,)
+        )]
+
+    methods = {}
+    for name in ("check_then_update", "cancel_order", "cancel_orders"):
+        methods[name] = run_method(name, targets, args)
+    return {
+        "commit": git_commit(),
+        "config": {
+            "orders": len(targets), "threads": args.threads, "contenders": args.contenders,
+            "bulk_size": args.bulk_size, "seed": args.seed,
+        },
+        "methods": methods,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000, help="processing orders to cancel")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--contenders", type=int, default=4, help="callers trying to cancel each order")
+    parser.add_argument("--bulk-size", type=int, default=50, help="orders per cancel_orders call")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="JSON report path (default: benchmarks/results/stress_cancel_<commit>.json)")
+    args = parser.parse_args()
+
+    report = run(args)
+    out = Path(args.out).resolve() if args.out else REPO_ROOT / "benchmarks" / "results" / f"stress_cancel_{report['commit']}.json"
+    write_json(out, report)
+
+    c = report["config"]
+    print(f"{c['orders']} orders x {c['contenders']} contenders, {c['threads']} threads")
+    print(f"\n{'method':<19}{'calls/s':>9}{'orders/s':>10}{'p50 ms':>8}{'p95 ms':>8}{'double':>8}{'locked':>8}{'writes/txn':>12}")
+    for name, m in report["methods"].items():
+        lat = m["latency_ms"]
+        print(f"{name:<19}{m['calls_per_s']:>9}{m['orders_cancelled_per_s']:>10}{lat.get('p50', '-'):>8}{lat.get('p95', '-'):>8}"
+              f"{m['double_cancels']:>8}{m['locked_errors']:>8}{m['writes_per_transaction']:>12}")
+    print(f"\nReport written to {out}")
+
+
+if __name__ == "__main__":
+    main()
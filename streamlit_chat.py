@@ -1,4 +1,6 @@
 import os
+import json
+import uuid
 import requests
 import streamlit as st
 from app.ui.speech_utils import record_audio, transcribe_audio
@@ -9,6 +11,78 @@ st.caption("Ask about products, orders, or return policies.")
 
 API_URL = os.getenv("RETAIL_API_URL", "http://127.0.0.1:8000")
 
+
+def iter_sse(resp):
+    """Parse a text/event-stream response into (event, data) pairs."""
+    event, data = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def stream_answer(prompt: str) -> str:
+    """Render the answer token by token from /chat/stream; returns the final text."""
+    status = st.empty()
+    placeholder = st.empty()
+    partial = ""
+    answer = None
+    with requests.post(f"{API_URL}/chat/stream", json={"query": prompt, "session_id": st.session_state.session_id}, stream=True, timeout=60) as resp:
+        if not resp.ok:
+            raise RuntimeError(f"Backend error ({resp.status_code}).")
+        for event, data in iter_sse(resp):
+            if event == "token":
+                partial += data.get("text", "")
+                placeholder.markdown(partial + "▌")
+            elif event == "tool_start":
+                status.caption(f"🔧 Using {data.get('tool')}...")
+            elif event == "tool_end":
+                status.empty()
+            elif event == "done":
+                answer = data.get("response", partial)
+            elif event == "error":
+                raise RuntimeError(data.get("detail", "Backend error."))
+    status.empty()
+    answer = answer or partial
+    placeholder.markdown(answer)
+    return answer
+
+
+def ask_backend(prompt: str):
+    """Send the prompt to the backend and render the assistant reply."""
+    with st.chat_message("assistant"):
+        try:
+            if st.session_state.stream_answers:
+                answer = stream_answer(prompt)
+            else:
+                with st.spinner("Thinking..."):
+                    resp = requests.post(
+                        f"{API_URL}/chat",
+                        json={"query": prompt, "session_id": st.session_state.session_id},
+                        timeout=60,
+                    )
+                if not resp.ok:
+                    raise RuntimeError(f"Backend error ({resp.status_code}).")
+                answer = resp.json().get("response", "")
+                st.markdown(answer)
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+        except RuntimeError as e:
+            err = str(e)
+            st.session_state.messages.append({"role": "assistant", "content": err})
+            st.error(err)
+        except Exception as e:
+            err = f"Request failed: {e}"
+            st.session_state.messages.append({"role": "assistant", "content": err})
+            st.error(err)
+
+
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []  # each: {"role": "user"|"assistant", "content": str}
@@ -18,15 +92,21 @@ if "voice_key_id" not in st.session_state:
     st.session_state.voice_key_id = 0
 if "last_voice_input" not in st.session_state:
     st.session_state.last_voice_input = None
+if "stream_answers" not in st.session_state:
+    st.session_state.stream_answers = True
+# The backend keeps the conversation under this ID so follow-ups ("cancel it") have context
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 cols = st.columns([1, 1, 3])
 with cols[0]:
     if st.button("Clear chat"):
         st.session_state.messages = []
+        st.session_state.session_id = uuid.uuid4().hex
         st.session_state.voice_key_id += 1 # Reset voice widget
         st.session_state.last_voice_input = None
 with cols[1]:
-    st.write("")
+    st.toggle("Stream", key="stream_answers")
 
 # Render chat history
 for msg in st.session_state.messages:
@@ -47,22 +127,7 @@ if audio_bytes and audio_bytes != st.session_state.last_voice_input:
         st.session_state.messages.append({"role": "user", "content": text})
         
         # Call backend (reusing logic)
-        with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    resp = requests.post(f"{API_URL}/chat", json={"query": text}, timeout=60)
-                    if resp.ok:
-                        answer = resp.json().get("response", "")
-                        st.session_state.messages.append({"role": "assistant", "content": answer})
-                        st.markdown(answer)
-                    else:
-                        err = f"Backend error ({resp.status_code})."
-                        st.session_state.messages.append({"role": "assistant", "content": err})
-                        st.error(err)
-                except Exception as e:
-                    err = f"Request failed: {e}"
-                    st.session_state.messages.append({"role": "assistant", "content": err})
-                    st.error(err)
+        ask_backend(text)
         
         # Reset voice widget logic
         st.session_state.voice_key_id += 1
@@ -76,19 +141,4 @@ if prompt := st.chat_input("Type your question..."):
         st.markdown(prompt)
 
     # Call backend
-    with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                resp = requests.post(f"{API_URL}/chat", json={"query": prompt}, timeout=60)
-                if resp.ok:
-                    answer = resp.json().get("response", "")
-                    st.session_state.messages.append({"role": "assistant", "content": answer})
-                    st.markdown(answer)
-                else:
-                    err = f"Backend error ({resp.status_code})."
-                    st.session_state.messages.append({"role": "assistant", "content": err})
-                    st.error(err)
-            except Exception as e:
-                err = f"Request failed: {e}"
-                st.session_state.messages.append({"role": "assistant", "content": err})
-                st.error(err)
+    ask_backend(prompt)
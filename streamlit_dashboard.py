@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import os
+import json
 
 st.set_page_config(page_title="Retail Chatbot Metrics", layout="centered")
 st.title("📊 Retail Chatbot – Interaction Metrics")
@@ -12,7 +13,22 @@ def get_logged_queries():
     runs_data = []
 
     for root, dirs, files in os.walk(mlflow_log_dir):
-        if "params" in root and "params.json" in files:
+        # Batched runs (app/logger.py): one interactions.json table per run
+        if os.path.basename(root) == "artifacts" and "interactions.json" in files:
+            with open(os.path.join(root, "interactions.json")) as f:
+                table = json.load(f)
+            for row in table.get("data", []):
+                rec = dict(zip(table.get("columns", []), row))
+                runs_data.append({
+                    "Time": rec.get("timestamp"),
+                    "Query": rec.get("query", ""),
+                    "Tool": rec.get("tool_used") or "unknown",
+                    "Response": rec.get("response", ""),
+                    "Latency (ms)": rec.get("latency_ms"),
+                })
+
+        # Older runs logged one interaction each as params + response.txt
+        elif os.path.basename(root) == "params" and "query" in files:
             run_dir = os.path.dirname(root)
             query_file = os.path.join(run_dir, "params", "query")
             tool_file = os.path.join(run_dir, "params", "tool_used")
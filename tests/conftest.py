@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.setup import init_sqlite
+from app.utils import db
+from app.utils.result_cache import result_cache
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """A database built from data/*.csv by init_sqlite, with the app's pool and write queue pointed at it."""
+    path = tmp_path / "retail.db"
+    monkeypatch.setattr(sys, "argv", ["init_sqlite.py", "--data-dir", str(REPO_ROOT / "data"), "--db", str(path)])
+    init_sqlite.main()
+
+    pool = db.ConnectionPool()
+    monkeypatch.setattr(db, "_DB_PATH", path)
+    monkeypatch.setattr(db, "pool", pool)
+    monkeypatch.setattr(db.write_queue, "pool", pool)
+    # Cached service results don't know which database they came from
+    result_cache.clear()
+    yield path
+    db.write_queue.close()
+    pool.close()
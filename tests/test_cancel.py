@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from app.utils import order_service
+from app.utils.order_service import CANCEL_MAX_ORDERS, cancel_order, cancel_orders
+
+
+def _processing(fresh_db):
+    conn = sqlite3.connect(str(fresh_db))
+    try:
+        return [r[0] for r in conn.execute("SELECT order_id FROM orders WHERE status_norm = 'processing' ORDER BY order_id")]
+    finally:
+        conn.close()
+
+
+def test_an_order_is_cancelled_once(fresh_db):
+    order_id = _processing(fresh_db)[0]
+    assert cancel_order(order_id)["success"] is True
+    again = cancel_order(order_id)
+    assert again["success"] is False
+    assert again["current_status"] == "cancelled"
+
+
+def test_cancel_orders_reports_every_id_across_chunks(fresh_db, monkeypatch):
+    monkeypatch.setattr(order_service, "_CANCEL_CHUNK", 2)
+    processing = _processing(fresh_db)[:3]
+    unknown = [f"9999{i}" for i in range(5)]
+
+    result = cancel_orders(processing + unknown)
+
+    assert sorted(o["order_id"] for o in result["cancelled"]) == sorted(processing)
+    assert [o["order_id"] for o in result["not_cancelled"]] == unknown
+    assert all(o["error"] == "Order not found" for o in result["not_cancelled"])
+
+
+def test_cancel_orders_is_bounded(fresh_db):
+    with pytest.raises(ValueError):
+        cancel_orders([str(i) for i in range(CANCEL_MAX_ORDERS + 1)])
+
+
+def test_sql_histogram_times_the_statements_not_the_queue(fresh_db):
+    from app.metrics import registry
+
+    cancel_order(_processing(fresh_db)[0])
+    cancel_order("99999")
+    labels = registry.snapshot()["sql_query_duration_seconds"]
+    assert "cancel_processing" in labels and "cancel_refusals" in labels
+    assert "cancel_order" not in labels
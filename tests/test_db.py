@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils import db
+
+
+def test_db_executor_works_again_after_close_pool():
+    # Each app lifespan ends with close_pool(); a second one in the same process must still run queries
+    double = db.run_in_db_executor(lambda x: 2 * x)
+    assert asyncio.run(double(2)) == 4
+    db.close_pool()
+    assert asyncio.run(double(3)) == 6
+    db.close_pool()
+
+
+def test_write_queued_behind_close_fails_instead_of_hanging(fresh_db):
+    queue = db.write_queue
+    running, release = threading.Event(), threading.Event()
+
+    def blocking(conn):
+        running.set()
+        release.wait(5)
+
+    first = queue.submit(blocking)
+    running.wait(5)
+    closer = threading.Thread(target=queue.close)
+    closer.start()
+    while queue._queue.empty():  # close() has queued the stop
+        time.sleep(0.001)
+    late = queue.submit(lambda conn: conn.execute("SELECT 1").fetchone()[0])
+    release.set()
+    closer.join(5)
+
+    assert first.result(5) is None
+    with pytest.raises(RuntimeError):
+        late.result(5)
+    # The next write starts a new writer thread
+    assert db.write(lambda conn: conn.execute("SELECT 1").fetchone()[0]) == 1
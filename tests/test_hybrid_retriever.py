@@ -0,0 +1,45 @@
+from app.utils.hybrid_retriever import HybridRetriever
+
+CHUNKS = {
+    "window": "Most items can be returned within 30 days of delivery.",
+    "electronics": "Electronics can be returned within 15 days if unopened.",
+    "refunds": "Refunds reach the original payment method in 5 to 7 days.",
+    "giftwrap": "The gift-wrap charge is not refundable.",
+    "shipping": "Standard shipping is free on orders over 50.",
+}
+
+
+class FakeCollection:
+    """The slice of a Chroma collection HybridRetriever uses, with canned vector hits."""
+
+    def __init__(self, vector_hits):
+        self.vector_hits = vector_hits
+
+    def get(self, include):
+        ids = list(CHUNKS)
+        return {"ids": ids, "documents": [CHUNKS[i] for i in ids], "metadatas": [{"source": i} for i in ids]}
+
+    def query(self, query_embeddings, n_results, include):
+        hits = self.vector_hits[:n_results]
+        return {"ids": [[cid for cid, _ in hits]], "distances": [[d for _, d in hits]]}
+
+
+def test_chunk_found_only_by_bm25_survives():
+    # Both retrievers rank the refunds chunk first; only BM25 finds the gift-wrap one (second)
+    collection = FakeCollection([("refunds", 0.4), ("window", 0.45), ("electronics", 0.5), ("shipping", 0.9)])
+    retriever = HybridRetriever(collection, candidates=4, cutoff=0.5, min_k=1, max_k=4)
+
+    ids = retriever.retrieve("refund to original payment method for gift-wrap", embedding=[0.0])["ids"][0]
+
+    assert ids[0] == "refunds"
+    assert "giftwrap" in ids
+
+
+def test_cutoff_drops_weak_hits_of_each_retriever():
+    collection = FakeCollection([("window", 0.3), ("shipping", 0.9)])
+    retriever = HybridRetriever(collection, candidates=2, cutoff=0.5, min_k=1, max_k=4)
+
+    ids = retriever.retrieve("how many days to return", embedding=[0.0])["ids"][0]
+
+    assert "window" in ids
+    assert "shipping" not in ids
@@ -0,0 +1,12 @@
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_app_does_not_load_chromadb():
+    # Chroma loads with the return_policy component, so lazy warmup keeps it off the startup path
+    code = "import sys, app.api; print('chromadb' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "False"
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+
+from app.agent import FastPathRouter
+from app.utils.policy_facts import PolicyFacts, extract_facts, store_facts
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def facts(fresh_db, tmp_path):
+    text = (REPO_ROOT / "data" / "return_policy.txt").read_text(encoding="utf-8")
+    store_facts(extract_facts(text, "return_policy.txt"))
+    return PolicyFacts(rag_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("question", [
+    "can I return shoes",
+    "what is the return window for shoes",
+    "how long do refunds take",
+    "can I return a damaged item",
+])
+def test_answers_questions_about_the_subject_only(facts, question):
+    assert facts.lookup(question) is not None
+
+
+@pytest.mark.parametrize("question", [
+    "can I return shoes after 10 days",
+    "Can I return my order?",
+    "can I return shoes I bought last week",
+    "can I return shoes if worn",
+    "can I return running shoes please",
+    "can I return it",
+])
+def test_leaves_anything_more_specific_to_retrieval(facts, question):
+    assert facts.lookup(question) is None
+
+
+@pytest.mark.parametrize("question", [
+    "Can I return my order?",
+    "can I return the shoes I ordered",
+    "I bought a laptop, can I get a refund",
+    "what is the return window for my order 12345",
+])
+def test_fast_path_sends_personal_policy_questions_to_the_agent(question):
+    assert FastPathRouter().match(question) is None
+
+
+def test_fast_path_tries_general_policy_questions_against_the_facts():
+    assert FastPathRouter().match("Can I return shoes?") == ("policy_fact", "can i return shoes")
+
+
+def test_fast_path_failure_is_logged_and_falls_back(monkeypatch, caplog):
+    def broken(question):
+        raise RuntimeError("facts table missing")
+
+    monkeypatch.setattr(FastPathRouter, "_render_policy_fact", staticmethod(broken))
+    with caplog.at_level("WARNING", logger="app.agent"):
+        assert FastPathRouter(enabled=True).route("Can I return shoes?") is None
+    record = caplog.records[-1]
+    assert "policy_fact" in record.getMessage()
+    assert record.exc_info[0] is RuntimeError
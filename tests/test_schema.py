@@ -0,0 +1,65 @@
+import csv
+import sqlite3
+import sys
+from pathlib import Path
+
+from app.setup import init_sqlite
+from app.utils import db
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _objects(path: Path) -> set:
+    conn = sqlite3.connect(str(path))
+    try:
+        return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index', 'trigger')")}
+    finally:
+        conn.close()
+
+
+def _user_version(path: Path) -> int:
+    conn = sqlite3.connect(str(path))
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _migrated_db(path: Path) -> Path:
+    """The CSVs loaded as plain tables (the pre-migration layout), then every migration applied."""
+    conn = sqlite3.connect(str(path))
+    for table in ("products", "orders"):
+        with open(REPO_ROOT / "data" / f"{table}.csv", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            conn.execute(f"CREATE TABLE {table} ({', '.join(header)})")
+            conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(header))})", reader)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_fresh_init_sqlite_has_every_migrated_table(tmp_path, monkeypatch):
+    fresh = tmp_path / "fresh.db"
+    monkeypatch.setattr(sys, "argv", ["init_sqlite.py", "--data-dir", str(REPO_ROOT / "data"), "--db", str(fresh)])
+    init_sqlite.main()
+
+    migrated = _migrated_db(tmp_path / "migrated.db")
+    monkeypatch.setattr(db, "_DB_PATH", migrated)
+    db.init_db_schema()
+
+    assert _user_version(migrated) == db.SCHEMA_VERSION
+    assert _user_version(fresh) == db.SCHEMA_VERSION
+    assert "policy_facts" in _objects(fresh)
+    assert _objects(migrated) - _objects(fresh) == set()
+
+
+def test_init_db_schema_leaves_a_fresh_database_alone(tmp_path, monkeypatch, capsys):
+    fresh = tmp_path / "fresh.db"
+    monkeypatch.setattr(sys, "argv", ["init_sqlite.py", "--data-dir", str(REPO_ROOT / "data"), "--db", str(fresh)])
+    init_sqlite.main()
+    capsys.readouterr()
+
+    monkeypatch.setattr(db, "_DB_PATH", fresh)
+    db.init_db_schema()
+    assert "Migrating" not in capsys.readouterr().out
@@ -0,0 +1,27 @@
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.agent import GraphBuilder
+
+
+def _builder():
+    # Skip __init__: compiling the session graph needs no LLM or tools
+    builder = GraphBuilder.__new__(GraphBuilder)
+    builder._session_graph = (None, None)
+    return builder
+
+
+def test_session_graph_is_compiled_once_per_checkpointer():
+    builder = _builder()
+    first = InMemorySaver()
+    graph = builder.session_graph(first)
+    assert builder.session_graph(first) is graph
+    assert graph.checkpointer is first
+
+
+def test_session_graph_follows_a_new_checkpointer():
+    # A reopened session store brings a new saver; the graph must never run on a stale one
+    builder = _builder()
+    first, second = InMemorySaver(), InMemorySaver()
+    builder.session_graph(first)
+    assert builder.session_graph(second).checkpointer is second
+    assert builder.session_graph(first).checkpointer is first